@@ -0,0 +1,239 @@
+import numpy as np
+from mars import HEADINGS, HEADING_VECTORS, Grid
+from history import History
+from errors import SparseGridError
+
+"""
+This module computes the coverage of a mission: how many times every cell has been visited, the fraction
+of the grid covered, the revisits and how many times the Rovers wrapped around every edge. The stats are
+accumulated in a flat array of visit counts (one counter per cell, so the memory depends on the size of
+the grid and not on the length of the path), either while the Rovers moves or from its history in chunks:
+
+    coverage = Coverage(grid)
+    for event in coverage.follow(rovers.run_iter(instructions, grid, obstacles)):
+        pass
+    coverage.coverage, coverage.revisit_rate, coverage.wraps #e.g. 0.42, 0.17, {'N': 3, 'E': 0, 'S': 0, 'W': 1}
+
+    coverage = Coverage.from_history(rovers.history, grid) #the same stats from the positions recorded
+    draw_heatmap(coverage.heatmap(), str(rovers), grid) #in draw.py
+"""
+
+_CHUNK_SIZE = 1 << 20 #positions of the history counted at once
+
+
+class Coverage:
+    """
+    This is the Coverage class. It counts the visits of every cell of the grid: the cell where the Rovers
+    starts and the cell reached by every move, as the positions recorded by the History. The counts are
+    kept in a flat int64 array where cell (x, y) is the index x * n + y.
+    """
+    def __init__(self, grid:Grid, start:tuple[int] = (0, 0)) -> None:
+        """
+        This is the constructor of the Coverage class.
+
+        :param grid: This is the grid explored by the Rovers
+        :type grid: Grid
+        :param start: This is the cell where the Rovers starts, counted as visited. None to count nothing
+        :type start: tuple
+        """
+        if grid.sparse:
+            raise SparseGridError(f'The coverage of the sparse grid {grid[0]} X {grid[1]} cannot be counted cell by cell')
+        self._shape = grid.shape
+        m, n = self._shape
+        self._counts = np.zeros(m * n, dtype=np.int64)
+        self._wraps = np.zeros(len(HEADINGS), dtype=np.int64) #wrap arounds through the edge of every heading
+        self._last: tuple[int] = None #last position counted, to find the wrap arounds between chunks of positions
+        if start is not None:
+            x, y = start
+            self._counts[x * n + y] += 1
+            self._last = (x, y)
+
+    @classmethod
+    def from_history(cls, history:History, grid:Grid, chunk:int = _CHUNK_SIZE):
+        """
+        This method creates the coverage of the positions kept in a history. The positions have to be consecutive,
+        so the history must keep all of them (full or mmap mode, or the last steps of a ring). In a grid with
+        a side of 2 cells a wrap around cannot be told apart from a step back, so it is counted as a step.
+
+        :param history: This is the history of the Rovers
+        :type history: History
+        :param grid: This is the grid explored by the Rovers
+        :type grid: Grid
+        :param chunk: This is the number of positions counted at once
+        :type chunk: integer
+        :return: the coverage
+        :rtype: Coverage
+        """
+        if history.mode in ('off', 'sample'):
+            raise ValueError(f'The coverage needs consecutive positions and the {history.mode} mode does not keep them')
+        coverage = cls(grid, None)
+        positions = history.positions()
+        for first in range(0, len(positions), chunk):
+            coverage.add_positions(positions[first:first + chunk])
+        return coverage
+
+    @property
+    def counts(self) -> np.array:
+        """
+        This property method returns the number of visits of every cell. It is a view of the counts.
+
+        :return: array of shape (m, n), the visits of cell (x, y) are counts[x, y]
+        :rtype: numpy array object
+        """
+        return self._counts.reshape(self._shape)
+
+    @property
+    def visits(self) -> int:
+        """
+        This property method returns the number of visits counted, the start and every move.
+
+        :return: number of visits
+        :rtype: integer
+        """
+        return int(self._counts.sum())
+
+    @property
+    def cells_visited(self) -> int:
+        """
+        This property method returns the number of different cells visited.
+
+        :return: number of cells
+        :rtype: integer
+        """
+        return int(np.count_nonzero(self._counts))
+
+    @property
+    def coverage(self) -> float:
+        """
+        This property method returns the fraction of the cells of the grid that have been visited.
+
+        :return: coverage between 0 and 1
+        :rtype: float
+        """
+        return self.cells_visited / self._counts.size if self._counts.size else 0.0
+
+    @property
+    def revisits(self) -> int:
+        """
+        This property method returns the number of visits to cells that had already been visited.
+
+        :return: number of revisits
+        :rtype: integer
+        """
+        return self.visits - self.cells_visited
+
+    @property
+    def revisit_rate(self) -> float:
+        """
+        This property method returns the fraction of the visits that were revisits.
+
+        :return: revisit rate between 0 and 1
+        :rtype: float
+        """
+        visits = self.visits
+        return (visits - self.cells_visited) / visits if visits else 0.0
+
+    @property
+    def wraps(self) -> dict[str, int]:
+        """
+        This property method returns the number of wrap arounds through every edge of the grid: N is the
+        top edge (the Rovers facing North goes from y = n - 1 to y = 0), E the right one and so on.
+
+        :return: wrap arounds of every edge
+        :rtype: dict
+        """
+        return {heading: int(wraps) for heading, wraps in zip(HEADINGS, self._wraps)}
+
+    def add_positions(self, positions:np.array) -> None:
+        """
+        This method counts a chunk of consecutive positions, e.g. a slice of History.positions(). The visits are
+        counted with numpy bincount on the flat indices of the cells and the wrap arounds are the steps that
+        go from one side of the grid to the other, also between the last position of the previous chunk and
+        the first one of this chunk.
+
+        :param positions: These are the positions, with shape (k, 2)
+        :type positions: numpy array object
+        """
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        if len(positions) == 0:
+            return
+        m, n = self._shape
+        self._counts += np.bincount(positions[:, 0] * n + positions[:, 1], minlength=m * n)
+        if self._last is not None:
+            positions = np.concatenate(([self._last], positions))
+        delta = np.diff(positions, axis=0)
+        for heading, (dx, dy) in enumerate(HEADING_VECTORS):
+            #a wrap around through the edge of heading (dx, dy) jumps one side minus one cell backwards
+            if dx and m > 2:
+                self._wraps[heading] += np.count_nonzero(delta[:, 0] == -dx * (m - 1))
+            elif dy and n > 2:
+                self._wraps[heading] += np.count_nonzero(delta[:, 1] == -dy * (n - 1))
+        self._last = (int(positions[-1, 0]), int(positions[-1, 1]))
+
+    def feed(self, event) -> None:
+        """
+        This method counts an event of Rovers.run_iter. The cells of a straight jump are counted without
+        listing them: every whole lap around the grid adds one visit to all the cells of its row or column
+        and the cells of the last lap (fewer than a side of the grid) are added with one fancy index.
+
+        :param event: This is the event
+        :type event: RoversEvent
+        """
+        if event.kind != 'move':
+            return
+        m, n = self._shape
+        heading = HEADINGS.index(event.direction)
+        dx, dy = HEADING_VECTORS[heading]
+        laps, rest = divmod(event.steps, m if dx else n)
+        back = np.arange(rest) #the last rest cells, walked back from the end of the jump
+        if dx:
+            line = self._counts[event.y::n] #cells of the row, x * n + y for every x
+            cells = (event.x - dx * back) % m
+        else:
+            line = self._counts[event.x * n:(event.x + 1) * n] #cells of the column
+            cells = (event.y - dy * back) % n
+        line += laps
+        line[cells] += 1 #the cells are different, there are fewer than a lap
+        self._wraps[heading] += event.wraps
+        self._last = (event.x, event.y)
+
+    def follow(self, events):
+        """
+        This method counts the events of a generator and yields them, so it can be put in the loop of a mission.
+
+        :param events: These are the events, e.g. the generator returned by Rovers.run_iter
+        :type events: iterable of RoversEvent
+        :return: generator of the same events
+        :rtype: generator of RoversEvent
+        """
+        for event in events:
+            self.feed(event)
+            yield event
+
+    def heatmap(self, max_size:int = None) -> np.array:
+        """
+        This method returns the visits as an image for matplotlib imshow with origin='lower': rows are the y
+        coordinate and columns the x coordinate. Grids bigger than max_size are aggregated summing the visits
+        of the cells covered by every pixel.
+
+        :param max_size: This is the maximum number of pixels of every side of the image, None for one pixel per cell
+        :type max_size: integer
+        :return: image with shape (pixels in y, pixels in x)
+        :rtype: numpy array object
+        """
+        image = self.counts
+        for axis, size in enumerate(self._shape):
+            if max_size is not None and size > max_size:
+                edges = np.linspace(0, size, max_size + 1).astype(np.int64)[:-1]
+                image = np.add.reduceat(image, edges, axis=axis)
+        return image.T
+
+    def stats(self) -> dict:
+        """
+        This method returns all the stats in a dictionary, e.g. to be printed as JSON.
+
+        :return: visits, cells visited, coverage, revisits, revisit rate and wrap arounds of every edge
+        :rtype: dict
+        """
+        return {'visits': self.visits, 'cells_visited': self.cells_visited, 'coverage': self.coverage,
+                'revisits': self.revisits, 'revisit_rate': self.revisit_rate, 'wraps': self.wraps}
@@ -0,0 +1,323 @@
+import io
+import os
+import sys
+import contextlib
+import json
+import time
+import argparse
+import platform
+import itertools
+import tracemalloc
+import subprocess
+import numpy as np
+from mars import Grid, Rovers, Obstacles
+from history import History
+from main import create_rovers_position
+
+"""
+This module contains the benchmark suite of the movement engine. It measures the time, the moves
+per second and the peak memory of the main operations over a matrix of parameters (grid size,
+obstacle density, instructions length and instructions mix). The results can be stored as a JSON
+baseline and later runs can be compared with it to find performance regressions:
+
+    python src/benchmark.py --save baseline.json
+    python src/benchmark.py --compare baseline.json --threshold 0.2
+
+The startup benchmarks launch new python processes, like the scripts that run the command line many times.
+"""
+
+GRID_SIZES = (100, 1000)
+DENSITIES = (0.0, 0.05) #fraction of the cells with obstacles
+LENGTHS = (10_000, 100_000) #number of instructions
+MIXES = {'move': 'MMMMMMLR', 'rotate': 'MLRLRRLM'} #characters sampled uniformly to create the instructions
+SEED = 0
+STARTUP_COMMANDS = {'import main': ['-c', 'import main'], #what the command line imports
+                    'import main+draw': ['-c', 'import main, draw'], #what it imported before matplotlib was lazy
+                    'batch': ['main.py', '--instructions', 'MMRMMLM', '--seed', str(SEED)]} #a whole run in batch mode
+STARTUP_RUNS = 5 #the fastest run is kept, the time of a new process is noisy
+
+
+def make_instructions(length:int, mix:str, seed:int = SEED) -> str:
+    """
+    This function creates random instructions sampling the characters of the mix.
+
+    :param length: This is the number of instructions
+    :type length: integer
+    :param mix: This is the string of characters sampled, repeated characters are more frequent
+    :type mix: string
+    :param seed: This is the seed of the random generator
+    :type seed: integer
+    :return: instructions
+    :rtype: string
+    """
+    rng = np.random.default_rng(seed)
+    return ''.join(rng.choice(list(mix), size=length))
+
+
+def make_obstacles(grid:Grid, density:float, seed:int = SEED, path:str = None) -> Obstacles:
+    """
+    This function creates the obstacles of a grid given the fraction of cells with obstacles. If the
+    instructions of a path are given, the obstacles on that path are removed so that the rovers
+    checks obstacles during the whole path instead of stopping after a few moves.
+
+    :param grid: This is the grid
+    :type grid: Grid
+    :param density: This is the fraction of the cells with obstacles
+    :type density: float
+    :param seed: This is the seed of the obstacles
+    :type seed: integer
+    :param path: These are the instructions of the path kept free of obstacles
+    :type path: string
+    :return: obstacles
+    :rtype: Obstacles
+    """
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, int(density * (grid.shape[0] - 1) * grid.shape[1]), seed)
+    if path is None:
+        return obstacles
+    rovers = Rovers()
+    rovers.execute(path, grid, Obstacles())
+    visited = set(map(tuple, rovers.history.tolist()))
+    free = Obstacles(grid)
+    for position in obstacles.get_obstacles_positions():
+        if position not in visited:
+            free.add_custom_obstacle(position)
+    return free
+
+
+def measure(function, *args) -> dict:
+    """
+    This function measures the time and the peak memory of a function call. The time is taken from a
+    first call and the peak memory, that is traced with tracemalloc (which slows down the call), from a second one.
+
+    :param function: This is the function measured, it returns the number of moves done (or None)
+    :type function: function
+    :return: dictionary with seconds, peak_bytes and moves_per_second (if the function returns the moves)
+    :rtype: dict
+    """
+    with contextlib.redirect_stdout(io.StringIO()): #the messages of the obstacles found are not printed
+        start = time.perf_counter()
+        moves = function(*args)
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        try:
+            function(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    result = {'seconds': seconds, 'peak_bytes': peak}
+    if moves is not None:
+        result['moves_per_second'] = moves / seconds if seconds > 0 else float('inf')
+    return result
+
+
+def measure_startup(arguments:list[str], runs:int = STARTUP_RUNS) -> dict:
+    """
+    This function measures the time of a new python process with the arguments, run in the directory
+    of the sources. The peak memory of another process is not traced.
+
+    :param arguments: These are the arguments of python, e.g. ['-c', 'import main']
+    :type arguments: list of strings
+    :param runs: This is the number of processes launched, the fastest one is kept
+    :type runs: integer
+    :return: dictionary with seconds and peak_bytes (always 0)
+    :rtype: dict
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *arguments], cwd=directory, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return {'seconds': min(times), 'peak_bytes': 0}
+
+
+def bench_move(instructions:str, grid:Grid, obstacles:Obstacles) -> int:
+    """
+    This function moves the rovers character by character with Rovers.move.
+
+    :param instructions: This is the string of commands
+    :type instructions: string
+    :param grid: This is the grid
+    :type grid: Grid
+    :param obstacles: This is the obstacles of the grid
+    :type obstacles: Obstacles
+    :return: number of instructions executed
+    :rtype: integer
+    """
+    rovers = Rovers(History('off'))
+    executed = 0
+    for instruction in instructions:
+        if not rovers.can_move():
+            break
+        rovers.move(instruction, grid, obstacles)
+        executed += 1
+    return executed
+
+
+def bench_execute(instructions:str, grid:Grid, obstacles:Obstacles) -> int:
+    """
+    This function executes the whole instructions with Rovers.execute.
+
+    :param instructions: This is the string of commands
+    :type instructions: string
+    :param grid: This is the grid
+    :type grid: Grid
+    :param obstacles: This is the obstacles of the grid
+    :type obstacles: Obstacles
+    :return: number of instructions
+    :rtype: integer
+    """
+    Rovers(History('off')).execute(instructions, grid, obstacles)
+    return len(instructions)
+
+
+def bench_obstacles(grid:Grid, density:float) -> None:
+    """
+    This function creates the obstacles of the grid with Obstacles.create_obstacles_in_grid.
+
+    :param grid: This is the grid
+    :type grid: Grid
+    :param density: This is the fraction of the cells with obstacles
+    :type density: float
+    """
+    make_obstacles(grid, density)
+
+
+def bench_positions(history:History) -> int:
+    """
+    This function creates the arrows of the path with create_rovers_position.
+
+    :param history: This is the history of the rovers
+    :type history: History
+    :return: number of positions
+    :rtype: integer
+    """
+    create_rovers_position(history)
+    return len(history)
+
+
+def bench_draw(positions:np.array, grid:Grid, obstacles:Obstacles) -> None:
+    """
+    This function draws the path without window (Agg) to a png in memory.
+
+    :param positions: These are the arrows of the path
+    :type positions: numpy array object
+    :param grid: This is the grid
+    :type grid: Grid
+    :param obstacles: This is the obstacles of the grid
+    :type obstacles: Obstacles
+    """
+    from draw import draw_rovers_path #matplotlib is only imported if the draws are measured
+    draw_rovers_path(positions, 'benchmark', obstacles.get_obstacles_positions(), grid, io.BytesIO())
+
+
+def run_benchmarks(grid_sizes=GRID_SIZES, densities=DENSITIES, lengths=LENGTHS, mixes=MIXES, draw:bool = True,
+                   startup_runs:int = STARTUP_RUNS) -> dict:
+    """
+    This function runs all the benchmarks over the matrix of parameters.
+
+    :param grid_sizes: sizes of the squared grids
+    :type grid_sizes: tuple of integers
+    :param densities: fractions of the cells with obstacles
+    :type densities: tuple of floats
+    :param lengths: numbers of instructions
+    :type lengths: tuple of integers
+    :param mixes: names and characters of the instructions mixes
+    :type mixes: dict
+    :param draw: This is False to skip the draw benchmarks
+    :type draw: bool
+    :param startup_runs: This is the number of processes launched by every startup benchmark, 0 to skip them
+    :type startup_runs: integer
+    :return: dictionary of results, the key is the name of the benchmark and its parameters
+    :rtype: dict
+    """
+    results = {}
+    for size, density in itertools.product(grid_sizes, densities):
+        grid = Grid(size, size)
+        results[f'obstacles[grid={size},density={density}]'] = measure(bench_obstacles, grid, density)
+        for length, (mix, characters) in itertools.product(lengths, mixes.items()):
+            instructions = make_instructions(length, characters)
+            obstacles = make_obstacles(grid, density, path=instructions)
+            parameters = f'grid={size},density={density},length={length},mix={mix}'
+            results[f'move[{parameters}]'] = measure(bench_move, instructions, grid, obstacles)
+            results[f'execute[{parameters}]'] = measure(bench_execute, instructions, grid, obstacles)
+    for size, length in itertools.product(grid_sizes, lengths):
+        grid = Grid(size, size)
+        rovers = Rovers()
+        rovers.execute(make_instructions(length, MIXES['move']), grid, Obstacles())
+        results[f'positions[grid={size},length={length}]'] = measure(bench_positions, rovers.history)
+        if draw:
+            obstacles = make_obstacles(grid, max(densities))
+            results[f'draw[grid={size},length={length}]'] = measure(bench_draw, create_rovers_position(rovers.history), grid, obstacles)
+    if startup_runs > 0:
+        for name, arguments in STARTUP_COMMANDS.items():
+            results[f'startup[{name}]'] = measure_startup(arguments, startup_runs)
+    return results
+
+
+def compare_results(baseline:dict, results:dict, threshold:float = 0.2, min_seconds:float = 0.001) -> list[str]:
+    """
+    This function compares the results with a baseline. A benchmark has a regression if it takes
+    more time or peak memory than the baseline by more than the threshold. Times shorter than
+    min_seconds in the baseline are too noisy and are not compared.
+
+    :param baseline: results of the baseline
+    :type baseline: dict
+    :param results: results of the current run
+    :type results: dict
+    :param threshold: This is the allowed relative increase, e.g. 0.2 is 20%
+    :type threshold: float
+    :param min_seconds: This is the minimum time of the baseline to compare the times
+    :type min_seconds: float
+    :return: list of messages of the regressions found
+    :rtype: list of strings
+    """
+    regressions = []
+    for name in sorted(set(baseline) & set(results)):
+        for metric in ('seconds', 'peak_bytes'):
+            before, after = baseline[name][metric], results[name][metric]
+            if metric == 'seconds' and before < min_seconds:
+                continue
+            if before > 0 and after > before * (1 + threshold):
+                regressions.append(f'{name} {metric}: {before:.6g} --> {after:.6g} (+{100 * (after / before - 1):.1f}%)')
+    return regressions
+
+
+def main(argv:list[str] = None) -> int:
+    """
+    This is the command line entry point of the benchmark suite.
+
+    :param argv: command line arguments, by default the ones of the process
+    :type argv: list of strings
+    :return: exit code, 1 if there are regressions
+    :rtype: integer
+    """
+    parser = argparse.ArgumentParser(description='Benchmarks of the Mars Rovers movement engine')
+    parser.add_argument('--save', help='write the results as a JSON baseline to this path')
+    parser.add_argument('--compare', help='compare the results with the JSON baseline of this path')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed relative increase before a regression (default 0.2)')
+    parser.add_argument('--quick', action='store_true', help='run a small matrix of parameters')
+    parser.add_argument('--no-draw', action='store_true', help='skip the draw benchmarks')
+    parser.add_argument('--no-startup', action='store_true', help='skip the startup benchmarks')
+    args = parser.parse_args(argv)
+    if args.quick:
+        results = run_benchmarks((100,), (0.0, 0.05), (10_000,), MIXES, draw=not args.no_draw, startup_runs=0 if args.no_startup else 1)
+    else:
+        results = run_benchmarks(draw=not args.no_draw, startup_runs=0 if args.no_startup else STARTUP_RUNS)
+    for name, result in results.items():
+        speed = f"{result['moves_per_second']:>14,.0f} moves/s" if 'moves_per_second' in result else ' ' * 22
+        print(f"{name:<70} {result['seconds']:>10.4f} s {speed} {result['peak_bytes'] / 2**20:>10.2f} MiB")
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({'python': platform.python_version(), 'numpy': np.__version__, 'results': results}, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare_results(json.load(file)['results'], results, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
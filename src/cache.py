@@ -0,0 +1,308 @@
+import sys
+import hashlib
+import weakref
+import collections
+import numpy as np
+from mars import HEADINGS, Grid, Rovers, Obstacles
+from history import History
+from instrumentation import Instrumentation
+from errors import DirectionNotFoundError, InstructionSyntaxError
+
+"""
+This module contains the ResultCache, a cache of the final states of instructions. Many queries
+share long prefixes (e.g. 'MMRMMLMM', 'MMRMMLMR'...), so the states are stored in a prefix trie:
+every node is the state of the Rovers after the instructions of the path from the root, and a new
+query only runs the instructions after its longest cached prefix:
+
+    cache = ResultCache()
+    cache.execute('MMRMMLM', grid, obstacles) #'2:3:N', like str(rovers) after rovers.execute
+    cache.stats() #hits, reused and simulated commands, nodes, memory...
+
+There is a trie for every context: the shape of the grid, the fingerprint of the obstacles (a hash of
+their positions) and the start state. When obstacles are added or removed (the version of the obstacles
+changes) the fingerprint is computed again and the tries of the old one are dropped, so the cache never
+answers with stale obstacles.
+"""
+
+_NODE_BYTES = 200 #approximate memory of a node of the trie without its label: the object, its dict of children and the state
+
+
+class _Node:
+    """
+    This is the _Node class, a node of the prefix trie. The edge from its parent has the label (a string of commands)
+    and the node has the state of the Rovers after the instructions from the root.
+    """
+    __slots__ = ('label', 'state', 'parent', 'children', 'context')
+
+    def __init__(self, label:str, state:tuple, parent, context:tuple) -> None:
+        """
+        This is the constructor of the _Node class.
+
+        :param label: This is the label of the edge from the parent
+        :type label: string
+        :param state: This is the state (x, y, direction, can move) after the instructions from the root
+        :type state: tuple
+        :param parent: This is the parent node, None for the root
+        :type parent: _Node
+        :param context: This is the key of the context of the trie
+        :type context: tuple
+        """
+        self.label = label
+        self.state = state
+        self.parent = parent
+        self.children: dict[str, _Node] = {} #first command of the label --> child
+        self.context = context
+
+
+class ResultCache:
+    """
+    This is the ResultCache class. It answers the final state of instructions like Rovers.execute, reusing
+    the states of the prefixes already run. The memory is bounded: when the labels of the tries have more
+    than max_characters commands, the least recently used leaves are removed, and at most max_contexts tries
+    (grid, obstacles and start state) are kept.
+    """
+    def __init__(self, max_characters:int = 1 << 22, max_contexts:int = 64) -> None:
+        """
+        This is the constructor of the ResultCache class.
+
+        :param max_characters: This is the maximum number of commands stored in the labels of the tries
+        :type max_characters: integer
+        :param max_contexts: This is the maximum number of tries
+        :type max_contexts: integer
+        """
+        self._max_characters = max_characters
+        self._max_contexts = max_contexts
+        self._contexts: collections.OrderedDict = collections.OrderedDict() #context key --> root, least recently used first
+        self._lru: collections.OrderedDict = collections.OrderedDict() #nodes, least recently used first
+        self._fingerprints = weakref.WeakKeyDictionary() #obstacles --> (version, fingerprint)
+        self._instrumentation = Instrumentation(sink=None) #the obstacles found are not printed
+        self.clear()
+
+    def clear(self) -> None:
+        """
+        This method removes all the states and resets the statistics.
+        """
+        self._contexts.clear()
+        self._lru.clear()
+        self._characters = 0
+        self._nodes = 0
+        self._counts = collections.Counter() #hits, partial hits, misses, reused and simulated commands, evictions...
+
+    def execute(self, instructions:str, grid:Grid, obstacles:Obstacles, start:tuple = (0, 0, 'N')) -> str:
+        """
+        This method returns the final state of the Rovers after the instructions, the same string as str(rovers)
+        after rovers.execute, e.g. 2:3:N or O:0:2:N if it found an obstacle. The trie is walked while its labels
+        match the instructions; an edge matched only in part is split at the end of the match; and the rest of the
+        instructions is run from the state of the last node and stored as a new leaf.
+
+        :param instructions: These are the instructions, without the repeat syntax
+        :type instructions: string
+        :param grid: This is the grid
+        :type grid: Grid
+        :param obstacles: These are the obstacles
+        :type obstacles: Obstacles
+        :param start: This is the initial state (x, y, direction) of the Rovers
+        :type start: tuple
+        :return: final state
+        :rtype: string
+        """
+        if '(' in instructions or ')' in instructions:
+            raise InstructionSyntaxError('The repeat syntax is not allowed in the result cache')
+        node, position = self.__context(grid, obstacles, start), 0
+        simulated = 0
+        while node.state[3] and position < len(instructions):
+            child = node.children.get(instructions[position])
+            if child is None:
+                break
+            common = _common_prefix(child.label, instructions, position)
+            if common < len(child.label):
+                node = self.__split(child, common, grid, obstacles)
+                simulated += common
+                position += common
+                break
+            node, position = child, position + common
+        if node.state[3] and position < len(instructions):
+            remaining = instructions[position:]
+            node = self.__insert(node, remaining, self.__simulate(node.state, remaining, grid, obstacles))
+            simulated += len(remaining)
+        reused = len(instructions) - simulated
+        self._counts['hits' if simulated == 0 else 'partial_hits' if reused else 'misses'] += 1
+        self._counts['reused'] += reused
+        self._counts['simulated'] += simulated
+        self._lru[node] = None
+        self._lru.move_to_end(node)
+        self.__evict()
+        x, y, direction, can_move = node.state
+        return f'{x}:{y}:{direction}' if can_move else f'O:{x}:{y}:{direction}'
+
+    def stats(self) -> dict:
+        """
+        This method returns the statistics of the cache: number of queries, hits (nothing run), partial hits
+        (run after a cached prefix), misses, hit rate (hits and partial hits per query), commands reused and
+        simulated, evicted leaves, invalidated contexts, and the size: contexts, nodes, characters and bytes (approximate).
+
+        :return: statistics
+        :rtype: dict
+        """
+        queries = self._counts['hits'] + self._counts['partial_hits'] + self._counts['misses']
+        return {'queries': queries, 'hits': self._counts['hits'], 'partial_hits': self._counts['partial_hits'],
+                'misses': self._counts['misses'],
+                'hit_rate': (self._counts['hits'] + self._counts['partial_hits']) / queries if queries else 0.0,
+                'reused': self._counts['reused'], 'simulated': self._counts['simulated'],
+                'evictions': self._counts['evictions'], 'invalidations': self._counts['invalidations'],
+                'contexts': len(self._contexts), 'nodes': self._nodes, 'characters': self._characters,
+                'bytes': self._characters + self._nodes * (_NODE_BYTES + sys.getsizeof(''))}
+
+    def __context(self, grid:Grid, obstacles:Obstacles, start:tuple) -> _Node:
+        """
+        This method returns the root of the trie of a context, created if it does not exist. If the obstacles
+        changed since their fingerprint was computed, the tries of the old fingerprint are dropped.
+
+        :param grid: This is the grid
+        :type grid: Grid
+        :param obstacles: These are the obstacles
+        :type obstacles: Obstacles
+        :param start: This is the initial state (x, y, direction) of the Rovers
+        :type start: tuple
+        :return: the root
+        :rtype: _Node
+        """
+        version, fingerprint = self._fingerprints.get(obstacles, (None, None))
+        if version != obstacles.version:
+            if fingerprint is not None:
+                for key in [key for key in self._contexts if key[1] == fingerprint]:
+                    self.__drop(key)
+                    self._counts['invalidations'] += 1
+            positions = np.array(sorted(obstacles.get_obstacles_positions()), dtype=np.int64)
+            fingerprint = hashlib.blake2b(positions.tobytes(), digest_size=16).hexdigest()
+            self._fingerprints[obstacles] = (obstacles.version, fingerprint)
+        x, y, direction = start
+        if direction not in HEADINGS:
+            raise DirectionNotFoundError(f'The direction {direction} does not exist. Choose one of these: {", ".join(HEADINGS)}')
+        key = (grid.shape, fingerprint, (int(x), int(y), direction))
+        if key not in self._contexts:
+            self._contexts[key] = _Node('', (int(x), int(y), direction, True), None, key)
+            if len(self._contexts) > self._max_contexts:
+                self.__drop(next(iter(self._contexts)))
+        self._contexts.move_to_end(key)
+        return self._contexts[key]
+
+    def __simulate(self, state:tuple, instructions:str, grid:Grid, obstacles:Obstacles) -> tuple:
+        """
+        This method runs instructions from a state with Rovers.execute.
+
+        :param state: This is the state (x, y, direction, can move)
+        :type state: tuple
+        :param instructions: These are the instructions
+        :type instructions: string
+        :param grid: This is the grid
+        :type grid: Grid
+        :param obstacles: These are the obstacles
+        :type obstacles: Obstacles
+        :return: the final state
+        :rtype: tuple
+        """
+        rovers = Rovers.from_state(*state, History('off'), self._instrumentation)
+        rovers.execute(instructions, grid, obstacles)
+        x, y = rovers.position
+        return int(x), int(y), rovers.direction, rovers.can_move()
+
+    def __insert(self, parent:_Node, label:str, state:tuple) -> _Node:
+        """
+        This method adds a new node to the trie.
+
+        :param parent: This is the parent
+        :type parent: _Node
+        :param label: This is the label of the edge from the parent
+        :type label: string
+        :param state: This is the state of the new node
+        :type state: tuple
+        :return: the new node
+        :rtype: _Node
+        """
+        node = _Node(label, state, parent, parent.context)
+        parent.children[label[0]] = node
+        self._characters += len(label)
+        self._nodes += 1
+        return node
+
+    def __split(self, child:_Node, common:int, grid:Grid, obstacles:Obstacles) -> _Node:
+        """
+        This method splits the edge of a node after its first common commands, adding the node in the middle.
+
+        :param child: This is the node whose edge is split
+        :type child: _Node
+        :param common: This is the number of commands of the label before the new node
+        :type common: integer
+        :param grid: This is the grid
+        :type grid: Grid
+        :param obstacles: These are the obstacles
+        :type obstacles: Obstacles
+        :return: the new node
+        :rtype: _Node
+        """
+        parent, label = child.parent, child.label
+        middle = _Node(label[:common], self.__simulate(parent.state, label[:common], grid, obstacles), parent, child.context)
+        parent.children[label[0]] = middle
+        child.label, child.parent = label[common:], middle
+        middle.children[child.label[0]] = child
+        self._nodes += 1
+        return middle
+
+    def __evict(self) -> None:
+        """
+        This method removes the least recently used leaves while the labels have too many commands.
+        """
+        while self._characters > self._max_characters and self._lru:
+            node, _ = self._lru.popitem(last=False)
+            if node.children or node.parent is None or node.context not in self._contexts:
+                continue #not a leaf: it is added again when its last child is removed
+            parent = node.parent
+            del parent.children[node.label[0]]
+            self._characters -= len(node.label)
+            self._nodes -= 1
+            self._counts['evictions'] += 1
+            if not parent.children and parent.parent is not None:
+                self._lru[parent] = None
+                self._lru.move_to_end(parent, last=False)
+
+    def __drop(self, key:tuple) -> None:
+        """
+        This method removes the trie of a context.
+
+        :param key: This is the key of the context
+        :type key: tuple
+        """
+        stack = list(self._contexts.pop(key).children.values())
+        while stack:
+            node = stack.pop()
+            stack.extend(node.children.values())
+            self._lru.pop(node, None)
+            self._characters -= len(node.label)
+            self._nodes -= 1
+
+
+def _common_prefix(label:str, instructions:str, position:int) -> int:
+    """
+    This function returns the length of the common prefix of a label and the instructions from a position.
+    It is a binary search with startswith, so the characters are compared in C instead of one by one in python.
+
+    :param label: This is the label
+    :type label: string
+    :param instructions: These are the instructions
+    :type instructions: string
+    :param position: This is the position in the instructions
+    :type position: integer
+    :return: length of the common prefix
+    :rtype: integer
+    """
+    if instructions.startswith(label, position):
+        return len(label)
+    low, high = 0, min(len(label), len(instructions) - position) #low always matches
+    while low < high:
+        middle = (low + high + 1) // 2
+        if instructions.startswith(label[:middle], position):
+            low = middle
+        else:
+            high = middle - 1
+    return low
@@ -0,0 +1,270 @@
+import os
+import queue
+import struct
+import threading
+import numpy as np
+from mars import HEADINGS, Grid, Rovers, Obstacles
+from history import History, HISTORY_MODES
+from errors import CheckpointError, InstructionSyntaxError
+
+"""
+This module contains the checkpoints of the missions of the Rovers, so a long mission that is
+interrupted can be resumed instead of run again. A checkpoint at path is made of three files:
+
+    path            the state: position, direction, can move flag, instructions consumed (offset),
+                    history mode and number of steps, and the grid. It is small and it is
+                    replaced atomically at every checkpoint.
+    path.history    the kept positions of the history as int32 pairs. It is append only: every
+                    checkpoint only writes the positions recorded since the previous one.
+    path.obstacles  the obstacles, as an obstacle map file (see mapfile), written once.
+
+The checkpoints are written by a background thread while the mission goes on:
+
+    rovers = run_mission(read_instructions('mission.txt'), grid, obstacles, 'mission.ckpt')
+    rovers = resume_mission('mission.ckpt', read_instructions('mission.txt')) #after an interruption
+"""
+
+MAGIC = b'MROVCKP\x00' #first bytes of every state file
+VERSION = 1
+_STATE = struct.Struct('<8sHBBBB2xqqQQQQQQQ') #magic, version, heading, can move, sparse, history mode,
+                                               #x, y, offset, total steps, history rows, every, last, m, n
+_EVERY = 1 << 20 #instructions run between two checkpoints
+
+
+class Checkpointer:
+    """
+    This is the Checkpointer class. It writes the checkpoints of a mission in a background thread.
+    The caller only copies the state and the positions recorded since the previous checkpoint, so
+    the cost of a checkpoint does not grow with the length of the mission.
+    """
+    def __init__(self, path:str, rovers:Rovers, grid:Grid, obstacles:Obstacles, resume:bool = False) -> None:
+        """
+        This is the constructor of the Checkpointer class. Unless it resumes a checkpoint, the obstacles
+        are saved and the history file is created.
+
+        :param path: This is the path of the state file of the checkpoint
+        :type path: string
+        :param rovers: This is the rovers of the mission
+        :type rovers: Rovers
+        :param grid: This is the grid of the mission
+        :type grid: Grid
+        :param obstacles: These are the obstacles of the mission, they must not change
+        :type obstacles: Obstacles
+        :param resume: This is True to continue the checkpoint of a resumed mission
+        :type resume: bool
+        """
+        self._path = str(path)
+        self._rovers = rovers
+        self._grid = grid
+        history = rovers.history
+        if resume:
+            _, _, _, rows = read_state(self._path)
+            with open(self._path + '.history', 'r+b') as file:
+                file.truncate(rows * 8) #positions appended after the last checkpoint are dropped
+        else:
+            obstacles.save(self._path + '.obstacles', grid)
+            open(self._path + '.history', 'wb').close()
+            rows = 0
+        self._rows = rows #rows of the history file
+        self._saved_total = history.total if resume else 0 #steps of the history already saved
+        self._saved_kept = len(history) if resume else 0 #kept positions already saved, except in ring mode
+        self._jobs = queue.Queue(maxsize=2) #the mission waits if the writer falls behind
+        self._error = None
+        self._thread = threading.Thread(target=self.__write_jobs, daemon=True)
+        self._thread.start()
+
+    def checkpoint(self, offset:int) -> None:
+        """
+        This method takes a checkpoint of the current state and hands it to the background thread.
+
+        :param offset: This is the number of instructions consumed
+        :type offset: integer
+        """
+        if self._error is not None:
+            raise self._error
+        history = self._rovers.history
+        total = history.total
+        if history.mode == 'off':
+            new = np.zeros((0, 2), dtype=np.int32)
+        elif history.mode == 'ring':
+            new = history.positions()[len(history) - min(total - self._saved_total, len(history)):]
+        else:
+            new = history.positions()[self._saved_kept:]
+            self._saved_kept += len(new)
+        new = np.array(new, dtype=np.int32) #copied, the history goes on
+        self._saved_total = total
+        self._rows += len(new)
+        x, y = self._rovers.position
+        m, n = self._grid.shape
+        state = _STATE.pack(MAGIC, VERSION, HEADINGS.index(self._rovers.direction), self._rovers.can_move(),
+                            self._grid.sparse, HISTORY_MODES.index(history.mode), int(x), int(y), offset, total,
+                            self._rows, history.every, history.last or 0, m, n)
+        self._jobs.put((state, new))
+
+    def close(self) -> None:
+        """
+        This method waits until all the checkpoints are written and stops the background thread.
+        """
+        self._jobs.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __write_jobs(self) -> None:
+        """
+        This method is the background thread. It appends the new positions to the history file and
+        then replaces the state file, so the state never refers to positions that are not on disk.
+        """
+        while (job := self._jobs.get()) is not None:
+            if self._error is not None:
+                continue
+            state, new = job
+            try:
+                with open(self._path + '.history', 'ab') as file:
+                    file.write(new.tobytes())
+                    file.flush()
+                    os.fsync(file.fileno())
+                with open(self._path + '.tmp', 'wb') as file:
+                    file.write(state)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(self._path + '.tmp', self._path)
+            except OSError as exception:
+                self._error = exception
+
+
+def read_state(path:str) -> tuple:
+    """
+    This function reads the state file of a checkpoint.
+
+    :param path: This is the path of the state file
+    :type path: string
+    :return: the state (dictionary), the grid, the offset and the number of rows of the history file
+    :rtype: tuple
+    """
+    with open(path, 'rb') as file:
+        data = file.read(_STATE.size)
+    if len(data) < _STATE.size or data[:len(MAGIC)] != MAGIC:
+        raise CheckpointError(f'{path} is not a checkpoint')
+    magic, version, heading, can_move, sparse, mode, x, y, offset, total, rows, every, last, m, n = _STATE.unpack(data)
+    if version != VERSION:
+        raise CheckpointError(f'{path} has version {version}, that is not supported')
+    state = {'x': x, 'y': y, 'direction': HEADINGS[heading], 'can_move': bool(can_move), 'mode': HISTORY_MODES[mode],
+             'every': every, 'last': last, 'total': total}
+    return state, Grid(m, n, bool(sparse)), offset, rows
+
+
+def load_checkpoint(path:str, history:History = None) -> tuple:
+    """
+    This function loads the last checkpoint of a mission.
+
+    :param path: This is the path of the state file of the checkpoint
+    :type path: string
+    :param history: This is an empty history where the positions are restored. By default a new one with
+        the mode of the checkpoint (in mmap mode its file is path.positions)
+    :type history: History
+    :return: the rovers, the grid, the obstacles and the number of instructions consumed
+    :rtype: tuple
+    """
+    path = str(path)
+    state, grid, offset, rows = read_state(path)
+    if history is None:
+        history = History(state['mode'], state['every'], state['last'] or 1000, path + '.positions')
+    positions = np.memmap(path + '.history', dtype=np.int32, mode='r', shape=(rows, 2)) if rows else np.zeros((0, 2), np.int32)
+    if history.mode == 'ring':
+        positions = positions[len(positions) - min(len(positions), history.last):]
+    history.restore(positions, state['total'])
+    rovers = Rovers.from_state(state['x'], state['y'], state['direction'], state['can_move'], history)
+    return rovers, grid, Obstacles.load(path + '.obstacles'), offset
+
+
+def _skip(instructions, offset:int):
+    """
+    This function skips the first instructions of a string or an iterable of chunks.
+
+    :param instructions: These are the instructions
+    :type instructions: string or iterable of strings
+    :param offset: This is the number of instructions skipped
+    :type offset: integer
+    :return: generator of chunks of the instructions left
+    :rtype: generator of strings
+    """
+    for chunk in ([instructions] if isinstance(instructions, str) else instructions):
+        if offset >= len(chunk):
+            offset -= len(chunk)
+            continue
+        yield chunk[offset:]
+        offset = 0
+
+
+def run_mission(instructions, grid:Grid, obstacles:Obstacles, path:str, rovers:Rovers = None,
+                every:int = _EVERY, offset:int = 0, resume:bool = False) -> Rovers:
+    """
+    This function runs a mission taking a checkpoint at the start, every few instructions, when the
+    rovers finds an obstacle and at the end. The repeat syntax is not allowed, as in streamed instructions.
+
+    :param instructions: These are the instructions, a string or an iterable of chunks (e.g. program.read_instructions)
+    :type instructions: string or iterable of strings
+    :param grid: This is the grid of the mission
+    :type grid: Grid
+    :param obstacles: These are the obstacles of the mission
+    :type obstacles: Obstacles
+    :param path: This is the path of the state file of the checkpoint
+    :type path: string
+    :param rovers: This is the rovers, by default a new one
+    :type rovers: Rovers
+    :param every: This is the number of instructions run between two checkpoints
+    :type every: integer
+    :param offset: This is the number of instructions already consumed by a resumed mission
+    :type offset: integer
+    :param resume: This is True if the mission is resumed from the checkpoint at path, see resume_mission
+    :type resume: bool
+    :return: the rovers
+    :rtype: Rovers
+    """
+    rovers = Rovers() if rovers is None else rovers
+    checkpointer = Checkpointer(path, rovers, grid, obstacles, resume)
+    since = 0 #instructions run since the last checkpoint
+    try:
+        if not resume:
+            #the start is checkpointed, so a mission interrupted before the first interval is resumed from the start
+            checkpointer.checkpoint(offset)
+        for chunk in ([instructions] if isinstance(instructions, str) else instructions):
+            if '(' in chunk or ')' in chunk:
+                raise InstructionSyntaxError('The repeat syntax is not allowed in missions with checkpoints')
+            start = 0
+            while start < len(chunk) and rovers.can_move():
+                piece = chunk[start:start + every - since]
+                rovers.execute(piece, grid, obstacles)
+                start += len(piece)
+                offset += len(piece)
+                since += len(piece)
+                if since >= every or not rovers.can_move():
+                    checkpointer.checkpoint(offset)
+                    since = 0
+            if not rovers.can_move():
+                break
+        checkpointer.checkpoint(offset)
+    finally:
+        checkpointer.close()
+    return rovers
+
+
+def resume_mission(path:str, instructions, every:int = _EVERY, history:History = None) -> Rovers:
+    """
+    This function resumes a mission from its last checkpoint. The instructions are the ones of the
+    whole mission, the ones consumed before the checkpoint are skipped.
+
+    :param path: This is the path of the state file of the checkpoint
+    :type path: string
+    :param instructions: These are the instructions of the whole mission
+    :type instructions: string or iterable of strings
+    :param every: This is the number of instructions run between two checkpoints
+    :type every: integer
+    :param history: This is an empty history where the positions are restored, see load_checkpoint
+    :type history: History
+    :return: the rovers
+    :rtype: Rovers
+    """
+    rovers, grid, obstacles, offset = load_checkpoint(path, history)
+    return run_mission(_skip(instructions, offset), grid, obstacles, path, rovers, every, offset, resume=True)
@@ -4,5 +4,19 @@ the Mars Rovers behavior and the size of the grid it will move.
 """
 
 NUMBER_OF_OBSTACLES = 5
+OBSTACLES_SEED = None #SEED FOR THE RANDOM OBSTACLES, None FOR DIFFERENT OBSTACLES IN EVERY RUN
 GRID_SIZE = 10 #SQUARED GRID (N,N)
-DRAW_PATH = True
\ No newline at end of file
+DRAW_PATH = True
+DRAW_OUTPUT = None #None TO SHOW THE DRAW IN A WINDOW, A .png OR .svg PATH TO SAVE IT WITHOUT WINDOW
+MAX_PATH_SEGMENTS = 10000 #LONGER PATHS ARE DOWNSAMPLED WHEN DRAWN
+MAX_IMAGE_SIZE = 2000 #BIGGER GRIDS ARE AGGREGATED WHEN DRAWING THE OBSTACLES
+HISTORY_MODE = 'full' #POSITIONS KEPT: off, full, sample, ring OR mmap
+HISTORY_EVERY = 10 #SAMPLE MODE KEEPS ONE POSITION EVERY HISTORY_EVERY STEPS
+HISTORY_LAST = 10000 #RING MODE KEEPS THE LAST HISTORY_LAST STEPS
+HISTORY_FILE = 'rovers_history.bin' #MMAP MODE WRITES THE POSITIONS TO THIS FILE
+INSTRUCTIONS_FILE = None #None TO WRITE THE INSTRUCTIONS IN THE TERMINAL, A PATH OR - (STDIN) TO STREAM THEM
+INSTRUCTIONS_CHUNK_SIZE = 65536 #CHARACTERS READ AT ONCE WHEN STREAMING THE INSTRUCTIONS
+INSTRUMENTATION = False #True TO PRINT THE COUNTERS OF THE MOVES AND THE TIME OF EVERY PHASE AT THE END
+LIVE_VIEW = False #True TO DRAW THE PATH WHILE THE ROVERS MOVES INSTEAD OF AT THE END
+LIVE_FPS = 10 #MAXIMUM FRAMES PER SECOND OF THE LIVE VIEW
+LIVE_OUTPUT = None #None TO SHOW THE LIVE VIEW IN A WINDOW, A .gif OR A DIRECTORY TO RECORD ITS FRAMES WITHOUT WINDOW
@@ -1,57 +1,589 @@
+import os
+import time
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
-import math
-from config import NUMBER_OF_OBSTACLES, GRID_SIZE, DRAW_PATH
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.colors import ListedColormap
+from matplotlib.figure import Figure
+from config import MAX_PATH_SEGMENTS, MAX_IMAGE_SIZE, LIVE_FPS
+from mars import HEADINGS, HEADING_VECTORS
+from history import History
 import warnings
 #removing UserWarnings
 warnings.filterwarnings("ignore")
 
+_CHUNK = 1 << 20 #positions of a path read at once to find its wrap arounds
 
-def draw_rovers_path(rovers_positions:list, title:str, random_obstacles:list) -> None:
+
+def split_wrap_arounds(rovers_positions:np.array, max_segments:int = MAX_PATH_SEGMENTS, shape:tuple[int] = None,
+                       headings:np.array = None) -> tuple:
+    """
+    This function splits the arrows of the path in normal walking arrows and wrap around arrows (the ones
+    that jump from one side of the grid to the other). If there are more than max_segments arrows, the path
+    is downsampled: it is cut in pieces at the wrap arounds and every piece is simplified keeping its ends and
+    one position every few steps, so the shape of the path is kept with a bounded number of segments.
+    An arrow is a wrap around when it does not go in the direction of its move (if the headings are given),
+    else when it crosses the whole grid (if the shape is given) or else when it is longer than one cell. In a
+    side of 2 cells a wrap around is one cell long like a step, so only the headings tell them apart.
+
+    :param rovers_positions: These are the arrows of the path, with shape (n, 2, 2): start and end of every arrow
+    :type rovers_positions: numpy array object
+    :param max_segments: This is the maximum number of segments of every kind
+    :type max_segments: integer
+    :param shape: This is the shape of the grid (m, n)
+    :type shape: tuple of integers
+    :param headings: This is the heading index (see mars.HEADINGS) of the move of every arrow
+    :type headings: numpy array object
+    :return: normal walking segments and wrap around segments
+    :rtype: tuple of numpy array objects
+    """
+    segments = np.asarray(rovers_positions, dtype=float).reshape(-1, 2, 2)
+    wraps = _wraps(segments[:, 1] - segments[:, 0], shape, headings)
+    if len(segments) <= max_segments:
+        return segments[~wraps], segments[wraps]
+    return _downsample(np.concatenate((segments[:, 0], segments[-1:, 1])), wraps, max_segments, 0)
+
+
+def split_path(positions, max_segments:int = MAX_PATH_SEGMENTS, shape:tuple[int] = None, headings:np.array = None) -> tuple:
+    """
+    This function splits the path of the positions of a history like split_wrap_arounds, without building
+    the arrows of the whole path: the wrap arounds are found reading the int32 positions in chunks and only
+    the segments that are drawn are created (as floats, at the centers of the cells).
+
+    :param positions: These are the positions of the path, with shape (k, 2), e.g. a History
+    :type positions: History or numpy array object
+    :param max_segments: This is the maximum number of segments of every kind
+    :type max_segments: integer
+    :param shape: This is the shape of the grid (m, n)
+    :type shape: tuple of integers
+    :param headings: This is the heading index of the move of every arrow, see split_wrap_arounds
+    :type headings: numpy array object
+    :return: normal walking segments and wrap around segments
+    :rtype: tuple of numpy array objects
+    """
+    positions = positions.positions() if isinstance(positions, History) else np.asarray(positions).reshape(-1, 2)
+    wraps = np.zeros(max(len(positions) - 1, 0), dtype=bool)
+    for start in range(0, len(wraps), _CHUNK):
+        delta = np.diff(np.asarray(positions[start:start + _CHUNK + 1], dtype=np.int64), axis=0)
+        wraps[start:start + len(delta)] = _wraps(delta, shape, None if headings is None else headings[start:start + len(delta)])
+    return _downsample(positions, wraps, max_segments, .5)
+
+
+def _wraps(delta:np.array, shape:tuple[int], headings:np.array) -> np.array:
+    """
+    This function finds the wrap arounds of the arrows of a path, see split_wrap_arounds.
+
+    :param delta: This is the change of the coordinates of every arrow, with shape (n, 2)
+    :type delta: numpy array object
+    :param shape: This is the shape of the grid (m, n), or None
+    :type shape: tuple of integers
+    :param headings: This is the heading index of the move of every arrow, or None
+    :type headings: numpy array object
+    :return: True for the wrap arounds
+    :rtype: numpy array object
+    """
+    if headings is not None:
+        return (delta != np.array(HEADING_VECTORS)[np.asarray(headings, dtype=np.int64)]).any(axis=1)
+    if shape is not None:
+        sides = np.array(shape)
+        return ((np.abs(delta) == sides - 1) & (sides > 2)).any(axis=1)
+    return (np.abs(delta) > 1).any(axis=1)
+
+
+def _downsample(points, wraps:np.array, max_segments:int, offset:float) -> tuple:
+    """
+    This function returns the segments of a path with a bounded number of segments of every kind. One position
+    every few steps and the positions before and after every wrap around drawn are kept, and the segments between
+    kept positions are drawn only if there is no wrap around between them. Only the segments returned are converted to
+    floats.
+
+    :param points: These are the positions of the path, with shape (k, 2)
+    :type points: numpy array object
+    :param wraps: This is True for the arrows (from every position to the next one) that are wrap arounds
+    :type wraps: numpy array object
+    :param max_segments: This is the maximum number of segments of every kind
+    :type max_segments: integer
+    :param offset: This is added to the coordinates, e.g. 0.5 for the centers of the cells
+    :type offset: float
+    :return: normal walking segments and wrap around segments
+    :rtype: tuple of numpy array objects
+    """
+    def segments(starts, ends):
+        return np.stack((points[starts], points[ends]), axis=1).astype(float).reshape(-1, 2, 2) + offset
+
+    def bounded(indices):
+        return indices[::-(-len(indices) // max_segments)] if len(indices) > max_segments else indices
+
+    wrap_indices = np.flatnonzero(wraps)
+    chosen = bounded(wrap_indices)
+    if len(wraps) <= max_segments:
+        walk = np.flatnonzero(~wraps)
+        return segments(walk, walk + 1), segments(chosen, chosen + 1)
+    kept = np.unique(np.concatenate((np.arange(0, len(points), -(-len(points) // max_segments)),
+                                     chosen, chosen + 1, [len(points) - 1])))
+    piece = np.searchsorted(wrap_indices, kept) #number of wrap arounds before every kept position
+    same_piece = np.flatnonzero(piece[:-1] == piece[1:])
+    walk = bounded(same_piece)
+    return segments(kept[walk], kept[walk + 1]), segments(chosen, chosen + 1)
+
+
+def obstacles_image(random_obstacles, shape:tuple[int], max_size:int = MAX_IMAGE_SIZE) -> np.array:
+    """
+    This function creates the image of the obstacles of the grid, one pixel per cell. Grids bigger
+    than max_size are aggregated: a pixel is set if there is any obstacle in the cells it covers.
+
+    :param random_obstacles: These are the positions of the obstacles
+    :type random_obstacles: list of tuples or numpy array object
+    :param shape: This is the shape of the grid (m, n)
+    :type shape: tuple of integers
+    :param max_size: This is the maximum number of pixels of every side of the image
+    :type max_size: integer
+    :return: boolean image with shape (pixels in y, pixels in x)
+    :rtype: numpy array object
+    """
+    m, n = shape
+    positions = np.asarray(random_obstacles, dtype=float).reshape(-1, 2)
+    counts, _, _ = np.histogram2d(positions[:, 0], positions[:, 1], bins=(min(m, max_size), min(n, max_size)), range=((0, m), (0, n)))
+    return counts.T > 0
+
+
+def move_headings(instructions, moves:int, first:int = 0, direction:str = 'N') -> np.array:
+    """
+    This function returns the heading of some consecutive moves of the instructions, for split_wrap_arounds.
+    The instructions are read chunk by chunk and only the headings of the moves asked are kept.
+
+    :param instructions: These are the instructions without the repeat syntax, a string or an iterable of
+        chunks (e.g. program.iter_instructions)
+    :type instructions: string or iterable of strings
+    :param moves: This is the number of moves, e.g. the arrows of the path
+    :type moves: integer
+    :param first: This is the number of moves skipped, e.g. the steps that a ring history does not keep
+    :type first: integer
+    :param direction: This is the initial direction of the rovers
+    :type direction: string
+    :return: heading index of every move
+    :rtype: numpy array object
+    """
+    headings = np.zeros(moves, dtype=np.int8)
+    heading, seen = HEADINGS.index(direction), 0 #moves of the previous chunks
+    for chunk in ([instructions] if isinstance(instructions, str) else instructions):
+        if seen >= first + moves:
+            break
+        commands = np.frombuffer(chunk.encode(), dtype=np.uint8)
+        turns = np.where(commands == ord('R'), 1, np.where(commands == ord('L'), 3, 0))
+        chunk_headings = (heading + np.cumsum(turns)) % 4
+        heading = int(chunk_headings[-1]) if len(chunk_headings) else heading
+        found = chunk_headings[commands == ord('M')]
+        low, high = max(first - seen, 0), min(first + moves - seen, len(found)) #moves of the chunk that are asked
+        if high > low:
+            headings[seen + low - first:seen + high - first] = found[low:high]
+        seen += len(found)
+    return headings
+
+
+def draw_rovers_path(rovers_positions, title:str, random_obstacles, grid, output:str = None, max_segments:int = MAX_PATH_SEGMENTS,
+                     headings:np.array = None):
     """
     This method draws the path that the rovers followed during its exploration. It draws the path, the obstacles
-    present in the grid and the wrap around (with blue line) if the mars rovers drops outside the grid. 
-
-    :param rovers_positions: These are the vectors defining the positions that mars rovers has walked. 
-    :type rovers_positions: list
-    """
-
-    _, ax = plt.subplots()
-    min_val, max_val = 0, GRID_SIZE
-    ind_array = np.arange(0, GRID_SIZE, 1.0)
-    x, y = np.meshgrid(ind_array, ind_array)
-    for _, (x_val, y_val) in enumerate(zip(x.flatten(), y.flatten())):
-        ax.text(x_val, y_val, '', va='center', ha='center')
-
-    #setting the x and y axis    
-    ax.set_xlim(min_val, max_val)
-    ax.set_ylim(min_val, max_val)
-    ax.set_xticks(np.arange(max_val))
-    ax.set_yticks(np.arange(max_val))
-
-    #Creating black arrows for normal walking and blue arrows for wrapping around
-    for elem in rovers_positions:
-        dist = math.sqrt( (elem[1][0] - elem[0][0])**2 + (elem[1][1] - elem[0][1])**2 )
-        if(dist >= max_val-1):
-            ax.annotate("", elem[0], elem[1],label='arrow' , arrowprops={'arrowstyle':'<->', 'shrinkA': 0, 'shrinkB': 0, 'color' :'blue'})
-        else:
-            ax.annotate("", elem[0], elem[1], arrowprops={'arrowstyle':'<->', 'shrinkA': 0, 'shrinkB': 0})
-    
+    present in the grid and the wrap around (with blue line) if the mars rovers drops outside the grid. The path is
+    drawn with two line collections and the obstacles with a single image, so long paths and big grids are fast
+    to render. If output is given the figure is rendered without any window (Agg) and saved to that file, the
+    format (png, svg...) is taken from its extension.
+
+    :param rovers_positions: These are the arrows of the path that mars rovers has walked, with shape (n, 2, 2), or
+        its history, that is split with split_path without building all the arrows
+    :type rovers_positions: numpy array object or History
+    :param title: This is the final state of the rovers
+    :type title: string
+    :param random_obstacles: These are the positions of the obstacles
+    :type random_obstacles: list of tuples or numpy array object
+    :param grid: This is the grid where the rovers has walked
+    :type grid: Grid
+    :param output: This is the path of the file where the figure is saved. If None the figure is shown
+    :type output: string
+    :param max_segments: This is the maximum number of segments drawn, longer paths are downsampled
+    :type max_segments: integer
+    :param headings: This is the heading index of the move of every arrow, see move_headings. If None the wrap
+        arounds are found with the shape of the grid
+    :type headings: numpy array object
+    :return: the figure
+    :rtype: matplotlib Figure
+    """
+    if output is None:
+        fig, ax = plt.subplots()
+    else:
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+    m, n = grid.shape
+
+    #setting the x and y axis
+    ax.set_xlim(0, m)
+    ax.set_ylim(0, n)
+    if max(m, n) <= 50:
+        ax.set_xticks(np.arange(m))
+        ax.set_yticks(np.arange(n))
+
     #plotting the obstacles given the random obstacles positions
-    if(NUMBER_OF_OBSTACLES > 0):
-        for random_obstacle in random_obstacles:
-            x1 = random_obstacle[0]
-            x2 = x1 + 1
-            y2 = random_obstacle[1]
-            y1 = y2 + 1
-            ax.fill_between(x=[x1,x2], y1=[y1], y2=[y2], facecolor ='green')
-    
+    if len(random_obstacles) > 0:
+        image = obstacles_image(random_obstacles, grid.shape)
+        ax.imshow(image, origin='lower', extent=(0, m, 0, n), cmap=ListedColormap([(0, 0, 0, 0), 'green']),
+                  interpolation='nearest', aspect='auto', vmin=0, vmax=1)
+
+    #Creating black lines for normal walking and blue lines for wrapping around
+    if isinstance(rovers_positions, History):
+        walk_segments, wrap_segments = split_path(rovers_positions, max_segments, grid.shape, headings)
+    else:
+        walk_segments, wrap_segments = split_wrap_arounds(rovers_positions, max_segments, grid.shape, headings)
+    ax.add_collection(LineCollection(walk_segments, colors='black'))
+    ax.add_collection(LineCollection(wrap_segments, colors='blue'))
+
     #Setting title, drawing grid, creating the legend and plotting
     ax.set_title(f'Final position: {title}')
     ax.grid()
     green_patch = mpatches.Patch(color='green', label='Obstacles')
-    blue_patch = mpatches.Patch((0, 0), (1, 0), color='blue', label='Wrap around')
-    black_patch = mpatches.Patch((0, 0), (1, 0), color='black', label='Rovers path')
-    plt.legend(handles=[green_patch, blue_patch, black_patch])
-    plt.show()
\ No newline at end of file
+    blue_patch = mpatches.Patch(color='blue', label='Wrap around')
+    black_patch = mpatches.Patch(color='black', label='Rovers path')
+    ax.legend(handles=[green_patch, blue_patch, black_patch])
+    if output is None:
+        plt.show()
+    else:
+        fig.savefig(output)
+    return fig
+
+
+def draw_heatmap(heatmap:np.array, title:str, grid, random_obstacles = (), output:str = None):
+    """
+    This method draws the visits of every cell as a single image, e.g. the one returned by analytics.Coverage.heatmap.
+    The cells never visited are transparent and the obstacles are drawn on top in green. If output is given the
+    figure is rendered without any window (Agg) and saved to that file.
+
+    :param heatmap: This is the image of the visits, with shape (pixels in y, pixels in x)
+    :type heatmap: numpy array object
+    :param title: This is the final state of the rovers
+    :type title: string
+    :param grid: This is the grid where the rovers has walked
+    :type grid: Grid
+    :param random_obstacles: These are the positions of the obstacles
+    :type random_obstacles: list of tuples or numpy array object
+    :param output: This is the path of the file where the figure is saved. If None the figure is shown
+    :type output: string
+    :return: the figure
+    :rtype: matplotlib Figure
+    """
+    if output is None:
+        fig, ax = plt.subplots()
+    else:
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+    m, n = grid.shape
+    ax.set_xlim(0, m)
+    ax.set_ylim(0, n)
+    image = ax.imshow(np.ma.masked_equal(heatmap, 0), origin='lower', extent=(0, m, 0, n), cmap='viridis',
+                      interpolation='nearest', aspect='auto')
+    fig.colorbar(image, ax=ax, label='Visits')
+    if len(random_obstacles) > 0:
+        ax.imshow(obstacles_image(random_obstacles, grid.shape), origin='lower', extent=(0, m, 0, n),
+                  cmap=ListedColormap([(0, 0, 0, 0), 'green']), interpolation='nearest', aspect='auto', vmin=0, vmax=1)
+    ax.set_title(f'Visits, final position: {title}')
+    if output is None:
+        plt.show()
+    else:
+        fig.savefig(output)
+    return fig
+
+
+def jump_segments(x:int, y:int, direction:str, steps:int, shape:tuple[int]) -> tuple[list]:
+    """
+    This function returns the segments of a straight jump of the rovers from (x, y), split in walking segments
+    and wrap around segments like split_wrap_arounds (the points are the centers of the cells). A jump longer than
+    the grid covers the whole row or column, so only its last lap is split.
+
+    :param x: x coordinate where the jump starts
+    :type x: integer
+    :param y: y coordinate where the jump starts
+    :type y: integer
+    :param direction: This is the direction of the jump (N, E, S, W)
+    :type direction: string
+    :param steps: This is the number of cells walked
+    :type steps: integer
+    :param shape: This is the shape of the grid (m, n)
+    :type shape: tuple of integers
+    :return: walking segments and wrap around segments, as lists of ((x0, y0), (x1, y1))
+    :rtype: tuple of lists
+    """
+    dx, dy = HEADING_VECTORS[HEADINGS.index(direction)]
+    period, forward = (shape[0], dx) if dx else (shape[1], dy)
+    position, other = (x, y) if dx else (y, x)
+    point = (lambda c: (c + .5, other + .5)) if dx else (lambda c: (other + .5, c + .5))
+    if steps > period:
+        steps = period + steps % period #same end, the whole line is covered
+    walk, wrap = [], []
+    while steps > 0:
+        walked = min(steps, period - 1 - position if forward > 0 else position) #cells until the edge
+        if walked:
+            walk.append((point(position), point(position + forward * walked)))
+            position += forward * walked
+            steps -= walked
+        if steps:
+            edge = 0 if forward > 0 else period - 1
+            wrap.append((point(position), point(edge)))
+            position = edge
+            steps -= 1
+    return walk, wrap
+
+
+def polyline(segments:np.array) -> tuple[np.array]:
+    """
+    This function joins segments into a single line separated by NaN, that is drawn as one path instead of one path per segment.
+
+    :param segments: These are the segments, with shape (n, 2, 2)
+    :type segments: numpy array object
+    :return: x and y coordinates of the line
+    :rtype: tuple of numpy array objects
+    """
+    points = np.full((len(segments), 3, 2), np.nan)
+    points[:, :2] = segments
+    return points[:, :, 0].ravel(), points[:, :, 1].ravel()
+
+
+class LivePath:
+    """
+    This is the LivePath class. It draws the path of the rovers while the mission runs, fed with the events of
+    Rovers.run_iter. Feeding an event only stores its jump, and the figure is redrawn at most fps times per
+    second however fast the events arrive, so the simulation is not slowed down by the rendering. Every frame
+    only draws the segments added since the previous one (blitting): they are drawn on top of a saved copy of
+    the figure, which is saved again with them. If output is given the frames are recorded without any window,
+    to a .gif file or to a directory of png frames, and they are encoded and written in a background thread:
+
+        live = LivePath(grid, obstacles, output='mission.gif')
+        for event in live.follow(rovers.run_iter(instructions, grid, obstacles)):
+            pass
+        live.close(str(rovers))
+    """
+    def __init__(self, grid, obstacles = None, start:tuple = (0, 0, 'N'), fps:float = LIVE_FPS, output:str = None,
+                 max_segments:int = MAX_PATH_SEGMENTS, clock = time.perf_counter) -> None:
+        """
+        This is the constructor of the LivePath class. It draws the grid and the obstacles.
+
+        :param grid: This is the grid where the rovers walks
+        :type grid: Grid
+        :param obstacles: These are the obstacles of the grid
+        :type obstacles: Obstacles
+        :param start: This is the initial state (x, y, direction) of the rovers
+        :type start: tuple
+        :param fps: This is the maximum number of frames per second
+        :type fps: float
+        :param output: This is a .gif file or a directory where the frames are recorded. If None the path is shown in a window
+        :type output: string
+        :param max_segments: This is the maximum number of segments of every kind kept for a whole redraw, e.g. when the window is resized
+        :type max_segments: integer
+        :param clock: This is the function that returns the time in seconds
+        :type clock: function
+        """
+        self._shape = grid.shape
+        self._x, self._y = start[0], start[1]
+        self._period = 1 / fps
+        self._output = output
+        self._max_segments = max_segments
+        self._clock = clock
+        self._last_frame = float('-inf') #time of the last frame
+        self._jumps = [] #jumps (x, y, direction, steps) not drawn yet
+        self._drawn = [np.zeros((0, 2, 2)), np.zeros((0, 2, 2))] #walking and wrap around segments drawn, thinned out
+        self._gif = None #the .gif file, open while the frames are recorded
+        self._count = 0 #number of frames
+        self._writer = None if output is None else ThreadPoolExecutor(max_workers=1) #encodes the recorded frames
+        if output is None:
+            self._fig, self._ax = plt.subplots()
+        else:
+            self._fig = Figure()
+            FigureCanvasAgg(self._fig)
+            self._ax = self._fig.add_subplot()
+            if not output.endswith('.gif'):
+                os.makedirs(output, exist_ok=True)
+        m, n = self._shape
+        self._ax.set_xlim(0, m)
+        self._ax.set_ylim(0, n)
+        positions = [] if obstacles is None else obstacles.get_obstacles_positions()
+        if len(positions) > 0:
+            self._ax.imshow(obstacles_image(positions, self._shape), origin='lower', extent=(0, m, 0, n),
+                            cmap=ListedColormap([(0, 0, 0, 0), 'green']), interpolation='nearest', aspect='auto', vmin=0, vmax=1)
+        #the whole path, only drawn when the figure is redrawn, and the new segments of every frame
+        self._path = (self._ax.plot([], [], color='black')[0], self._ax.plot([], [], color='blue')[0])
+        self._new = (self._ax.plot([], [], color='black', animated=True)[0], self._ax.plot([], [], color='blue', animated=True)[0])
+        self._marker, = self._ax.plot([self._x + .5], [self._y + .5], 'ro', animated=True)
+        self._ax.set_title('Exploring...')
+        self._ax.grid()
+        self._background = None
+        self._fig.canvas.mpl_connect('draw_event', self.__on_draw)
+        self._fig.canvas.mpl_connect('resize_event', self.__on_resize)
+        if output is None:
+            plt.show(block=False)
+
+    @property
+    def frames(self) -> int:
+        """
+        This property method returns the number of frames drawn.
+
+        :return: number of frames
+        :rtype: integer
+        """
+        return self._count
+
+    def feed(self, event) -> None:
+        """
+        This method receives an event of the rovers. A move event stores its jump, and a frame is
+        drawn if the last one is older than the period of the frame rate.
+
+        :param event: This is the event, see mars.RoversEvent
+        :type event: RoversEvent
+        """
+        if event.kind == 'move':
+            self._jumps.append((self._x, self._y, event.direction, event.steps))
+            self._x, self._y = event.x, event.y
+        now = self._clock()
+        if now - self._last_frame >= self._period:
+            self._last_frame = now
+            self.draw_frame()
+
+    def follow(self, events):
+        """
+        This method feeds the events of a generator and yields them, so it can be put in the loop of a mission.
+
+        :param events: These are the events, e.g. the generator returned by Rovers.run_iter
+        :type events: iterable of RoversEvent
+        :return: generator of the same events
+        :rtype: generator of RoversEvent
+        """
+        jumps, clock, period = self._jumps, self._clock, self._period #same as feed, without a call per event
+        for event in events:
+            if event.kind == 'move':
+                jumps.append((self._x, self._y, event.direction, event.steps))
+                self._x, self._y = event.x, event.y
+            now = clock()
+            if now - self._last_frame >= period:
+                self._last_frame = now
+                self.draw_frame()
+                jumps = self._jumps
+            yield event
+
+    def draw_frame(self) -> None:
+        """
+        This method draws a frame: the saved figure is restored, the new segments are drawn on it and saved
+        with it, and then the marker of the rovers is drawn and the figure is blitted.
+        """
+        canvas = self._fig.canvas
+        if self._background is None:
+            self.__update_path()
+            canvas.draw() #the background is saved by __on_draw
+        canvas.restore_region(self._background)
+        for line, segments, kind in zip(self._new, self.__new_segments(), range(2)):
+            line.set_data(*polyline(segments))
+            self._ax.draw_artist(line)
+            drawn = np.concatenate((self._drawn[kind], segments))
+            self._drawn[kind] = drawn[::2] if len(drawn) > 2 * self._max_segments else drawn
+        self._background = canvas.copy_from_bbox(self._fig.bbox)
+        self._marker.set_data([self._x + .5], [self._y + .5])
+        self._ax.draw_artist(self._marker)
+        canvas.blit(self._fig.bbox)
+        if self._output is None:
+            canvas.flush_events()
+        self.__record()
+
+    def close(self, title:str = None) -> None:
+        """
+        This method draws the last frame with the whole path and the title, finishes the .gif file and, if there
+        is a window, shows it until it is closed.
+
+        :param title: This is the final state of the rovers
+        :type title: string
+        """
+        self._ax.set_title(f'Final position: {title}' if title is not None else 'Final position')
+        self._background = None
+        self.draw_frame()
+        if self._output is None:
+            plt.show()
+            return
+        self._writer.shutdown(wait=True)
+        if self._gif is not None:
+            self._gif.write(b';') #trailer of the gif
+            self._gif.close()
+            self._gif = None
+
+    def __new_segments(self) -> tuple[np.array]:
+        """
+        This method turns the jumps fed since the last frame into segments. The jumps that do not leave the
+        grid are a single segment, computed for all of them at once; the other ones are split by jump_segments.
+
+        :return: walking and wrap around segments, with shape (n, 2, 2)
+        :rtype: tuple of numpy array objects
+        """
+        if not self._jumps:
+            return np.zeros((0, 2, 2)), np.zeros((0, 2, 2))
+        xs, ys, directions, steps = zip(*self._jumps)
+        vectors = np.array([HEADING_VECTORS[HEADINGS.index(direction)] for direction in directions])
+        starts = np.column_stack((xs, ys))
+        ends = starts + vectors * np.array(steps)[:, None]
+        inside = ((ends >= 0) & (ends < self._shape)).all(axis=1)
+        walk, wrap = [np.stack((starts[inside], ends[inside]), axis=1) + .5], []
+        for index in np.flatnonzero(~inside):
+            walking, wrapping = jump_segments(xs[index], ys[index], directions[index], steps[index], self._shape)
+            walk.append(np.array(walking).reshape(-1, 2, 2))
+            wrap.append(np.array(wrapping).reshape(-1, 2, 2))
+        self._jumps = []
+        return np.concatenate(walk), np.concatenate(wrap) if wrap else np.zeros((0, 2, 2))
+
+    def __update_path(self) -> None:
+        """
+        This method puts the whole path drawn in the lines drawn by a whole redraw of the figure.
+        """
+        for line, drawn in zip(self._path, self._drawn):
+            line.set_data(*polyline(drawn))
+
+    def __on_draw(self, event) -> None:
+        """
+        This method saves the figure after a whole redraw, the background of the next frames.
+        """
+        self._background = self._fig.canvas.copy_from_bbox(self._fig.bbox)
+
+    def __on_resize(self, event) -> None:
+        """
+        This method forgets the saved figure when the window is resized, so the next frame redraws the whole path.
+        """
+        self._background = None
+
+    def __record(self) -> None:
+        """
+        This method records the frame, to the .gif file or as a png in the directory of the output. The
+        frame is copied and encoded in the background thread.
+        """
+        self._count += 1
+        if self._output is not None:
+            self._writer.submit(self.__encode, np.array(self._fig.canvas.buffer_rgba())[..., :3], self._count)
+
+    def __encode(self, frame:np.array, number:int) -> None:
+        """
+        This method encodes a recorded frame, in the background thread. The frames of a .gif are appended to
+        the file as they are encoded (each one with its own palette), so they are not kept in memory.
+
+        :param frame: This is the RGB image of the frame
+        :type frame: numpy array object
+        :param number: This is the number of the frame
+        :type number: integer
+        """
+        from PIL import Image, GifImagePlugin #pillow is a dependency of matplotlib
+        image = Image.fromarray(frame)
+        if self._output.endswith('.gif'):
+            image = image.quantize()
+            duration = min(int(1000 * self._period), 65535) #milliseconds, at most 16 bits
+            if self._gif is None:
+                self._gif = open(self._output, 'wb')
+                header, _ = GifImagePlugin.getheader(image, info={'loop': 0, 'duration': duration})
+                self._gif.write(b''.join(header))
+            self._gif.write(b''.join(GifImagePlugin.getdata(image, duration=duration, include_color_table=True)))
+        else:
+            image.save(os.path.join(self._output, f'frame_{number:06d}.png'))
@@ -11,3 +11,33 @@ class CommandDoesNotExistError(Exception):
     This is a custom error class for not finding a correct command
     """
     ...
+
+class InstructionSyntaxError(Exception): 
+    """
+    This is a custom error class for instructions with a wrong repeat syntax
+    """
+    ...
+
+class SparseGridError(Exception): 
+    """
+    This is a custom error class for materializing a sparse grid
+    """
+    ...
+
+class ObstacleMapError(Exception): 
+    """
+    This is a custom error class for reading a wrong obstacle map file
+    """
+    ...
+
+class PlanningError(Exception): 
+    """
+    This is a custom error class for a path search that exceeds its limit of states
+    """
+    ...
+
+class CheckpointError(Exception): 
+    """
+    This is a custom error class for reading a wrong checkpoint file
+    """
+    ...
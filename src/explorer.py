@@ -0,0 +1,261 @@
+import numpy as np
+from typing import NamedTuple
+from mars import HEADINGS, HEADING_VECTORS, Grid, Obstacles
+from errors import DirectionNotFoundError, PlanningError, SparseGridError
+
+"""
+This module contains the exploration planner of the Mars Rovers. Instead of going to one target, it
+writes a program of commands (M, L, R) that visits as many cells of the grid as possible with as few
+commands as possible, with the same rules as Rovers.move: moving wraps around the grid and the rovers
+never moves into a cell with an obstacle, so the program runs entirely with Rovers.execute:
+
+    exploration = Explorer(grid, obstacles).explore((0, 0, 'N'))
+    rovers.execute(exploration.instructions, grid, obstacles)
+    exploration.coverage, exploration.commands #e.g. 1.0 of the reachable cells with 1.7 commands per cell
+
+The frontier is the set of unvisited cells next to the visited ones. While there is a frontier cell next to
+the rovers it is visited with one move (and a rotation if it is not ahead), so most steps cost a few
+operations on the visited bitmap. Only when the rovers is surrounded by visited cells and obstacles a
+breadth first search goes through the visited cells to the nearest frontier cell, and it stops there.
+"""
+
+_LOCAL_SEARCH = 1024 #cells expanded by the python search to the nearest frontier cell before the numpy one is used
+
+
+class Exploration(NamedTuple):
+    """
+    This is the Exploration class, the result of Explorer.explore.
+
+    - instructions: program of commands that explores the grid from the start.
+    - commands: number of commands of the program.
+    - cells_visited: number of different cells visited, the start included.
+    - reachable_cells: number of free cells that can be reached from the start.
+    - free_cells: number of cells without obstacles.
+    - coverage: fraction of the reachable cells visited.
+    - first_visits: for every visited cell in order, the number of commands run when it was visited,
+      so coverage against commands is cells_visited up to any number of commands.
+    """
+    instructions: str
+    commands: int
+    cells_visited: int
+    reachable_cells: int
+    free_cells: int
+    coverage: float
+    first_visits: np.array
+
+
+class Explorer:
+    """
+    This is the Explorer class. It writes exploration programs for a grid with obstacles. The cells are
+    numbered x*n + y and the cell ahead of every cell for every heading is computed once, so the walk and the
+    searches never compute a wrap around. The free cells are checked again when the version of the obstacles changes.
+    """
+    def __init__(self, grid:Grid, obstacles:Obstacles) -> None:
+        """
+        This is the constructor of the Explorer class.
+
+        :param grid: This is the grid where the rovers moves
+        :type grid: Grid
+        :param obstacles: These are the obstacles of the grid
+        :type obstacles: Obstacles
+        """
+        if grid.sparse:
+            raise SparseGridError(f'The sparse grid {grid[0]} X {grid[1]} cannot be explored cell by cell')
+        self._shape = grid.shape
+        self._obstacles = obstacles
+        m, n = self._shape
+        x, y = np.divmod(np.arange(m * n, dtype=np.int64), n)
+        self._free = ~obstacles.has_many(x, y)
+        self._version = obstacles.version #version of the obstacles of the free cells
+        self._ahead = np.stack([(x + dx) % m * n + (y + dy) % n for dx, dy in HEADING_VECTORS]) #cell ahead, with shape (4, m*n)
+        self._views = [memoryview(ahead) for ahead in self._ahead] #python integers one at a time, faster than numpy indexing
+
+    def explore(self, start:tuple = (0, 0, 'N'), max_commands:int = None, target_coverage:float = 1.0) -> Exploration:
+        """
+        This method writes the exploration program from a start state. Every step takes the cheapest frontier cell
+        next to the rovers: the one ahead (M), at a side (R or L and M, the side whose cell has fewer unvisited
+        neighbours, so the rovers sweeps along the visited region instead of leaving holes) or behind (RRM).
+        When there is none, the rovers goes to the nearest frontier cell through the visited cells.
+
+        :param start: This is the start state (x, y, direction), e.g. (0, 0, 'N')
+        :type start: tuple
+        :param max_commands: This is the maximum number of commands of the program, None for no limit
+        :type max_commands: integer
+        :param target_coverage: This is the fraction of the reachable cells after which the exploration stops
+        :type target_coverage: float
+        :return: the exploration
+        :rtype: Exploration
+        """
+        if start[2] not in HEADINGS:
+            raise DirectionNotFoundError(f'The direction {start[2]} does not exist. Choose one of these: {", ".join(HEADINGS)}')
+        m, n = self._shape
+        if self._obstacles.version != self._version:
+            x, y = np.divmod(np.arange(m * n, dtype=np.int64), n)
+            self._free = ~self._obstacles.has_many(x, y)
+            self._version = self._obstacles.version
+        cell, heading = int(start[0]) % m * n + int(start[1]) % n, HEADINGS.index(start[2])
+        if not self._free[cell]:
+            raise PlanningError(f'The start {divmod(cell, n)} has an obstacle')
+        total = int(self.__reachable(cell).sum())
+        goal = min(total, max(1, int(np.ceil(target_coverage * total))))
+        limit = float('inf') if max_commands is None else max_commands
+        free = self._free.tobytes() #bytes are much faster than numpy arrays for one cell at a time
+        visited = bytearray(m * n)
+        visited[cell] = 1
+        search = _Search(self._ahead, self._free, np.frombuffer(visited, dtype=bool))
+        views = self._views
+        commands = []
+        first_visits = [0] #commands run when every cell was visited
+        used = 0
+
+        def unvisited(side:int) -> int:
+            #number of unvisited free neighbours of a cell
+            return sum(free[view[side]] and not visited[view[side]] for view in views)
+
+        while len(first_visits) < goal and used < limit:
+            following = views[heading][cell]
+            if free[following] and not visited[following]:
+                cell = following
+                commands.append('M')
+                used += 1
+            else:
+                sides = []
+                for turn, rotation in ((1, 'R'), (3, 'L')):
+                    side = views[(heading + turn) % 4][cell]
+                    if free[side] and not visited[side]:
+                        sides.append((unvisited(side), turn, rotation, side))
+                back = views[(heading + 2) % 4][cell]
+                if sides:
+                    _, turn, rotation, cell = min(sides)
+                    heading = (heading + turn) % 4
+                    commands.append(rotation + 'M')
+                    used += 2
+                elif free[back] and not visited[back]:
+                    cell, heading = back, (heading + 2) % 4
+                    commands.append('RRM')
+                    used += 3
+                else:
+                    for following in self.__nearest_frontier(cell, free, visited, search):
+                        turn = next(turn for turn in range(4) if views[(heading + turn) % 4][cell] == following)
+                        cell, heading = following, (heading + turn) % 4
+                        commands.append(('M', 'RM', 'RRM', 'LM')[turn])
+                        used += (1, 2, 3, 2)[turn]
+            visited[cell] = 1
+            first_visits.append(used)
+        instructions = ''.join(commands)
+        if used > limit:
+            #the last cell needed more commands than allowed, the program is cut before it
+            first_visits.pop()
+            instructions = instructions[:max_commands]
+        count = len(first_visits)
+        return Exploration(instructions, len(instructions), count, total, int(self._free.sum()),
+                           count / total, np.array(first_visits, dtype=np.int64))
+
+    def __nearest_frontier(self, source:int, free:bytes, visited:bytearray, search) -> list[int]:
+        """
+        This method finds the shortest path through the visited cells to the nearest frontier cell. Frontier
+        cells are usually a few cells away, so a python breadth first search is tried first; if it expands too
+        many cells the search is done again with numpy, one level of the search per operation.
+
+        :param source: This is the cell of the rovers, x*n + y
+        :type source: integer
+        :param free: These are the free cells
+        :type free: bytes
+        :param visited: These are the visited cells
+        :type visited: bytearray
+        :param search: This is the numpy search
+        :type search: _Search
+        :return: cells of the path, without the source and ending at the frontier cell
+        :rtype: list of integers
+        """
+        views = self._views
+        parents = {source: None}
+        queue = [source]
+        for cell in queue: #the queue grows while it is read
+            for view in views:
+                following = view[cell]
+                if following not in parents and free[following]:
+                    parents[following] = cell
+                    if not visited[following]:
+                        path = [following]
+                        while parents[path[-1]] != source:
+                            path.append(parents[path[-1]])
+                        return path[::-1]
+                    queue.append(following)
+            if len(queue) > _LOCAL_SEARCH:
+                break
+        return search.nearest_frontier(source)
+
+    def __reachable(self, source:int) -> np.array:
+        """
+        This method returns the free cells that can be reached from a cell, with a breadth first search
+        that expands a whole level at once with numpy.
+
+        :param source: This is the cell, x*n + y
+        :type source: integer
+        :return: boolean array of the reachable cells
+        :rtype: numpy array object
+        """
+        reachable = np.zeros(self._free.size, dtype=bool)
+        reachable[source] = True
+        frontier = np.array([source], dtype=np.int64)
+        while frontier.size:
+            following = self._ahead[:, frontier].ravel()
+            frontier = np.unique(following[self._free[following] & ~reachable[following]])
+            reachable[frontier] = True
+        return reachable
+
+
+class _Search:
+    """
+    This is the _Search class, the numpy search to the nearest frontier cell of an exploration. Every level of
+    the breadth first search is expanded at once. The cells reached are marked with the number of the search,
+    so the arrays are created once per exploration and never cleared.
+    """
+    def __init__(self, ahead:np.array, free:np.array, visited:np.array) -> None:
+        """
+        This is the constructor of the _Search class.
+
+        :param ahead: This is the cell ahead of every cell for every heading, with shape (4, m*n)
+        :type ahead: numpy array object
+        :param free: These are the free cells
+        :type free: numpy array object
+        :param visited: These are the visited cells, a view of the bitmap updated by the exploration
+        :type visited: numpy array object
+        """
+        self._ahead = ahead
+        self._free = free
+        self._visited = visited
+        self._marks = np.zeros(free.size, dtype=np.int64) #number of the last search that reached every cell
+        self._depths = np.zeros(free.size, dtype=np.int64) #level where that search reached every cell
+        self._number = 0
+
+    def nearest_frontier(self, source:int) -> list[int]:
+        """
+        This method finds the shortest path through the visited cells to the nearest frontier cell. The path is
+        found walking back from the frontier cell to a neighbour reached one level before.
+
+        :param source: This is the cell of the rovers, x*n + y
+        :type source: integer
+        :return: cells of the path, without the source and ending at the frontier cell
+        :rtype: list of integers
+        """
+        self._number += 1
+        marks, depths, number = self._marks, self._depths, self._number
+        marks[source], depths[source] = number, 0
+        frontier, level = np.array([source], dtype=np.int64), 0
+        while True:
+            level += 1
+            following = self._ahead[:, frontier].ravel()
+            frontier = np.unique(following[self._free[following] & (marks[following] != number)])
+            if frontier.size == 0:
+                raise PlanningError('There is no frontier cell that can be reached')
+            marks[frontier], depths[frontier] = number, level
+            targets = frontier[~self._visited[frontier]]
+            if targets.size:
+                break
+        path = [int(targets[0])]
+        for depth in range(level - 1, 0, -1):
+            around = self._ahead[:, path[-1]]
+            path.append(int(around[(marks[around] == number) & (depths[around] == depth)][0]))
+        return path[::-1]
@@ -0,0 +1,363 @@
+import numpy as np
+
+"""
+This module contains the History class, the store of the positions where Rovers has been.
+The positions are kept in growable int32 numpy arrays instead of python lists, so every
+step costs 8 bytes. Depending on the mode, the history keeps all the positions, one every
+N steps, the last K steps or spills all the positions to a memory mapped file.
+"""
+
+HISTORY_MODES = ('off', 'full', 'sample', 'ring', 'mmap')
+_PENDING_SIZE = 8192 #positions buffered in a python list before being written to the array
+_CHUNK_SIZE = 1 << 20 #steps written at once when copying long ranges of positions
+
+
+class History:
+    """
+    This is the History class. It records the position of Rovers after every step (the
+    first position recorded is step 0) and keeps the ones selected by its mode:
+
+    - off: no position is kept, only the number of steps.
+    - full: all the positions are kept in memory.
+    - sample: one position every N steps (steps 0, N, 2N...).
+    - ring: the positions of the last K steps, in a ring buffer.
+    - mmap: all the positions are kept in a memory mapped file, so they do not use RAM.
+    """
+    def __init__(self, mode:str = 'full', every:int = 1, last:int = 1000, path:str = None, capacity:int = 1024) -> None:
+        """
+        This is the constructor of the History class.
+
+        :param mode: This is the retention mode, one of HISTORY_MODES
+        :type mode: string
+        :param every: In sample mode, the number of steps between two kept positions
+        :type every: integer
+        :param last: In ring mode, the number of steps kept
+        :type last: integer
+        :param path: In mmap mode, the path of the file where the positions are written
+        :type path: string
+        :param capacity: Initial number of positions that fit in the array before growing it
+        :type capacity: integer
+        """
+        if mode not in HISTORY_MODES:
+            raise ValueError(f'The history mode {mode} does not exist. Choose one of these: {", ".join(HISTORY_MODES)}')
+        if (mode == 'sample' and every < 1) or (mode == 'ring' and last < 1):
+            raise ValueError('The number of steps of the sample and ring modes must be positive')
+        if mode == 'mmap' and path is None:
+            raise ValueError('The mmap mode needs the path of the file')
+        self._mode = mode
+        self._every = every if mode == 'sample' else 1
+        self._last = last if mode == 'ring' else None
+        self._path = path
+        self._total = 0 #number of steps recorded, kept or not
+        self._size = 0 #number of positions kept
+        self._head = 0 #in ring mode, index of the oldest position
+        self._pending: list[int] = [] #flat x, y coordinates recorded but not written yet
+        capacity = last if mode == 'ring' else max(capacity, 1)
+        if mode == 'mmap':
+            self._data = np.memmap(path, dtype=np.int32, mode='w+', shape=(capacity, 2))
+        else:
+            self._data = np.empty((0 if mode == 'off' else capacity, 2), dtype=np.int32)
+
+    def __len__(self) -> int:
+        """
+        This is the length magic method. It returns the number of positions kept.
+
+        :return: number of positions kept
+        :rtype: integer
+        """
+        self.__flush()
+        return self._size
+
+    def __getitem__(self, index):
+        """
+        This is the magic method to get kept positions, in chronological order, given an index or a slice.
+
+        :param index: this is the index or slice
+        :type index: integer or slice
+        :return: returns the positions
+        :rtype: numpy array object
+        """
+        return self.positions()[index]
+
+    def __iter__(self):
+        """
+        This magic method iterates over the kept positions in chronological order.
+
+        :return: iterator of positions
+        :rtype: iterator
+        """
+        return iter(self.positions())
+
+    def __array__(self, dtype=None, copy=None) -> np.array:
+        """
+        This magic method allows numpy to use the history as an array of shape (len, 2).
+
+        :return: kept positions
+        :rtype: numpy array object
+        """
+        positions = self.positions()
+        return positions if dtype is None else positions.astype(dtype)
+
+    def __eq__(self, other) -> bool:
+        """
+        This magic method compares the kept positions with another history or a list of positions.
+
+        :param other: this is the other history or list of positions
+        :type other: History or list
+        :return: True if the kept positions are the same
+        :rtype: bool
+        """
+        if isinstance(other, History) and self.total != other.total:
+            return False
+        return np.array_equal(self.positions(), np.asarray(other).reshape(-1, 2))
+
+    @property
+    def mode(self) -> str:
+        """
+        This property method returns the retention mode of the history.
+
+        :return: mode, one of HISTORY_MODES
+        :rtype: string
+        """
+        return self._mode
+
+    @property
+    def every(self) -> int:
+        """
+        This property method returns the number of steps between two kept positions in sample mode.
+
+        :return: steps between kept positions, 1 in the other modes
+        :rtype: integer
+        """
+        return self._every
+
+    @property
+    def last(self) -> int:
+        """
+        This property method returns the number of steps kept in ring mode.
+
+        :return: steps kept, None in the other modes
+        :rtype: integer
+        """
+        return self._last
+
+    @property
+    def total(self) -> int:
+        """
+        This property method returns the number of steps recorded, including the ones not kept.
+
+        :return: number of steps recorded
+        :rtype: integer
+        """
+        return self._total + len(self._pending) // 2
+
+    def positions(self) -> np.array:
+        """
+        This method returns the kept positions in chronological order. Except in ring mode
+        it is a view of the array, so it must not be modified.
+
+        :return: array of shape (len, 2) with the x and y coordinates
+        :rtype: numpy array object
+        """
+        self.__flush()
+        if self._mode == 'ring' and self._head:
+            return np.concatenate((self._data[self._head:self._size], self._data[:self._head]))
+        return self._data[:self._size]
+
+    def steps(self) -> np.array:
+        """
+        This method returns the step of every kept position.
+
+        :return: array of steps in chronological order
+        :rtype: numpy array object
+        """
+        self.__flush()
+        return self._total - self._size + np.arange(self._size) if self._mode == 'ring' else np.arange(self._size) * self._every
+
+    def position_at(self, step:int) -> tuple[int]:
+        """
+        This method returns the position of Rovers after a given step in constant time. The
+        position has to be kept by the history, e.g. in sample mode step has to be a multiple of N.
+
+        :param step: this is the step
+        :type step: integer
+        :return: x and y coordinates
+        :rtype: tuple
+        """
+        self.__flush()
+        if step < 0 or step >= self._total:
+            raise IndexError(f'The step {step} has not been recorded, there are {self._total} steps')
+        if self._mode == 'ring':
+            index = step - (self._total - self._size)
+            index = (self._head + index) % self._last if index >= 0 else -1
+        else:
+            index = step // self._every if step % self._every == 0 else -1
+        if self._mode == 'off' or index < 0:
+            raise KeyError(f'The position of step {step} is not kept in {self._mode} mode')
+        return int(self._data[index][0]), int(self._data[index][1])
+
+    def tolist(self) -> list[list[int]]:
+        """
+        This method returns the kept positions as a list of lists.
+
+        :return: list of positions
+        :rtype: list
+        """
+        return self.positions().tolist()
+
+    def append(self, x:int, y:int) -> None:
+        """
+        This method records the position of the next step.
+
+        :param x: x coordinate
+        :type x: integer
+        :param y: y coordinate
+        :type y: integer
+        """
+        self._pending += (x, y)
+        if len(self._pending) >= _PENDING_SIZE:
+            self.__flush()
+
+    def extend_ray(self, x:int, y:int, vec:tuple[int], steps:int, shape:tuple[int]) -> None:
+        """
+        This method records the positions of a straight jump of a number of steps from (x, y) in the
+        direction vec, wrapping around the grid. Only the kept positions are computed.
+
+        :param x: x coordinate where the jump starts (it is not recorded)
+        :type x: integer
+        :param y: y coordinate where the jump starts (it is not recorded)
+        :type y: integer
+        :param vec: this is the direction vector of the jump
+        :type vec: tuple of integers
+        :param steps: this is the number of steps of the jump
+        :type steps: integer
+        :param shape: this is the shape of the grid (m, n)
+        :type shape: tuple of integers
+        """
+        (dx, dy), (m, n) = vec, shape
+        if steps * 2 + len(self._pending) < _PENDING_SIZE:
+            for distance in range(1, steps + 1):
+                self._pending += ((x + dx*distance) % m, (y + dy*distance) % n)
+            return
+        self.__flush()
+        for kept in self.__select(self._total, steps):
+            distances = kept + 1
+            self.__write(np.column_stack(((x + dx*distances) % m, (y + dy*distances) % n)))
+        self._total += steps
+
+    def extend_tiled(self, lap:np.array, laps:int) -> None:
+        """
+        This method records the positions of a cycle followed several times in a row.
+
+        :param lap: positions of the steps of one lap of the cycle
+        :type lap: numpy array object
+        :param laps: number of laps
+        :type laps: integer
+        """
+        self.__flush()
+        for kept in self.__select(self._total, len(lap) * laps):
+            self.__write(lap[kept % len(lap)])
+        self._total += len(lap) * laps
+
+    def restore(self, positions:np.array, total:int) -> None:
+        """
+        This method restores an empty history from the positions it kept and its number of steps,
+        e.g. to resume a mission from a checkpoint.
+
+        :param positions: These are the kept positions, in chronological order
+        :type positions: numpy array object
+        :param total: This is the number of steps recorded
+        :type total: integer
+        """
+        if self.total:
+            raise ValueError('Only an empty history can be restored')
+        if self._mode != 'off':
+            self.__write(np.asarray(positions, dtype=np.int32).reshape(-1, 2))
+        self._total = total
+
+    def close(self) -> None:
+        """
+        This method writes the pending positions and, in mmap mode, flushes the file and truncates it to the
+        positions kept, so it can be opened on its own as int32 pairs. Positions can still be recorded after it.
+        """
+        self.__flush()
+        if self._mode == 'mmap':
+            self._data.flush()
+            del self._data
+            with open(self._path, 'r+b') as file:
+                file.truncate(self._size * 2 * np.dtype(np.int32).itemsize)
+            #an empty file cannot be memory mapped, it is mapped again when it grows
+            self._data = np.memmap(self._path, dtype=np.int32, mode='r+', shape=(self._size, 2)) if self._size else np.empty((0, 2), dtype=np.int32)
+
+    def __select(self, first:int, steps:int):
+        """
+        This method selects which of the next steps are kept, in chunks so that long
+        ranges of steps do not need a lot of memory.
+
+        :param first: this is the first step
+        :type first: integer
+        :param steps: this is the number of steps
+        :type steps: integer
+        :return: generator of arrays with the indices of the kept steps, relative to first
+        :rtype: generator
+        """
+        if self._mode == 'off' or steps <= 0:
+            return
+        if self._mode == 'ring':
+            yield np.arange(max(steps - self._last, 0), steps)
+            return
+        offset = (-first) % self._every
+        for start in range(0, steps, _CHUNK_SIZE * self._every):
+            begin = start + (offset - start) % self._every
+            yield np.arange(begin, min(start + _CHUNK_SIZE * self._every, steps), self._every)
+
+    def __flush(self) -> None:
+        """
+        This method writes the pending positions to the array.
+        """
+        if not self._pending:
+            return
+        pending = np.array(self._pending, dtype=np.int32).reshape(-1, 2)
+        self._pending = []
+        for kept in self.__select(self._total, len(pending)):
+            self.__write(pending[kept])
+        self._total += len(pending)
+
+    def __write(self, positions:np.array) -> None:
+        """
+        This method writes kept positions to the array, growing it if needed.
+
+        :param positions: positions to write
+        :type positions: numpy array object
+        """
+        if self._mode == 'ring':
+            positions = positions[-self._last:]
+            self._data[(self._head + self._size + np.arange(len(positions))) % self._last] = positions
+            overflow = max(self._size + len(positions) - self._last, 0)
+            self._size = min(self._size + len(positions), self._last)
+            self._head = (self._head + overflow) % self._last
+            return
+        needed = self._size + len(positions)
+        if needed > len(self._data):
+            self.__grow(max(needed, 2 * len(self._data)))
+        self._data[self._size:needed] = positions
+        self._size = needed
+
+    def __grow(self, capacity:int) -> None:
+        """
+        This method makes room for more positions. In mmap mode the file is enlarged.
+
+        :param capacity: new number of positions that fit in the array
+        :type capacity: integer
+        """
+        if self._mode == 'mmap':
+            if isinstance(self._data, np.memmap):
+                self._data.flush()
+            del self._data
+            with open(self._path, 'r+b') as file:
+                file.truncate(capacity * 2 * np.dtype(np.int32).itemsize)
+            self._data = np.memmap(self._path, dtype=np.int32, mode='r+', shape=(capacity, 2))
+        else:
+            data = np.empty((capacity, 2), dtype=np.int32)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
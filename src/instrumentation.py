@@ -0,0 +1,140 @@
+import time
+import logging
+import contextlib
+
+"""
+This module contains the opt-in instrumentation of the Mars Rovers. An Instrumentation object
+given to Rovers counts the moves, rotations, wraps around the grid, obstacle checks and obstacle
+stops, times the phases of a mission and sends the events (e.g. an obstacle found) to a sink
+instead of printing them. Without instrumentation the Rovers only pays one None check per call.
+"""
+
+COUNTERS = ('moves', 'rotations', 'wraps', 'obstacle_checks', 'obstacle_stops')
+
+
+def print_sink(kind:str, message:str, data:dict) -> None:
+    """
+    This is the default sink of the events. It prints the message, as Rovers does without instrumentation.
+
+    :param kind: This is the kind of event, e.g. obstacle
+    :type kind: string
+    :param message: This is the human readable message of the event
+    :type message: string
+    :param data: These are the values of the event, e.g. the position
+    :type data: dict
+    """
+    print(message)
+
+
+def logging_sink(kind:str, message:str, data:dict) -> None:
+    """
+    This is a sink that sends the events to the mars logger at INFO level.
+
+    :param kind: This is the kind of event, e.g. obstacle
+    :type kind: string
+    :param message: This is the human readable message of the event
+    :type message: string
+    :param data: These are the values of the event, e.g. the position
+    :type data: dict
+    """
+    logging.getLogger('mars').info(message, extra={'kind': kind, **data})
+
+
+class Instrumentation:
+    """
+    This is the Instrumentation class. It keeps the counters of the movement engine, the time
+    spent in every phase of a mission and the sink where the events are sent.
+    """
+    def __init__(self, sink = print_sink) -> None:
+        """
+        This is the constructor of the Instrumentation class. All the counters start at 0.
+
+        :param sink: This is the function called with (kind, message, data) for every event, None to ignore them
+        :type sink: function
+        """
+        self.counters: dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.timings: dict[str, float] = {}
+        self._sink = sink
+
+    def __str__(self) -> str:
+        """
+        This is the string magic method. It returns a report of the counters and timings.
+
+        :return: report, one line per counter and phase
+        :rtype: string
+        """
+        lines = [f'{name:<16} {value:>14,}' for name, value in self.counters.items()]
+        lines += [f'{name:<16} {seconds:>14.4f} s' for name, seconds in self.timings.items()]
+        return '\n'.join(lines)
+
+    def count(self, name:str, value:int = 1) -> None:
+        """
+        This method increments a counter.
+
+        :param name: This is the name of the counter, one of COUNTERS
+        :type name: string
+        :param value: This is the increment
+        :type value: integer
+        """
+        self.counters[name] += value
+
+    def add(self, counters:dict, times:int = 1) -> None:
+        """
+        This method adds several times the given counters, e.g. the ones of a cycle that is skipped.
+
+        :param counters: These are the counters added
+        :type counters: dict
+        :param times: This is the number of times they are added
+        :type times: integer
+        """
+        for name, value in counters.items():
+            self.counters[name] += value * times
+
+    def emit(self, kind:str, message:str, **data) -> None:
+        """
+        This method sends an event to the sink.
+
+        :param kind: This is the kind of event, e.g. obstacle
+        :type kind: string
+        :param message: This is the human readable message of the event
+        :type message: string
+        """
+        if self._sink is not None:
+            self._sink(kind, message, data)
+
+    @contextlib.contextmanager
+    def phase(self, name:str):
+        """
+        This method is a context manager that adds the time spent inside it to the phase.
+
+        :param name: This is the name of the phase, e.g. simulation
+        :type name: string
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def report(self) -> dict:
+        """
+        This method returns the counters and the timings.
+
+        :return: dictionary with the counters and the timings
+        :rtype: dict
+        """
+        return {'counters': dict(self.counters), 'timings': dict(self.timings)}
+
+
+def phase(instrumentation:Instrumentation, name:str):
+    """
+    This function times a phase if there is instrumentation, else it does nothing.
+
+    :param instrumentation: This is the instrumentation or None
+    :type instrumentation: Instrumentation
+    :param name: This is the name of the phase
+    :type name: string
+    :return: context manager
+    :rtype: context manager
+    """
+    return contextlib.nullcontext() if instrumentation is None else instrumentation.phase(name)
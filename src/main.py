@@ -1,47 +1,229 @@
 import sys
-from config import NUMBER_OF_OBSTACLES, GRID_SIZE, DRAW_PATH
-from draw import draw_rovers_path
+import json
+import argparse
+import contextlib
+import numpy as np
+from config import NUMBER_OF_OBSTACLES, OBSTACLES_SEED, GRID_SIZE, DRAW_PATH, DRAW_OUTPUT, MAX_IMAGE_SIZE
+from config import HISTORY_MODE, HISTORY_EVERY, HISTORY_LAST, HISTORY_FILE
+from config import INSTRUCTIONS_FILE, INSTRUCTIONS_CHUNK_SIZE, INSTRUMENTATION, LIVE_VIEW, LIVE_FPS, LIVE_OUTPUT
 from mars import Grid, Rovers, Obstacles
+from history import History, HISTORY_MODES
+from program import read_instructions, iter_instructions
+from mapfile import open_map
+from analytics import Coverage
+from explorer import Explorer
+from instrumentation import Instrumentation, phase
+from errors import CommandDoesNotExistError, InstructionSyntaxError, PlanningError
 
+"""
+This module is the command line of the Mars Rovers. Without arguments it asks for the instructions
+in the terminal and takes the rest of the parameters from config.py. With arguments it runs in batch
+mode: nothing is asked and the final state is printed as text or JSON, so scripts can launch it many times:
 
-def create_rovers_position(positions: list[int]) -> list[float]:
+    python src/main.py --instructions MMRMMLM --grid 10 10 --obstacles 5 --seed 3 --format json
+
+matplotlib is slow to import and it is only imported when the path is drawn.
+"""
+
+
+def create_rovers_position(positions) -> np.array:
     """
-    This function creates a list containing the position of the arrows according
+    This function creates an array containing the position of the arrows according
     to rovers trajectory. It adds 0.5 so that the arrows are aligned in the center of the cell.
+    Every arrow is built as floats, so to draw long paths the history is given to draw_rovers_path instead.
 
     :param positions: These are the positions where rovers has been
-    :type positions: list of integers
-    :return: arrows positions to plot
-    :rtype: list of float numbers
+    :type positions: History or array of shape (n, 2)
+    :return: arrows positions to plot, with shape (n-1, 2, 2): start and end of every arrow
+    :rtype: numpy array object
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 2) + .5 #0.5 to make the arrow be in center
+    return np.stack((positions[:-1], positions[1:]), axis=1) #every arrow goes from one position to the next one
+
+def path_headings(instructions:str, history:History, grid:Grid):
+    """
+    This function returns the heading of every arrow of the path, so the wrap arounds of a grid with a side
+    of 2 cells (one cell long like a step) are drawn as wrap arounds. The headings are only needed in such
+    a grid, and only given when the history keeps consecutive steps (full, mmap or ring mode); the program
+    is expanded chunk by chunk and never as a whole.
+
+    :param instructions: These are the instructions run from the start, None if they were streamed from a file
+    :type instructions: string
+    :param history: This is the history of the rovers
+    :type history: History
+    :param grid: This is the grid
+    :type grid: Grid
+    :return: heading index of every arrow, or None to find the wrap arounds with the shape of the grid
+    :rtype: numpy array object
+    """
+    if instructions is None or 2 not in grid.shape or history.mode not in ('full', 'mmap', 'ring') or len(history) < 2:
+        return None
+    from draw import move_headings #matplotlib is only imported if the path is drawn
+    first = history.total - len(history) if history.mode == 'ring' else 0 #steps not kept by a ring
+    return move_headings(iter_instructions(instructions, INSTRUCTIONS_CHUNK_SIZE), len(history) - 1, first)
+
+def run_live(rovers:Rovers, instructions, grid:Grid, obstacles:Obstacles, output:str = None, fps:float = LIVE_FPS) -> None:
+    """
+    This function runs the instructions drawing the path while the rovers moves (see draw.LivePath).
+
+    :param rovers: This is the rovers
+    :type rovers: Rovers
+    :param instructions: These are the instructions, a string or an iterable of chunks
+    :type instructions: string or iterable of strings
+    :param grid: This is the grid
+    :type grid: Grid
+    :param obstacles: These are the obstacles
+    :type obstacles: Obstacles
+    :param output: This is a .gif file or a directory where the frames are recorded. If None they are shown in a window
+    :type output: string
+    :param fps: This is the maximum number of frames per second
+    :type fps: float
     """
-    final = []
-    for index, position in enumerate(positions[1:]): #we do not want to take into account the first element
-        arr = [(positions[index][0]+.5, positions[index][1]+.5), (position[0]+.5, position[1]+.5)] #0.5 to make the arrow be in center
-        final.append(arr)
-    return final
+    from draw import LivePath #matplotlib is only imported if the path is drawn
+    if isinstance(instructions, str) and ('(' in instructions or ')' in instructions):
+        #the live view needs the events of run_iter, the repetitions are expanded chunk by chunk while they run
+        instructions = iter_instructions(instructions, INSTRUCTIONS_CHUNK_SIZE)
+    x, y = rovers.position
+    live = LivePath(grid, obstacles, (int(x), int(y), rovers.direction), fps, output)
+    for _ in live.follow(rovers.run_iter(instructions, grid, obstacles)):
+        pass
+    live.close(str(rovers))
 
 def main_rovers():
     """
     This is the main function of the rovers module. This method allows the user to enter the instructions
-    in the terminal to tell the Mars Rovers to walk along the plateau (grid).
-    """
-    instructions = input('Write the instructions for rovers e.g MMRMMLM:  ')
-    if(instructions == ''):
-        sys.exit('Error: You have to enter the instructions so Mars Rovers can move!')
-    grid = Grid(GRID_SIZE, GRID_SIZE)
-    obstacles = Obstacles()
-    random_obstacles = obstacles.create_obstacles_in_grid(grid, NUMBER_OF_OBSTACLES).get_obstacles_positions()
-    rovers = Rovers()
-    for instruction in instructions:
-        if rovers.can_move():
-            rovers.move(instruction, grid, obstacles)
+    in the terminal to tell the Mars Rovers to walk along the plateau (grid). If INSTRUCTIONS_FILE is set,
+    the instructions are streamed in chunks from that file (or from the standard input if it is -) instead.
+    If INSTRUMENTATION is True, the counters of the movement engine and the time of every phase are printed at the end.
+    If LIVE_VIEW is True the path is drawn while the rovers moves instead of at the end.
+    """
+    if INSTRUCTIONS_FILE is None:
+        instructions = input('Write the instructions for rovers e.g MMRMMLM:  ')
+        if(instructions == ''):
+            sys.exit('Error: You have to enter the instructions so Mars Rovers can move!')
+    instrumentation = Instrumentation() if INSTRUMENTATION else None
+    with phase(instrumentation, 'generation'):
+        grid = Grid(GRID_SIZE, GRID_SIZE)
+        obstacles = Obstacles(grid)
+        random_obstacles = obstacles.create_obstacles_in_grid(grid, NUMBER_OF_OBSTACLES, OBSTACLES_SEED).get_obstacles_positions()
+    rovers = Rovers(History(HISTORY_MODE, HISTORY_EVERY, HISTORY_LAST, HISTORY_FILE), instrumentation)
+    with phase(instrumentation, 'simulation'):
+        if LIVE_VIEW:
+            source = instructions if INSTRUCTIONS_FILE is None else read_instructions(INSTRUCTIONS_FILE, INSTRUCTIONS_CHUNK_SIZE)
+            run_live(rovers, source, grid, obstacles, LIVE_OUTPUT)
+        elif INSTRUCTIONS_FILE is None:
+            rovers.execute(instructions, grid, obstacles)
         else:
-            break
-    positions_arr = create_rovers_position(rovers.history)
-    if(DRAW_PATH):
-        draw_rovers_path(positions_arr, rovers, random_obstacles)
+            for _ in rovers.run_iter(read_instructions(INSTRUCTIONS_FILE, INSTRUCTIONS_CHUNK_SIZE), grid, obstacles):
+                pass
+    with phase(instrumentation, 'history'):
+        rovers.history.close() #the pending positions are written (and the file of the mmap mode is finished)
+    if(DRAW_PATH and not LIVE_VIEW):
+        with phase(instrumentation, 'drawing'):
+            from draw import draw_rovers_path #matplotlib is only imported if the path is drawn
+            headings = path_headings(instructions if INSTRUCTIONS_FILE is None else None, rovers.history, grid)
+            draw_rovers_path(rovers.history, rovers, random_obstacles, grid, DRAW_OUTPUT, headings=headings)
     else:
         print('The final position is: ', rovers)
+    if instrumentation is not None:
+        print(instrumentation)
+
+def run_batch(args:argparse.Namespace) -> int:
+    """
+    This function runs the rovers in batch mode with the parameters of the command line and prints the final state.
+    Only the final state is printed to the standard output, the obstacle found is reported to the standard error.
+
+    :param args: These are the parsed arguments, see main
+    :type args: argparse Namespace
+    :return: exit code, 1 if the instructions are wrong or the grid cannot be explored
+    :rtype: integer
+    """
+    instrumentation = Instrumentation() if args.instrumentation else None
+    with phase(instrumentation, 'generation'):
+        if args.map is not None:
+            obstacles = Obstacles.load(args.map)
+            grid = Grid(*open_map(args.map)[0].shape) #the grid of the map, --grid is not used
+        else:
+            grid = Grid(*args.grid)
+            obstacles = Obstacles(grid).create_obstacles_in_grid(grid, args.obstacles, args.seed)
+    instructions = args.instructions
+    if args.explore:
+        with phase(instrumentation, 'planning'):
+            try:
+                exploration = Explorer(grid, obstacles).explore()
+            except PlanningError as error:
+                print(f'Error: {error}', file=sys.stderr)
+                return 1
+        instructions = exploration.instructions
+        print(f'Exploration: {exploration.cells_visited} of {exploration.reachable_cells} reachable cells '
+              f'({exploration.coverage:.1%}) with {exploration.commands} commands', file=sys.stderr)
+    history = args.history or ('full' if args.draw or args.heatmap else 'off') #the positions are only needed to draw the path
+    rovers = Rovers(History(history, HISTORY_EVERY, HISTORY_LAST, HISTORY_FILE), instrumentation)
+    try:
+        with phase(instrumentation, 'simulation'), contextlib.redirect_stdout(sys.stderr):
+            if args.live or args.record is not None:
+                source = instructions if instructions is not None else read_instructions(args.file, INSTRUCTIONS_CHUNK_SIZE)
+                run_live(rovers, source, grid, obstacles, args.record, args.fps)
+            elif instructions is not None:
+                rovers.execute(instructions, grid, obstacles)
+            else:
+                for _ in rovers.run_iter(read_instructions(args.file, INSTRUCTIONS_CHUNK_SIZE), grid, obstacles):
+                    pass
+    except (CommandDoesNotExistError, InstructionSyntaxError) as error:
+        print(f'Error: {error}', file=sys.stderr)
+        return 1
+    rovers.history.close() #the pending positions are written (and the file of the mmap mode is finished)
+    if args.draw:
+        with phase(instrumentation, 'drawing'):
+            from draw import draw_rovers_path #matplotlib is only imported if the path is drawn
+            headings = path_headings(instructions, rovers.history, grid)
+            draw_rovers_path(rovers.history, rovers, obstacles.get_obstacles_positions(), grid, args.draw, headings=headings)
+    if args.heatmap:
+        with phase(instrumentation, 'drawing'):
+            from draw import draw_heatmap #matplotlib is only imported if the path is drawn
+            heatmap = Coverage.from_history(rovers.history, grid).heatmap(MAX_IMAGE_SIZE)
+            draw_heatmap(heatmap, str(rovers), grid, obstacles.get_obstacles_positions(), args.heatmap)
+    if args.format == 'json':
+        x, y = rovers.position
+        print(json.dumps({'state': str(rovers), 'x': int(x), 'y': int(y), 'direction': rovers.direction,
+                          'blocked': not rovers.can_move(), 'moves': rovers.history.total - 1})) #the first position is not a move
+    else:
+        print(rovers)
+    if instrumentation is not None:
+        print(instrumentation, file=sys.stderr)
+    return 0
+
+def main(argv:list[str] = None) -> int:
+    """
+    This is the command line entry point. Without arguments it runs main_rovers, with arguments run_batch.
+
+    :param argv: command line arguments, by default the ones of the process
+    :type argv: list of strings
+    :return: exit code
+    :rtype: integer
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        main_rovers()
+        return 0
+    parser = argparse.ArgumentParser(description='Move the Mars Rovers without asking anything (batch mode)')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--instructions', '-i', help='instructions of the rovers, e.g. MMRMMLM or (MMRMMLM)*1000')
+    source.add_argument('--file', '-f', help='file with the instructions streamed in chunks, - for the standard input')
+    source.add_argument('--explore', action='store_true', help='explore the grid with the program written by the exploration planner')
+    parser.add_argument('--grid', type=int, nargs=2, metavar=('M', 'N'), default=(GRID_SIZE, GRID_SIZE), help=f'size of the grid (default {GRID_SIZE} {GRID_SIZE})')
+    parser.add_argument('--obstacles', type=int, default=NUMBER_OF_OBSTACLES, help=f'number of random obstacles (default {NUMBER_OF_OBSTACLES})')
+    parser.add_argument('--seed', type=int, default=OBSTACLES_SEED, help='seed of the random obstacles (default different obstacles in every run)')
+    parser.add_argument('--map', default=None, help='binary obstacle map used instead of the grid and random obstacles')
+    parser.add_argument('--format', choices=('text', 'json'), default='text', help='format of the final state (default text)')
+    parser.add_argument('--history', choices=HISTORY_MODES, default=None, help='positions kept (default full if the path is drawn, else off)')
+    parser.add_argument('--draw', default=None, help='save the draw of the path to this .png or .svg file')
+    parser.add_argument('--heatmap', default=None, help='save the heatmap of the visits of every cell to this .png or .svg file')
+    parser.add_argument('--live', action='store_true', help='draw the path in a window while the rovers moves')
+    parser.add_argument('--record', default=None, help='record the live view without window to a .gif file or a directory of png frames')
+    parser.add_argument('--fps', type=float, default=LIVE_FPS, help=f'maximum frames per second of the live view (default {LIVE_FPS})')
+    parser.add_argument('--instrumentation', action='store_true', help='print the counters and the time of every phase to stderr')
+    return run_batch(parser.parse_args(argv))
 
 if __name__ == '__main__':
-    main_rovers()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
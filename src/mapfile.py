@@ -0,0 +1,251 @@
+import sys
+import struct
+import argparse
+import numpy as np
+from errors import ObstacleMapError
+
+"""
+This module contains the binary file format of the obstacle maps. A map file has a header of
+HEADER_SIZE bytes with the shape of the grid, the seed of the obstacles and the layout of the
+data, followed by the data in one of two layouts:
+
+    bitset: one bit per cell of the grid (cell x, y is bit x*n + y), for dense maps
+    coords: the sorted cell indices x*n + y of the obstacles as int64, for sparse maps
+
+The data is opened with np.memmap, so a map is ready as soon as the file is opened, there is
+nothing to parse and only the pages that are touched are read from disk.
+"""
+
+MAGIC = b'MROVOBS\x00' #first bytes of every map file
+VERSION = 1
+LAYOUTS = ('bitset', 'coords')
+HEADER_SIZE = 64 #bytes before the data, so the data is aligned
+_HEADER = struct.Struct('<8sHBxxxxxQQqQ') #magic, version, layout, m, n, seed (-1 if None), number of obstacles
+_NO_SEED = -1
+_CHUNK = 1 << 24 #bytes of the bitset read at once to list the positions
+
+
+class PackedBitmap:
+    """
+    This is the PackedBitmap class. It is a read only boolean bitmap of shape (m, n) indexed with
+    bitmap[xs, ys], like the occupancy of Obstacles, whose bits are stored in a memory mapped file.
+    """
+    def __init__(self, data:np.array, shape:tuple[int], count:int) -> None:
+        """
+        This is the constructor of the PackedBitmap class.
+
+        :param data: These are the packed bits, one per cell in row major order
+        :type data: numpy array object of uint8
+        :param shape: This is the shape of the bitmap (m, n)
+        :type shape: tuple of integers
+        :param count: This is the number of bits set
+        :type count: integer
+        """
+        self._data = data
+        self._shape = shape
+        self._count = count
+
+    @property
+    def shape(self) -> tuple[int]:
+        """
+        This property method returns the shape of the bitmap.
+
+        :return: dimensions of the bitmap
+        :rtype: tuple
+        """
+        return self._shape
+
+    def __len__(self) -> int:
+        """
+        This is the magic method that returns the number of obstacles.
+
+        :return: number of bits set
+        :rtype: integer
+        """
+        return self._count
+
+    def __getitem__(self, index:tuple):
+        """
+        This is the magic method to check cells of the bitmap.
+
+        :param index: this is the tuple (xs, ys) of coordinates
+        :type index: tuple of integers or numpy arrays
+        :return: returns the value of the cells
+        :rtype: bool or numpy array object
+        """
+        cells = np.asarray(index[0], dtype=np.int64) * self._shape[1] + np.asarray(index[1], dtype=np.int64)
+        values = (self._data[cells >> 3] >> (7 - (cells & 7)).astype(np.uint8)) & 1
+        return bool(values) if values.ndim == 0 else values.astype(bool)
+
+    def positions(self) -> np.array:
+        """
+        This method returns the positions of the cells set, reading the bitset in chunks.
+
+        :return: positions with shape (k, 2)
+        :rtype: numpy array object
+        """
+        cells = [np.flatnonzero(np.unpackbits(self._data[start:start + _CHUNK])) + 8*start
+                 for start in range(0, len(self._data), _CHUNK)]
+        cells = np.concatenate(cells) if cells else np.zeros(0, dtype=np.int64)
+        return np.stack((cells // self._shape[1], cells % self._shape[1]), axis=1)
+
+
+class SortedCoordinates(PackedBitmap):
+    """
+    This is the SortedCoordinates class. It behaves like PackedBitmap but the data are the sorted
+    cell indices of the obstacles, that are found with a binary search.
+    """
+    def __getitem__(self, index:tuple):
+        """
+        This is the magic method to check cells of the bitmap.
+
+        :param index: this is the tuple (xs, ys) of coordinates
+        :type index: tuple of integers or numpy arrays
+        :return: returns the value of the cells
+        :rtype: bool or numpy array object
+        """
+        cells = np.asarray(index[0], dtype=np.int64) * self._shape[1] + np.asarray(index[1], dtype=np.int64)
+        if not self._count:
+            values = np.zeros(cells.shape, dtype=bool)
+        else:
+            found = np.minimum(np.searchsorted(self._data, cells), self._count - 1)
+            values = self._data[found] == cells
+        return bool(values) if values.ndim == 0 else values
+
+    def positions(self) -> np.array:
+        """
+        This method returns the positions of the obstacles.
+
+        :return: positions with shape (k, 2)
+        :rtype: numpy array object
+        """
+        return np.stack((self._data // self._shape[1], self._data % self._shape[1]), axis=1)
+
+
+def write_map(path:str, positions, shape:tuple[int], seed:int = None, layout:str = 'auto') -> str:
+    """
+    This function writes an obstacle map file. The data is written through a memory map, so maps
+    bigger than the memory can be created.
+
+    :param path: This is the path of the file
+    :type path: string
+    :param positions: These are the positions of the obstacles, with shape (k, 2), all inside the grid
+    :type positions: numpy array object or list of tuples
+    :param shape: This is the shape of the grid (m, n)
+    :type shape: tuple of integers
+    :param seed: This is the seed used to create the obstacles, None if unknown
+    :type seed: integer
+    :param layout: This is one of LAYOUTS or auto, that picks the smallest one
+    :type layout: string
+    :return: the layout written
+    :rtype: string
+    """
+    m, n = int(shape[0]), int(shape[1])
+    positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+    if positions.size and ((positions < 0).any() or (positions >= (m, n)).any()):
+        raise ValueError(f'The obstacles must be inside the grid of shape {(m, n)} to be saved')
+    cells = np.unique(positions[:, 0] * n + positions[:, 1])
+    bitset_bytes = -(-m * n // 8)
+    if layout == 'auto':
+        layout = 'bitset' if bitset_bytes <= cells.nbytes else 'coords'
+    if layout not in LAYOUTS:
+        raise ValueError(f'The layout {layout} does not exist. Choose one of these: {", ".join(LAYOUTS)}')
+    header = _HEADER.pack(MAGIC, VERSION, LAYOUTS.index(layout), m, n, _NO_SEED if seed is None else seed, len(cells))
+    with open(path, 'wb') as file:
+        file.write(header.ljust(HEADER_SIZE, b'\x00'))
+        file.truncate(HEADER_SIZE + (bitset_bytes if layout == 'bitset' else cells.nbytes))
+    if layout == 'bitset' and bitset_bytes:
+        data = np.memmap(path, dtype=np.uint8, mode='r+', offset=HEADER_SIZE, shape=(bitset_bytes,))
+        np.bitwise_or.at(data, cells >> 3, (1 << (7 - (cells & 7))).astype(np.uint8))
+        data.flush()
+    elif layout == 'coords' and cells.size:
+        data = np.memmap(path, dtype=np.int64, mode='r+', offset=HEADER_SIZE, shape=cells.shape)
+        data[:] = cells
+        data.flush()
+    return layout
+
+
+def open_map(path:str) -> tuple:
+    """
+    This function opens an obstacle map file. Only the header is read, the data is memory mapped.
+
+    :param path: This is the path of the file
+    :type path: string
+    :return: the bitmap of the obstacles (PackedBitmap or SortedCoordinates) and the seed
+    :rtype: tuple
+    """
+    with open(path, 'rb') as file:
+        header = file.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+        raise ObstacleMapError(f'{path} is not an obstacle map file')
+    _, version, layout, m, n, seed, count = _HEADER.unpack_from(header)
+    if version != VERSION or layout >= len(LAYOUTS):
+        raise ObstacleMapError(f'{path} has version {version} and layout {layout}, that are not supported')
+    if LAYOUTS[layout] == 'bitset':
+        size = -(-m * n // 8)
+        data = np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER_SIZE, shape=(size,)) if size else np.zeros(0, np.uint8)
+        bitmap = PackedBitmap(data, (m, n), count)
+    else:
+        data = np.memmap(path, dtype=np.int64, mode='r', offset=HEADER_SIZE, shape=(count,)) if count else np.zeros(0, np.int64)
+        bitmap = SortedCoordinates(data, (m, n), count)
+    return bitmap, None if seed == _NO_SEED else seed
+
+
+def read_text_map(path:str) -> np.array:
+    """
+    This function reads the positions of the obstacles of a text file, one position per line
+    with the coordinates separated by a space or a comma, e.g. 3,4. Empty lines and lines starting
+    with # are skipped.
+
+    :param path: This is the path of the text file
+    :type path: string
+    :return: positions with shape (k, 2)
+    :rtype: numpy array object
+    """
+    with open(path) as file:
+        lines = (line.replace(',', ' ') for line in file if line.strip() and not line.lstrip().startswith('#'))
+        return np.loadtxt(lines, dtype=np.int64, ndmin=2).reshape(-1, 2)
+
+
+def convert_text_map(source:str, target:str, shape:tuple[int], seed:int = None, layout:str = 'auto') -> str:
+    """
+    This function converts a text file of obstacles into an obstacle map file.
+
+    :param source: This is the path of the text file
+    :type source: string
+    :param target: This is the path of the map file
+    :type target: string
+    :param shape: This is the shape of the grid (m, n)
+    :type shape: tuple of integers
+    :param seed: This is the seed used to create the obstacles, None if unknown
+    :type seed: integer
+    :param layout: This is one of LAYOUTS or auto, that picks the smallest one
+    :type layout: string
+    :return: the layout written
+    :rtype: string
+    """
+    return write_map(target, read_text_map(source), shape, seed, layout)
+
+
+def main(argv:list[str] = None) -> int:
+    """
+    This is the command line entry point of the converter of text obstacle maps.
+
+    :param argv: command line arguments, by default the ones of the process
+    :type argv: list of strings
+    :return: exit code
+    :rtype: integer
+    """
+    parser = argparse.ArgumentParser(description='Convert a text file of obstacles (one "x y" per line) into a binary obstacle map')
+    parser.add_argument('source', help='text file with the obstacles')
+    parser.add_argument('target', help='binary obstacle map written')
+    parser.add_argument('--shape', type=int, nargs=2, required=True, metavar=('M', 'N'), help='shape of the grid')
+    parser.add_argument('--seed', type=int, default=None, help='seed used to create the obstacles')
+    parser.add_argument('--layout', choices=('auto',) + LAYOUTS, default='auto', help='layout of the data (default the smallest one)')
+    args = parser.parse_args(argv)
+    print(f'{args.target}: {convert_text_map(args.source, args.target, args.shape, args.seed, args.layout)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
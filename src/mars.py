@@ -1,6 +1,12 @@
+import re
 import numpy as np
-import random
-from  errors import DirectionNotFoundError, CommandDoesNotExistError
+from typing import NamedTuple, Iterable, Iterator
+from  errors import DirectionNotFoundError, CommandDoesNotExistError, SparseGridError
+from program import parse_instructions, Repeat
+from history import History
+from tiles import TiledBitmap
+from mapfile import write_map, open_map
+from rayindex import RayIndex
 
 """"
 This module contains the three basic clases for Mars Rovers behavior and its
@@ -8,12 +14,59 @@ interaction with the environment (grid and obstacles). These classes could also
 in differents files. For example: Grid in grid.py, Obstacles in obstacles.py and Rovers in rovers.py
 """
 
+HEADINGS = ('N', 'E', 'S', 'W') #clockwise order, so a right rotation adds one to the heading index
+HEADING_VECTORS = ((0, 1), (1, 0), (0, -1), (-1, 0)) #direction vector of each heading in HEADINGS
+_SEGMENT_PATTERN = re.compile(r'M+|[LR]+|[^MLR]') #runs of moves, runs of rotations or a single unknown command
+_VECTORIZED_JUMP = 32 #rays longer than this are checked with the ray index instead of cell by cell
+_SET_UPDATE = 4096 #batches of obstacles bigger than this only update the occupancy bitmap, not the set
+_DX = np.array([dx for dx, _ in HEADING_VECTORS]) #x component of the direction vector of every heading index
+_DY = np.array([dy for _, dy in HEADING_VECTORS]) #y component of the direction vector of every heading index
+NO_COMMAND, MOVE, RIGHT, LEFT = 0, 1, 2, 3 #codes of the encoded instructions (NO_COMMAND pads shorter programs)
+_COMMAND_CODES = np.full(256, 255, dtype=np.uint8) #ascii character --> command code (255 if it does not exist)
+_COMMAND_CODES[[ord('M'), ord('R'), ord('L')]] = (MOVE, RIGHT, LEFT)
+_TURNS = np.array((0, 0, 1, 3)) #heading index increment of every command code
+
+def _count_wraps(start:int, walked:int, forward:int, period:int) -> int:
+    """
+    This function returns the number of times a straight jump wraps around the grid.
+
+    :param start: coordinate where the jump starts, in the axis of the jump
+    :type start: integer
+    :param walked: number of cells walked
+    :type walked: integer
+    :param forward: 1 if the coordinate increases, -1 if it decreases
+    :type forward: integer
+    :param period: length of the grid in the axis of the jump
+    :type period: integer
+    :return: number of wrap arounds
+    :rtype: integer
+    """
+    return (start + walked) // period if forward > 0 else (period - 1 - start + walked) // period
+
+
+class RoversEvent(NamedTuple):
+    """
+    This is an event of the Rovers yielded by Rovers.run_iter. The kind of event is 'move' for a
+    straight jump of one or more cells, 'rotate' for a change of direction and 'obstacle' when
+    the Rovers finds an obstacle and stops. The position and direction are the ones after the event,
+    except for 'obstacle' events, whose position is the cell with the obstacle.
+    """
+    kind: str
+    x: int
+    y: int
+    direction: str
+    steps: int = 0 #number of cells walked by a move event
+    wraps: int = 0 #number of times a move event wraps around the grid
+
+
 class Grid:
     """
     The Grid class will contain all the information of the plateau where Rovers can move. 
-    This will be used to check if Rovers is inside the grid or not. 
+    This will be used to check if Rovers is inside the grid or not. A sparse grid is never
+    materialized and the obstacles in it are stored in tiles allocated only when touched, so
+    huge plateaus (e.g. 10^6 X 10^6) can be explored.
     """
-    def __init__(self, m:int, n:int) -> None:
+    def __init__(self, m:int, n:int, sparse:bool = False) -> None:
         """
         This is the constructor of the class Grid. This class has the information of the custom
         grid (m X n) generated.
@@ -22,9 +75,12 @@ class Grid:
         :type m: integer
         :param n: This is the y dimension of the grid.
         :type n: integer
+        :param sparse: This is True if the grid must never be materialized
+        :type sparse: bool
         """
         self._m = m
         self._n = n
+        self._sparse = sparse
 
     def __getitem__(self, num:int) -> int:
         """
@@ -59,6 +115,16 @@ class Grid:
         """
         return (self._m, self._n)
 
+    @property
+    def sparse(self) -> bool:
+        """
+        This property method returns True if the grid is sparse and cannot be materialized.
+
+        :return: True if the grid is sparse
+        :rtype: bool
+        """
+        return self._sparse
+
     def get_grid(self) -> np.array:
         """
         This function returns the grid as an object of numpy array
@@ -66,6 +132,8 @@ class Grid:
         :return: grid
         :rtype: numpy array object
         """
+        if self._sparse:
+            raise SparseGridError(f'The sparse grid {self._m} X {self._n} cannot be materialized')
         return np.zeros((self._m, self._n))
 
 
@@ -78,18 +146,66 @@ class Rovers:
     it is facing we will use basic algebra on vectors mathematical objects. By applying matrix rotations we will obtain
     the direction where it points at. By adding the direction vector to the position vector we will obtain the next 
     position in the grid.
+
+    The state is stored as plain integers: the coordinates and the index of the heading in HEADINGS. A rotation
+    adds one (R) or three (L) to the heading index, which is the 90º rotation matrix applied to the direction
+    vector, and the vector is looked up in HEADING_VECTORS. So moving does not create any numpy array, whose
+    overhead is much bigger than the work done by every command. The numpy arrays are only built by the
+    position and vector properties.
     """
-    def __init__(self) -> None:
+    __slots__ = ('_x', '_y', '_heading', '_history', '_can_move', '_instrumentation')
+
+    def __init__(self, history:History = None, instrumentation = None) -> None:
         """
         This is the constructor of the Rovers class. The state information of the Rovers 
         will be stored in this magic method. The default position of Rovers is at (0,0) and facing North ('N).
         First quadrant have been chosen for practicity.
+
+        :param history: This is the store of the positions, by default a History keeping all of them
+        :type history: History
+        :param instrumentation: This is the instrumentation.Instrumentation that counts the moves and receives the
+            events. If None nothing is counted and the obstacles found are printed
+        :type instrumentation: Instrumentation
         """
-        self._pos: np.array = np.array((0,0))
-        self._dir: str = 'N' #Default direction is facing North (N)
-        self._dir_vec: np.array = np.array((0,1)) #Default direction vector is facing North (N)
-        self._history: list[list[int]] = [self._pos.tolist()]  #history of positions
+        self._x: int = 0
+        self._y: int = 0
+        self._heading: int = 0 #Default direction is facing North (N), index in HEADINGS
+        self._history: History = History() if history is None else history #history of positions
+        self._history.append(0, 0)
         self._can_move: bool = True
+        self._instrumentation = instrumentation
+
+    @classmethod
+    def from_state(cls, x:int, y:int, direction:str, can_move:bool = True, history:History = None, instrumentation = None):
+        """
+        This method creates a Rovers in a given state, e.g. to resume a mission from a checkpoint.
+
+        :param x: This is the x coordinate of the Rovers
+        :type x: integer
+        :param y: This is the y coordinate of the Rovers
+        :type y: integer
+        :param direction: This is the direction the Rovers is facing (N, E, S, W)
+        :type direction: string
+        :param can_move: This is False if the Rovers has found an obstacle
+        :type can_move: bool
+        :param history: This is the history of the positions, already recorded. If None a new one starting at (x, y)
+        :type history: History
+        :param instrumentation: This is the instrumentation, see the constructor
+        :type instrumentation: Instrumentation
+        :return: Returns the Rovers
+        :rtype: Rovers
+        """
+        if direction not in HEADINGS:
+            raise DirectionNotFoundError(f'The direction {direction} does not exist. Choose one of these: {", ".join(HEADINGS)}')
+        rovers = cls(History('off'), instrumentation)
+        rovers._x, rovers._y = int(x), int(y)
+        rovers._heading = HEADINGS.index(direction)
+        rovers._can_move = can_move
+        if history is None:
+            history = History()
+            history.append(x, y)
+        rovers._history = history
+        return rovers
 
     def __str__(self) -> str:
         """
@@ -100,19 +216,30 @@ class Rovers:
         :rtype: string
         """
         if self._can_move: #If there is an obstacle we add an O
-            return f'{self.position[0]}:{self.position[1]}:{self.direction}'
+            return f'{self._x}:{self._y}:{HEADINGS[self._heading]}'
         else:
-            return f'O:{self.position[0]}:{self.position[1]}:{self.direction}'
+            return f'O:{self._x}:{self._y}:{HEADINGS[self._heading]}'
 
     @property
     def position(self) -> tuple[float]:
         """
         This property method returns the position of the rovers.
 
-        :return: tuple of position coordinates
-        :rtype: tuple
+        :return: position coordinates
+        :rtype: numpy array object
+        """
+        return np.array((self._x, self._y))
+
+    @property
+    def cell(self) -> tuple[int]:
         """
-        return self._pos
+        This property method returns the position of the rovers as a tuple of integers, without creating
+        a numpy array, for loops that check the position at every move.
+
+        :return: position coordinates
+        :rtype: tuple of integers
+        """
+        return (self._x, self._y)
     
     @property
     def direction(self) -> str:
@@ -122,7 +249,7 @@ class Rovers:
         :return: direction where rovers is facing at current moment
         :rtype: string
         """
-        return self._dir
+        return HEADINGS[self._heading]
 
     @property
     def vector(self) -> np.array:
@@ -136,17 +263,27 @@ class Rovers:
         :return: Direction Vector (X,Y)
         :rtype: numpy array object
         """
-        return self._dir_vec
+        return np.array(HEADING_VECTORS[self._heading])
+
+    @property
+    def instrumentation(self):
+        """
+        This property method returns the instrumentation of the Rovers.
+
+        :return: instrumentation, None if it is disabled
+        :rtype: Instrumentation
+        """
+        return self._instrumentation
 
     @property
-    def history(self) -> list[list[int]]:
+    def history(self) -> History:
         """
         This property method returns the historical positions where Rovers
         has been during its exploration in Mars. This will be later used for
         drawing the path that it has followed.
 
-        :return: list of positions
-        :rtype: list
+        :return: store of positions
+        :rtype: History
         """
         return self._history
 
@@ -159,55 +296,6 @@ class Rovers:
         """
         return self._can_move
 
-    def ___wrap_around(self, pos:tuple, m:int, n:int):
-        """
-        When the Rovers reaches the final of the grid it wraps around it. It is like having periodic
-        boundary conditions. This method allows the Rovers to wrap around the grid and continue its 
-        exploration mission.
-
-        :param pos: position of the Rovers.
-        :type pos: tuple
-        :param m: m length of the grid
-        :type m: integer
-        :param n: n lenght of the grid
-        :type n: integer
-        :return: returns the position after wrapping around the grid
-        :rtype: tuple
-        """
-        pos_new = None
-        if(pos[0]>m-1):
-            pos_new = (pos[0]-m, pos[1])
-        if(pos[0]<0):
-            pos_new = (pos[0]+m, pos[1])
-        if(pos[1]>n-1):
-            pos_new = (pos[0], pos[1]-n)
-        if(pos[1]<0):
-            pos_new = (pos[0], pos[1]+n)
-        else:
-            pass
-        return pos_new
-
-
-    def __update_direction(self, vec:np.array) -> None:
-        """
-        This method updates the direction where the Rovers is facing. We use
-        vector directions to know where it has to face. 
-
-        :param vec: this is the vector direction after applying the rotation operation.
-        :type vec: numpy array object.
-        """
-        if((vec == np.array((0,-1))).all()):
-            self._dir = 'S'
-        elif((vec == np.array((0, 1))).all()):
-            self._dir = 'N'
-        elif((vec == np.array((1, 0))).all()):
-            self._dir = 'E'
-        elif((vec == np.array((-1, 0))).all()):
-            self._dir = 'W'
-        else:
-            raise DirectionNotFoundError(f'This direction vector {vec} does not exist')
-
-
     def move(self, command:str, grid:Grid, obstacles):
         """
         This is the move method of the Rovers. If the command is move ('M'). The robot
@@ -226,41 +314,334 @@ class Rovers:
         :type obstacles: Obstacles
         """
         if (command == 'M'):
-            self._pos_new = self._pos + self._dir_vec
-            if not obstacles.has(self._pos_new):
-                #check if position is in grid 
-                if(self._pos_new not in grid):
-                    self._pos_new = self.___wrap_around(self._pos_new, grid.shape[0], grid.shape[1])
-                self._pos = np.array((self._pos_new[0], self._pos_new[1]))
-                self._history.append(self._pos.tolist())
-            else:
+            dx, dy = HEADING_VECTORS[self._heading]
+            x, y = self._x + dx, self._y + dy
+            m, n = grid.shape
+            #check if position is in grid. The obstacle check is done on the wrapped cell
+            #because that is the cell the rovers would actually step on
+            wrapped = not (0 <= x < m and 0 <= y < n)
+            if(wrapped):
+                x, y = x % m, y % n
+            blocked = obstacles.has((x, y))
+            if not blocked:
+                self._x, self._y = x, y
+                self._history.append(x, y)
+            if self._instrumentation is not None:
+                counters = self._instrumentation.counters
+                counters['obstacle_checks'] += 1
+                counters['moves'] += not blocked
+                counters['wraps'] += wrapped and not blocked
+            if blocked:
                 self._can_move = False
-                print(f'Sorry captain, I have found an obstacle at position {self._pos_new}')
+                self.__obstacle_found(x, y)
         #right rotation
         elif (command == 'R'):
-            self._dir_vec = np.array((self._dir_vec[1], -self._dir_vec[0])) #rotation operation (90º clockwise)
-            self.__update_direction(self._dir_vec)
+            self._heading = (self._heading + 1) % 4 #rotation operation (90º clockwise)
+            if self._instrumentation is not None:
+                self._instrumentation.counters['rotations'] += 1
 
         #left rotation
         elif (command == 'L'):
-            self._dir_vec = np.array((-self._dir_vec[1], self._dir_vec[0])) #rotation operation (90º anti-clockwise)
-            self.__update_direction(self._dir_vec)
+            self._heading = (self._heading + 3) % 4 #rotation operation (90º anti-clockwise)
+            if self._instrumentation is not None:
+                self._instrumentation.counters['rotations'] += 1
         else:
             raise CommandDoesNotExistError(f'This command {command} does no exist. Choose one of these: M,R,L')
 
+    def execute(self, instructions:str, grid:Grid, obstacles) -> None:
+        """
+        This method executes a whole instruction string at once. It gives exactly the same result
+        (position, direction, history and obstacle message) as calling move for every character
+        and stopping as soon as the Rovers cannot move, but it is much faster for long missions.
+        The instructions are compiled into segments: consecutive rotations are folded into a single
+        heading change and consecutive moves are collapsed into one straight-line jump. Every jump
+        uses modular arithmetic on the grid (it is a torus because of the wrap around) and stops
+        in front of the first obstacle found on its way.
+
+        The instructions can also repeat a group of commands with the syntax (BODY)*COUNT, e.g.
+        (MMRMMLM)*1000000. The repetitions are not expanded: see __repeat.
+
+        :param instructions: This is the string of commands. Posible options are M (move), R (rotate right), L (rotate left)
+        :type instructions: string
+        :param grid: This is the grid object of the grid created
+        :type grid: Grid
+        :param obstacles: This is an instance of the Obstacles class
+        :type obstacles: Obstacles
+        """
+        nodes = parse_instructions(instructions) if '(' in instructions or ')' in instructions else [instructions]
+        state = [self._x, self._y, self._heading] #x, y and heading index
+        try:
+            self.__run(nodes, state, grid.shape, obstacles)
+        finally:
+            #the state is only written back once, also when an unknown command stops the execution
+            self._x, self._y, self._heading = state
+
+    def run_iter(self, instructions:Iterable[str], grid:Grid, obstacles) -> Iterator[RoversEvent]:
+        """
+        This method is the lazy version of execute. The instructions can be a string or an iterable of
+        strings (chunks), e.g. the one returned by program.read_instructions, so huge programs can be
+        streamed with constant memory. It yields a RoversEvent for every straight jump, change of
+        direction and for the obstacle that stops the Rovers. The position and direction properties of the
+        Rovers are updated when the generator is exhausted or closed, the events have the current state.
+        The repeat syntax is not allowed in streamed instructions.
+
+        :param instructions: This is the string of commands or an iterable of chunks of commands
+        :type instructions: string or iterable of strings
+        :param grid: This is the grid object of the grid created
+        :type grid: Grid
+        :param obstacles: This is an instance of the Obstacles class
+        :type obstacles: Obstacles
+        :return: generator of events
+        :rtype: generator of RoversEvent
+        """
+        m, n = grid.shape
+        x, y, heading = self._x, self._y, self._heading
+        try:
+            for chunk in ([instructions] if isinstance(instructions, str) else instructions):
+                for segment in _SEGMENT_PATTERN.finditer(chunk):
+                    if not self._can_move:
+                        return
+                    commands = segment.group()
+                    if commands[0] == 'M':
+                        dx, dy = HEADING_VECTORS[heading]
+                        start = x if dx else y
+                        x, y, walked = self.__jump(x, y, heading, len(commands), m, n, obstacles)
+                        if walked:
+                            wraps = _count_wraps(start, walked, dx or dy, m if dx else n)
+                            yield RoversEvent('move', x, y, HEADINGS[heading], walked, wraps)
+                        if not self._can_move:
+                            yield RoversEvent('obstacle', (x + dx) % m, (y + dy) % n, HEADINGS[heading])
+                    elif commands[0] in 'LR':
+                        heading = (heading + commands.count('R') - commands.count('L')) % 4
+                        if self._instrumentation is not None:
+                            self._instrumentation.counters['rotations'] += len(commands)
+                        yield RoversEvent('rotate', x, y, HEADINGS[heading])
+                    else:
+                        raise CommandDoesNotExistError(f'This command {commands} does no exist. Choose one of these: M,R,L')
+        finally:
+            self._x, self._y, self._heading = x, y, heading
+
+    def __run(self, nodes:list, state:list[int], shape:tuple[int], obstacles) -> None:
+        """
+        This method runs the nodes of a parsed program, updating the state [x, y, heading index] in place.
+
+        :param nodes: nodes of the program, strings of commands or Repeat groups
+        :type nodes: list
+        :param state: current x, y and heading index of the Rovers
+        :type state: list of integers
+        :param shape: This is the shape of the grid (m, n)
+        :type shape: tuple of integers
+        :param obstacles: This is an instance of the Obstacles class
+        :type obstacles: Obstacles
+        """
+        m, n = shape
+        for node in nodes:
+            if isinstance(node, Repeat):
+                self.__repeat(node, state, shape, obstacles)
+                continue
+            for segment in _SEGMENT_PATTERN.finditer(node):
+                if not self._can_move:
+                    return
+                commands = segment.group()
+                if commands[0] == 'M':
+                    state[0], state[1], _ = self.__jump(state[0], state[1], state[2], len(commands), m, n, obstacles)
+                elif commands[0] in 'LR':
+                    state[2] = (state[2] + commands.count('R') - commands.count('L')) % 4
+                    if self._instrumentation is not None:
+                        self._instrumentation.counters['rotations'] += len(commands)
+                else:
+                    raise CommandDoesNotExistError(f'This command {commands} does no exist. Choose one of these: M,R,L')
+
+    def __repeat(self, group:Repeat, state:list[int], shape:tuple[int], obstacles) -> None:
+        """
+        This method runs a repeated group of commands. The obstacles do not change, so the state after a
+        repetition only depends on the state before it. The state at the start of every repetition is stored
+        and, as soon as one is seen again, the Rovers has entered a cycle with no obstacle on its path. Then
+        the whole cycles left are skipped arithmetically and only the remaining repetitions are simulated.
+        To record the history of the skipped cycles, one lap is simulated again into a temporary full
+        History (the Rovers comes back to the same state) and tiled, and so are the counters of the instrumentation.
+
+        :param group: the repeated group with its body and number of repetitions
+        :type group: Repeat
+        :param state: current x, y and heading index of the Rovers
+        :type state: list of integers
+        :param shape: This is the shape of the grid (m, n)
+        :type shape: tuple of integers
+        :param obstacles: This is an instance of the Obstacles class
+        :type obstacles: Obstacles
+        """
+        seen = {} #state at the start of a repetition --> repetition number
+        repetition = 0
+        while repetition < group.count and self._can_move:
+            key = tuple(state)
+            if key in seen:
+                cycle = repetition - seen[key]
+                laps = (group.count - repetition) // cycle
+                if laps:
+                    history, self._history = self._history, History()
+                    counters = None if self._instrumentation is None else dict(self._instrumentation.counters)
+                    try:
+                        for _ in range(cycle):
+                            self.__run(group.body, state, shape, obstacles)
+                    finally:
+                        lap, self._history = self._history, history
+                    self._history.extend_tiled(lap.positions(), laps)
+                    if counters is not None:
+                        lap_counters = {name: value - counters[name] for name, value in self._instrumentation.counters.items()}
+                        self._instrumentation.add(lap_counters, laps - 1)
+                repetition += laps * cycle
+                seen.clear() #less than one cycle left, there is nothing more to skip
+                key = None
+            if repetition == group.count:
+                break
+            if key is not None:
+                seen[key] = repetition
+            self.__run(group.body, state, shape, obstacles)
+            repetition += 1
+
+    def __jump(self, x:int, y:int, heading:int, steps:int, m:int, n:int, obstacles) -> tuple[int]:
+        """
+        This method moves the Rovers a number of cells straight ahead in a single operation. The
+        visited cells are computed with modular arithmetic and added to the history. If there is an
+        obstacle on the way, the Rovers stops in the cell just before it and cannot move anymore.
+
+        :param x: x coordinate where the jump starts
+        :type x: integer
+        :param y: y coordinate where the jump starts
+        :type y: integer
+        :param heading: index in HEADINGS of the direction the Rovers is facing
+        :type heading: integer
+        :param steps: number of consecutive move commands
+        :type steps: integer
+        :param m: m length of the grid
+        :type m: integer
+        :param n: n lenght of the grid
+        :type n: integer
+        :param obstacles: This is an instance of the Obstacles class
+        :type obstacles: Obstacles
+        :return: returns the position where the jump ends and the number of cells walked
+        :rtype: tuple
+        """
+        dx, dy = HEADING_VECTORS[heading]
+        hit = obstacles.first_on_ray((x, y), (dx, dy), steps, (m, n))
+        walked = steps if hit is None else hit - 1
+        self._history.extend_ray(x, y, (dx, dy), walked, (m, n))
+        if self._instrumentation is not None:
+            counters = self._instrumentation.counters
+            counters['moves'] += walked
+            counters['obstacle_checks'] += walked + (hit is not None)
+            counters['wraps'] += _count_wraps(x if dx else y, walked, dx or dy, m if dx else n)
+        if hit is not None:
+            self._can_move = False
+            self.__obstacle_found((x + dx*hit) % m, (y + dy*hit) % n)
+        return (x + dx*walked) % m, (y + dy*walked) % n, walked
+
+    def __obstacle_found(self, x:int, y:int) -> None:
+        """
+        This method reports the obstacle that stops the Rovers. It is printed, or sent to the
+        sink of the instrumentation if there is one.
+
+        :param x: x coordinate of the obstacle
+        :type x: integer
+        :param y: y coordinate of the obstacle
+        :type y: integer
+        """
+        message = f'Sorry captain, I have found an obstacle at position {np.array((x, y))}'
+        if self._instrumentation is None:
+            print(message)
+        else:
+            self._instrumentation.counters['obstacle_stops'] += 1
+            self._instrumentation.emit('obstacle', message, x=int(x), y=int(y))
+
 
 
 class Obstacles:
     """
     This class is the responsible for creating new obstacles inside the grid
     and checking if a certain vector position (X,Y) is found inside the grid.
+    The positions are stored in a set so that checking a position is O(1). If the
+    grid is given, a boolean occupancy bitmap with the shape of the grid is also kept
+    so that many positions (for example the cells of a fleet) can be checked at once with numpy.
+    Long straight rays are cast with a RayIndex of the obstacles of every row and column.
+    For sparse grids the bitmap is a TiledBitmap, which only allocates the touched tiles.
+    The obstacles can be saved to a binary map file and loaded from it: a loaded map is memory
+    mapped and checked directly on the file until it is modified (see mapfile).
+    Obstacles can be added and removed at any time, one by one or in bulk, and the lookup structures
+    are updated only in the changed cells; every change increases the version.
     """
-    def __init__(self) -> None:
+    def __init__(self, grid:Grid = None) -> None:
+        """
+        This is the constructor of the class Obstacles. It has a set
+        that will contain the positions of the random created obstacles and,
+        optionally, a boolean bitmap of the grid cells with obstacles.
+
+        :param grid: This is the grid used for sizing the occupancy bitmap. If None no bitmap is created
+        :type grid: Grid
+        """
+        self._obstacles: set[tuple[int]] = set() #None for a loaded map until it is modified
+        self._occupancy = None #numpy array object, TiledBitmap or a memory mapped bitmap of a loaded map
+        if grid is not None:
+            self._occupancy = TiledBitmap(grid.shape) if grid.sparse else np.zeros(grid.shape, dtype=bool)
+        self._positions: np.array = None #cached array of the positions, built when needed
+        self._index: RayIndex = None #cached index of the obstacles of every row and column, built when needed
+        self._seed: int = None #seed of the random obstacles
+        self._outside: int = 0 #obstacles outside the occupancy bitmap, kept only in the set
+        self._version: int = 0 #number of changes, so the caches of the obstacles know when they are stale
+
+    @property
+    def version(self) -> int:
+        """
+        This property method returns the version of the obstacles, that grows every time obstacles are added
+        or removed, so the rovers and the caches that depend on them can tell cheaply if they changed.
+
+        :return: version
+        :rtype: integer
+        """
+        return self._version
+
+    @property
+    def seed(self) -> int:
+        """
+        This property method returns the seed used to create the random obstacles.
+
+        :return: seed, None if unknown
+        :rtype: integer
+        """
+        return self._seed
+
+    @classmethod
+    def load(cls, path:str):
         """
-        This is the constructor of the class Obstacles. It has a list
-        that will contain the positions of the random created obstacles.
+        This method opens the obstacles of a binary map file written by save. The file is memory mapped,
+        so nothing is parsed and only the pages that are checked are read from disk.
+
+        :param path: This is the path of the map file
+        :type path: string
+        :return: Returns the obstacles
+        :rtype: Obstacles
+        """
+        obstacles = cls()
+        obstacles._occupancy, obstacles._seed = open_map(path)
+        obstacles._obstacles = None
+        return obstacles
+
+    def save(self, path:str, grid:Grid = None, layout:str = 'auto') -> str:
+        """
+        This method writes the obstacles to a binary map file with the shape of the grid and the seed.
+
+        :param path: This is the path of the map file
+        :type path: string
+        :param grid: This is the grid of the obstacles. If None the shape of the occupancy bitmap is used
+        :type grid: Grid
+        :param layout: This is bitset (one bit per cell), coords (sorted positions) or auto (the smallest one)
+        :type layout: string
+        :return: the layout written
+        :rtype: string
         """
-        self._obstacles = []
+        if grid is None and self._occupancy is None:
+            raise ValueError('The shape of the grid is unknown, the grid has to be given to save the obstacles')
+        shape = grid.shape if grid is not None else self._occupancy.shape
+        return write_map(path, self.__position_array(), shape, self._seed, layout)
 
     def add_custom_obstacle(self, custom_obstacle_position:tuple[int]):
         """
@@ -272,9 +653,78 @@ class Obstacles:
         :returns: It returns the object
         :rtype: Obstacles instance
         """
-        self._obstacles.append(custom_obstacle_position)
+        return self.add(custom_obstacle_position)
+
+    def add(self, position:tuple[int]):
+        """
+        This method adds an obstacle. The lookup structures are updated in place and the version grows,
+        unless there was already an obstacle in that position.
+
+        :param position: This is the position of the obstacle
+        :type position: tuple of integers
+        :returns: It returns the object
+        :rtype: Obstacles instance
+        """
+        return self.add_many(position[0], position[1])
+
+    def remove(self, position:tuple[int]):
+        """
+        This method removes an obstacle, the opposite of add. Nothing changes if there is no obstacle in that position.
+
+        :param position: This is the position of the obstacle
+        :type position: tuple of integers
+        :returns: It returns the object
+        :rtype: Obstacles instance
+        """
+        return self.remove_many(position[0], position[1])
+
+    def add_many(self, xs:np.array, ys:np.array):
+        """
+        This method adds many obstacles at once given the arrays of their coordinates. The lookup structures are
+        updated only in the changed cells: the occupancy bitmap with one fancy index, the set and the ray index
+        in the rows and columns of the new obstacles. The version grows if any obstacle is new.
+
+        :param xs: x coordinates of the obstacles
+        :type xs: numpy array object
+        :param ys: y coordinates of the obstacles
+        :type ys: numpy array object
+        :returns: It returns the object
+        :rtype: Obstacles instance
+        """
+        self.__update(xs, ys, True)
         return self
 
+    def remove_many(self, xs:np.array, ys:np.array):
+        """
+        This method removes many obstacles at once, the opposite of add_many. Positions without obstacle are ignored.
+
+        :param xs: x coordinates of the obstacles
+        :type xs: numpy array object
+        :param ys: y coordinates of the obstacles
+        :type ys: numpy array object
+        :returns: It returns the object
+        :rtype: Obstacles instance
+        """
+        self.__update(xs, ys, False)
+        return self
+
+    @classmethod
+    def from_positions(cls, positions, grid:Grid = None):
+        """
+        This method creates the obstacles at the given positions at once.
+
+        :param positions: These are the positions of the obstacles, with shape (k, 2)
+        :type positions: numpy array object or list of tuples
+        :param grid: This is the grid used for sizing the occupancy bitmap. If None no bitmap is created
+        :type grid: Grid
+        :return: Returns the obstacles
+        :rtype: Obstacles
+        """
+        obstacles = cls(grid)
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        obstacles.__update_set(positions[:, 0], positions[:, 1], True)
+        return obstacles
+
     def get_obstacles_positions(self) -> list[tuple[int]]:
         """
         This is the getter method for checking the list of obstacle positions.
@@ -282,39 +732,378 @@ class Obstacles:
         :return: Returns the list of tuples with position coordinates of the obstacles
         :rtype: List of tuples of integers (coordinates in the grid)
         """
-        return self._obstacles
+        if self._obstacles is None:
+            return list(map(tuple, self.__position_array().tolist()))
+        return list(self._obstacles)
 
-    def create_obstacles_in_grid(self, grid, num=1):
+    def create_obstacles_in_grid(self, grid, num=1, seed=None):
         """
-        This method creates random (num) obstacles inside the grid.
+        This method creates random (num) obstacles inside the grid. The obstacles are sampled
+        without replacement over the flattened indices of the grid cells, leaving the first column free.
+        Cells that already have an obstacle are discarded and sampled again, so exactly num new
+        obstacles are created.
 
         :param grid: This is the object created for the custom grid
         :type grid: Grid
         :param num: This is the number of obstacles created inside the grid
         :type num: integer
+        :param seed: This is the seed of the numpy random generator. If None the obstacles are not reproducible
+        :type seed: integer
         :return: Returns the object instanciated
         :rtype: Obstacles
         """
-        max_num_x = grid.shape[0]
-        max_num_y = grid.shape[1]
-        for i in range(num):
-            random_obstacle = (random.randint(1,max_num_x-1), random.randint(0,max_num_y-1))
-            if random_obstacle not in self._obstacles:
-                self._obstacles.append(random_obstacle)
-            #avoid that they are the same. Recursive
-            else:
-                self.create_obstacles_in_grid(grid, num=num-len(self._obstacles))
+        self.__materialize()
+        self._seed = seed
+        max_num_x, max_num_y = grid.shape
+        cells = max(max_num_x - 1, 0) * max_num_y
+        taken = sum(1 for x, y in self._obstacles if 1 <= x < max_num_x and 0 <= y < max_num_y)
+        if num > cells - taken:
+            raise ValueError(f'There is no room for {num} obstacles in a grid with {cells - taken} free cells')
+        rng = np.random.default_rng(seed)
+        while num > 0:
+            indices = rng.choice(cells, size=num, replace=False)
+            xs, ys = indices // max_num_y + 1, indices % max_num_y
+            added = self.__update_set(xs, ys, True)
+            if added:
+                self.__changed(xs, ys, True)
+            num -= added
         return self
-       
+
+    def __update(self, xs:np.array, ys:np.array, added:bool) -> None:
+        """
+        This method adds or removes obstacles. Big batches, and every change of a loaded map, only write the
+        occupancy bitmap, which becomes the truth and the set is dropped: updating a set of tuples costs much
+        more than a fancy index. Small batches keep the set, so short rays are still checked cell by cell.
+
+        :param xs: x coordinates of the obstacles
+        :type xs: numpy array object
+        :param ys: y coordinates of the obstacles
+        :type ys: numpy array object
+        :param added: This is True if the obstacles are added, False if they are removed
+        :type added: bool
+        """
+        xs, ys = np.atleast_1d(np.asarray(xs, dtype=np.int64)), np.atleast_1d(np.asarray(ys, dtype=np.int64))
+        if xs.size == 0:
+            return
+        if self._occupancy is not None and self._outside == 0 and (self._obstacles is None or xs.size > _SET_UPDATE) \
+                and xs.min() >= 0 and ys.min() >= 0 and xs.max() < self._occupancy.shape[0] and ys.max() < self._occupancy.shape[1]:
+            self.__writable()
+            self._obstacles = None
+            changed = (self._occupancy[xs, ys] != added).any()
+            if changed:
+                self._occupancy[xs, ys] = added
+        else:
+            changed = self.__update_set(xs, ys, added) > 0
+        if changed:
+            self.__changed(xs, ys, added)
+
+    def __update_set(self, xs:np.array, ys:np.array, added:bool) -> int:
+        """
+        This method adds or removes obstacles in the set and in the occupancy bitmap. The ray index and
+        the version are not updated.
+
+        :param xs: x coordinates of the obstacles
+        :type xs: numpy array object
+        :param ys: y coordinates of the obstacles
+        :type ys: numpy array object
+        :param added: This is True if the obstacles are added, False if they are removed
+        :type added: bool
+        :return: number of obstacles added or removed
+        :rtype: integer
+        """
+        self.__materialize()
+        size = len(self._obstacles)
+        if self._occupancy is not None:
+            inside = (xs >= 0) & (xs < self._occupancy.shape[0]) & (ys >= 0) & (ys < self._occupancy.shape[1])
+            for position in zip(xs[~inside].tolist(), ys[~inside].tolist()):
+                #the obstacles outside the bitmap are rare and counted, only the set knows them
+                if added and position not in self._obstacles:
+                    self._obstacles.add(position)
+                    self._outside += 1
+                elif not added and position in self._obstacles:
+                    self._obstacles.discard(position)
+                    self._outside -= 1
+            xs, ys = xs[inside], ys[inside]
+        if added:
+            self._obstacles.update(zip(xs.tolist(), ys.tolist()))
+        else:
+            self._obstacles.difference_update(zip(xs.tolist(), ys.tolist()))
+        if self._occupancy is not None and len(self._obstacles) != size:
+            self._occupancy[xs, ys] = added
+        return abs(len(self._obstacles) - size)
+
+    def __changed(self, xs:np.array, ys:np.array, added:bool) -> None:
+        """
+        This method updates the ray index after obstacles are added or removed and increases the version.
+        The array of positions is built again only when it is needed.
+
+        :param xs: x coordinates of the changed cells
+        :type xs: numpy array object
+        :param ys: y coordinates of the changed cells
+        :type ys: numpy array object
+        :param added: This is True if the obstacles were added, False if they were removed
+        :type added: bool
+        """
+        if self._index is not None:
+            if added:
+                self._index.add(xs, ys)
+            else:
+                self._index.remove(xs, ys)
+        self._positions = None
+        self._version += 1
+
+    def first_on_ray(self, pos:tuple[int], vec:tuple[int], length:int, shape:tuple[int]):
+        """
+        This method looks for the first obstacle found when walking straight from position pos
+        in the direction vec, wrapping around the grid. Only the next length cells are checked.
+        Short rays are checked cell by cell, in the set or in the occupancy bitmap, so a loaded map only reads
+        the cells of the ray. Long rays are cast with a binary search on the sorted obstacles of the row or
+        column of the ray (see rayindex), so their cost does not depend on their length.
+
+        :param pos: this is the position where the walk starts (it is not checked)
+        :type pos: tuple of integers
+        :param vec: this is the direction vector of the walk
+        :type vec: tuple of integers
+        :param length: this is the number of cells walked
+        :type length: integer
+        :param shape: this is the shape of the grid (m, n)
+        :type shape: tuple of integers
+        :return: Returns the number of steps needed to reach the first obstacle or None if there is no obstacle
+        :rtype: integer or None
+        """
+        if self.__empty() or length <= 0:
+            return None
+        m, n = shape
+        period = m if vec[0] != 0 else n
+        if length <= _VECTORIZED_JUMP and self._obstacles is not None:
+            for distance in range(1, min(length, period) + 1):
+                if ((pos[0] + vec[0]*distance) % m, (pos[1] + vec[1]*distance) % n) in self._obstacles:
+                    return distance
+            return None
+        if length <= _VECTORIZED_JUMP and self._occupancy is not None and self._occupancy.shape == (m, n):
+            #the bitmap is the truth (a loaded map or after a big batch), only the cells of the ray are read
+            distances = np.arange(1, min(length, period) + 1)
+            blocked = self._occupancy[(pos[0] + vec[0]*distances) % m, (pos[1] + vec[1]*distances) % n]
+            return int(distances[blocked.argmax()]) if blocked.any() else None
+        if self._index is None or self._index.shape != (m, n):
+            self._index = RayIndex.build(self.__position_array(), (m, n))
+        return self._index.first(pos, vec, length)
+
+    def has_many(self, xs:np.array, ys:np.array) -> np.array:
+        """
+        This method checks many positions at once. It uses the occupancy bitmap when all the positions
+        are inside it, else the positions are compared with the obstacles encoded as integer keys.
+
+        :param xs: x coordinates of the positions
+        :type xs: numpy array object
+        :param ys: y coordinates of the positions
+        :type ys: numpy array object
+        :return: Returns a boolean array, True where there is an obstacle
+        :rtype: numpy array object
+        """
+        xs, ys = np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+        if self.__empty():
+            return np.zeros(xs.shape, dtype=bool)
+        if self._occupancy is not None and xs.size and xs.min() >= 0 and ys.min() >= 0 \
+                and xs.max() < self._occupancy.shape[0] and ys.max() < self._occupancy.shape[1]:
+            return self._occupancy[xs, ys]
+        positions = self.__position_array()
+        keys = (positions[:, 0].astype(np.int64) << 32) | (positions[:, 1] & 0xffffffff)
+        return np.isin((xs << 32) | (ys & 0xffffffff), keys)
+
     def has(self, pos:np.array) -> bool:
         """
         This methodChecks if there is any obstacle in position pos
         Returns True if there is obstacle else false
 
         :param pos: this is the position where we want to know if there is an obstacle or not
-        :type pos: numpy array object
+        :type pos: tuple or numpy array object
         :return: Returns True if there is an obstacle in that position. Else returns False.
         :rtype: bool
         """
-        return True if tuple(pos) in self._obstacles else False
+        if self._obstacles is None:
+            x, y = int(pos[0]), int(pos[1])
+            m, n = self._occupancy.shape
+            return 0 <= x < m and 0 <= y < n and bool(self._occupancy[x, y])
+        return (int(pos[0]), int(pos[1])) in self._obstacles
 
+    def __empty(self) -> bool:
+        """
+        This method checks if there are no obstacles.
+
+        :return: True if there is no obstacle
+        :rtype: bool
+        """
+        if self._obstacles is not None:
+            return not self._obstacles
+        #a bitmap written in place is not counted, it is checked as if it had obstacles
+        return not isinstance(self._occupancy, (np.ndarray, TiledBitmap)) and len(self._occupancy) == 0
+
+    def __position_array(self) -> np.array:
+        """
+        This method returns the positions of the obstacles as an array, caching it until they change.
+
+        :return: positions with shape (k, 2)
+        :rtype: numpy array object
+        """
+        if self._positions is None:
+            if self._obstacles is None and isinstance(self._occupancy, np.ndarray):
+                self._positions = np.argwhere(self._occupancy).astype(np.int64)
+            elif self._obstacles is None:
+                self._positions = self._occupancy.positions()
+            else:
+                self._positions = np.array(list(self._obstacles), dtype=np.int64).reshape(-1, 2)
+        return self._positions
+
+    def __materialize(self) -> None:
+        """
+        This method builds the set of positions when the occupancy bitmap is the truth, e.g. a loaded map
+        before it is modified or after a big batch of changes.
+        """
+        if self._obstacles is not None:
+            return
+        positions = self.__position_array()
+        self._obstacles = set(zip(positions[:, 0].tolist(), positions[:, 1].tolist()))
+        self.__writable()
+
+    def __writable(self) -> None:
+        """
+        This method replaces the read only memory mapped bitmap of a loaded map by a TiledBitmap with the same cells.
+        """
+        if isinstance(self._occupancy, (np.ndarray, TiledBitmap)):
+            return
+        positions = self.__position_array()
+        self._occupancy = TiledBitmap(self._occupancy.shape)
+        if len(positions):
+            self._occupancy[positions[:, 0], positions[:, 1]] = True
+
+
+class Fleet:
+    """
+    This is the Fleet class. It simulates many Rovers moving at the same time in the same grid.
+    Instead of having one Rovers object per rover, the state of all of them is stored in numpy
+    arrays (x, y, heading index and alive flag) and every instruction step is applied to all the
+    rovers that can still move with a few vector operations. The rovers follow the same rules as
+    Rovers.move: they wrap around the grid and stop forever in front of the first obstacle.
+    The rovers do not see each other, only the obstacles.
+    """
+    def __init__(self, size:int) -> None:
+        """
+        This is the constructor of the Fleet class. All the rovers start at (0,0) facing North ('N').
+
+        :param size: This is the number of rovers of the fleet
+        :type size: integer
+        """
+        self._x: np.array = np.zeros(size, dtype=np.int64)
+        self._y: np.array = np.zeros(size, dtype=np.int64)
+        self._heading: np.array = np.zeros(size, dtype=np.int64) #index in HEADINGS
+        self._alive: np.array = np.ones(size, dtype=bool) #False once the rover finds an obstacle
+
+    def __len__(self) -> int:
+        """
+        This is the length magic method. It returns the number of rovers of the fleet.
+
+        :return: number of rovers
+        :rtype: integer
+        """
+        return self._x.size
+
+    def __getitem__(self, num:int) -> str:
+        """
+        This is the magic method to get the state of one rover of the fleet. It has the same
+        format as the string of a Rovers object, e.g. 2:3:N or O:2:4:N if it found an obstacle.
+
+        :param num: this is the index of the rover
+        :type num: integer
+        :return: state of the rover
+        :rtype: string
+        """
+        state = f'{self._x[num]}:{self._y[num]}:{HEADINGS[self._heading[num]]}'
+        return state if self._alive[num] else f'O:{state}'
+
+    @property
+    def positions(self) -> np.array:
+        """
+        This property method returns the positions of all the rovers.
+
+        :return: array of shape (size, 2) with the x and y coordinates
+        :rtype: numpy array object
+        """
+        return np.column_stack((self._x, self._y))
+
+    @property
+    def directions(self) -> np.array:
+        """
+        This property method returns the directions (N,S,W,E) where the rovers are facing.
+
+        :return: array of directions
+        :rtype: numpy array object
+        """
+        return np.array(HEADINGS)[self._heading]
+
+    @property
+    def alive(self) -> np.array:
+        """
+        This property method returns which rovers can still move.
+
+        :return: boolean array, False for the rovers that found an obstacle
+        :rtype: numpy array object
+        """
+        return self._alive
+
+    @staticmethod
+    def encode(instructions:list[str]) -> np.array:
+        """
+        This method encodes the instructions of every rover as a matrix of command codes
+        (MOVE, RIGHT, LEFT), one row per rover. Shorter programs are padded with NO_COMMAND.
+
+        :param instructions: list with the instructions string of every rover
+        :type instructions: list of strings
+        :return: matrix of command codes with shape (number of rovers, longest program)
+        :rtype: numpy array object
+        """
+        length = max((len(program) for program in instructions), default=0)
+        encoded = np.zeros((len(instructions), length), dtype=np.uint8)
+        for row, program in enumerate(instructions):
+            codes = _COMMAND_CODES[np.frombuffer(program.encode('latin-1', 'replace'), dtype=np.uint8)]
+            if (codes == 255).any():
+                command = program[int((codes == 255).argmax())]
+                raise CommandDoesNotExistError(f'This command {command} does no exist. Choose one of these: M,R,L')
+            encoded[row, :codes.size] = codes
+        return encoded
+
+    def execute(self, instructions, grid:Grid, obstacles) -> None:
+        """
+        This method moves all the rovers of the fleet in lockstep. At every step each live rover
+        runs its next command: rotations update the heading index and moves compute the next
+        cell with modular arithmetic. Rovers whose next cell has an obstacle stop forever.
+
+        :param instructions: list with the instructions string of every rover or the matrix returned by encode
+        :type instructions: list of strings or numpy array object
+        :param grid: This is the grid object of the grid created
+        :type grid: Grid
+        :param obstacles: This is an instance of the Obstacles class
+        :type obstacles: Obstacles
+        """
+        program = instructions if isinstance(instructions, np.ndarray) else self.encode(instructions)
+        if program.shape[0] != len(self):
+            raise ValueError(f'Expected instructions for {len(self)} rovers, got {program.shape[0]}')
+        m, n = grid.shape
+        lengths = program.shape[1] - (program[:, ::-1] != NO_COMMAND).argmax(axis=1)
+        lengths[(program == NO_COMMAND).all(axis=1)] = 0
+        live = np.flatnonzero(self._alive & (lengths > 0))
+        for step in range(program.shape[1]):
+            live = live[lengths[live] > step]
+            if live.size == 0:
+                break
+            codes = program[live, step]
+            self._heading[live] = (self._heading[live] + _TURNS[codes]) % 4
+            moving = live[codes == MOVE]
+            headings = self._heading[moving]
+            xs, ys = (self._x[moving] + _DX[headings]) % m, (self._y[moving] + _DY[headings]) % n
+            blocked = obstacles.has_many(xs, ys)
+            if blocked.any():
+                self._alive[moving[blocked]] = False
+                live = live[self._alive[live]]
+                moving, xs, ys = moving[~blocked], xs[~blocked], ys[~blocked]
+            self._x[moving], self._y[moving] = xs, ys
@@ -0,0 +1,250 @@
+import heapq
+import collections
+import numpy as np
+from mars import HEADINGS, HEADING_VECTORS, Grid, Obstacles
+from errors import DirectionNotFoundError, PlanningError
+
+"""
+This module contains the path planner of the Mars Rovers. It finds the shortest program of
+commands (M, L, R) that takes the rovers from a start state (x, y, direction) to a target cell,
+with the same rules as Rovers.move: every command costs one, moving wraps around the grid and
+the rovers cannot move into a cell with an obstacle.
+"""
+
+_DX = np.array([dx for dx, _ in HEADING_VECTORS]) #x component of the direction vector of every heading index
+_DY = np.array([dy for _, dy in HEADING_VECTORS]) #y component of the direction vector of every heading index
+_FIELD_CELLS = 1 << 22 #grids with more cells than this are planned with A* instead of distance fields
+_CACHE_BYTES = 1 << 28 #bytes of the distance fields kept
+
+
+class Planner:
+    """
+    This is the Planner class. For grids of up to max_field_cells cells it computes, once per target,
+    a reverse distance field: the number of commands needed to reach the target from every state
+    (heading, x, y), found with a breadth first search backwards from the target. The fields of the last
+    targets are cached (up to cache_bytes bytes), so planning from many starts to the same target is a walk
+    down the field.
+    Bigger (or sparse) grids are planned with A* and a heuristic that knows the grid is a torus.
+    The cached fields are forgotten when the version of the obstacles changes.
+    """
+    def __init__(self, grid:Grid, obstacles:Obstacles, max_field_cells:int = _FIELD_CELLS, cache_bytes:int = _CACHE_BYTES,
+                 max_states:int = 10_000_000) -> None:
+        """
+        This is the constructor of the Planner class.
+
+        :param grid: This is the grid where the rovers moves
+        :type grid: Grid
+        :param obstacles: These are the obstacles of the grid
+        :type obstacles: Obstacles
+        :param max_field_cells: This is the maximum number of cells of a grid planned with distance fields
+        :type max_field_cells: integer
+        :param cache_bytes: This is the maximum number of bytes of the distance fields kept, the last one is always kept
+        :type cache_bytes: integer
+        :param max_states: This is the maximum number of states expanded by A*
+        :type max_states: integer
+        """
+        self._shape = grid.shape
+        self._obstacles = obstacles
+        self._use_fields = not grid.sparse and grid.shape[0] * grid.shape[1] <= max_field_cells
+        self._cache_bytes = cache_bytes
+        self._max_states = max_states
+        self._fields = collections.OrderedDict() #target --> distance field, the last used at the end
+        self._nbytes = 0 #bytes of the cached fields
+        self._free = None #boolean array of the cells without obstacles, built when needed
+        self._version = obstacles.version #version of the obstacles of the cached fields
+
+    def clear(self) -> None:
+        """
+        This method forgets the cached distance fields. It is called when the obstacles change.
+        """
+        self._fields.clear()
+        self._nbytes = 0
+        self._free = None
+        self._version = self._obstacles.version
+
+    def distance_field(self, target:tuple[int]) -> np.array:
+        """
+        This method returns the reverse distance field of a target, computing it if it is not cached. The least
+        recently used fields are forgotten when the cached fields take more than cache_bytes bytes.
+
+        :param target: This is the target cell (x, y)
+        :type target: tuple of integers
+        :return: number of commands to reach the target from every state, -1 if it cannot be reached, with shape (4, m, n)
+        :rtype: numpy array object
+        """
+        if self._obstacles.version != self._version:
+            self.clear()
+        target = (int(target[0]) % self._shape[0], int(target[1]) % self._shape[1])
+        if target in self._fields:
+            self._fields.move_to_end(target)
+            return self._fields[target]
+        field = self.__field(target)
+        self._fields[target] = field
+        self._nbytes += field.nbytes
+        while self._nbytes > self._cache_bytes and len(self._fields) > 1:
+            self._nbytes -= self._fields.popitem(last=False)[1].nbytes
+        return field
+
+    def plan(self, start:tuple, target:tuple[int]) -> str:
+        """
+        This method returns the shortest program that takes the rovers from start to the target cell.
+        Among the shortest programs, moving is preferred to rotating right and rotating right to rotating left.
+
+        :param start: This is the start state (x, y, direction), e.g. (0, 0, 'N')
+        :type start: tuple
+        :param target: This is the target cell (x, y)
+        :type target: tuple of integers
+        :return: program of commands, None if the target cannot be reached
+        :rtype: string
+        """
+        x, y, heading = self.__state(start)
+        if self._obstacles.has((x, y)):
+            raise PlanningError(f'The start {(x, y)} has an obstacle')
+        target = (int(target[0]) % self._shape[0], int(target[1]) % self._shape[1])
+        if self._use_fields:
+            return self.__walk(self.distance_field(target), x, y, heading)
+        return self.__astar((x, y, heading), target)
+
+    def __state(self, start:tuple) -> tuple[int]:
+        """
+        This method converts a start state to integers, the direction to its heading index.
+
+        :param start: This is the start state (x, y, direction)
+        :type start: tuple
+        :return: x, y and heading index
+        :rtype: tuple of integers
+        """
+        if start[2] not in HEADINGS:
+            raise DirectionNotFoundError(f'The direction {start[2]} does not exist. Choose one of these: {", ".join(HEADINGS)}')
+        return int(start[0]) % self._shape[0], int(start[1]) % self._shape[1], HEADINGS.index(start[2])
+
+    def __free_cells(self) -> np.array:
+        """
+        This method returns the flattened boolean array of the cells without obstacles.
+
+        :return: free cells, cell x, y is x*n + y
+        :rtype: numpy array object
+        """
+        if self._free is None:
+            m, n = self._shape
+            cells = np.arange(m * n, dtype=np.int64)
+            self._free = ~self._obstacles.has_many(cells // n, cells % n)
+        return self._free
+
+    def __field(self, target:tuple[int]) -> np.array:
+        """
+        This method computes the reverse distance field of a target with a breadth first search that
+        goes backwards from the four states on the target. Every level processes only its frontier of states.
+
+        :param target: This is the target cell (x, y)
+        :type target: tuple of integers
+        :return: distance field with shape (4, m, n)
+        :rtype: numpy array object
+        """
+        m, n = self._shape
+        size = m * n
+        free = self.__free_cells()
+        distances = np.full(4 * size, -1, dtype=np.int32)
+        if not free[target[0] * n + target[1]]:
+            return distances.reshape(4, m, n)
+        frontier = np.arange(4, dtype=np.int64) * size + target[0] * n + target[1]
+        distances[frontier] = 0
+        level = 0
+        while frontier.size:
+            level += 1
+            heading, cell = np.divmod(frontier, size)
+            x, y = np.divmod(cell, n)
+            before = ((x - _DX[heading]) % m) * n + (y - _DY[heading]) % n #cell from where a move reaches the state
+            moved = (heading * size + before)[free[before]]
+            right = (heading - 1) % 4 * size + cell #state from where a right rotation reaches the state
+            left = (heading + 1) % 4 * size + cell #state from where a left rotation reaches the state
+            candidates = np.concatenate((moved, right, left))
+            frontier = np.unique(candidates[distances[candidates] < 0])
+            distances[frontier] = level
+        return distances.reshape(4, m, n)
+
+    def __walk(self, field:np.array, x:int, y:int, heading:int) -> str:
+        """
+        This method walks down a distance field from a start state, one command per step.
+
+        :param field: This is the distance field of the target
+        :type field: numpy array object
+        :param x: x coordinate of the start
+        :type x: integer
+        :param y: y coordinate of the start
+        :type y: integer
+        :param heading: heading index of the start
+        :type heading: integer
+        :return: program of commands, None if the target cannot be reached
+        :rtype: string
+        """
+        m, n = self._shape
+        distance = int(field[heading, x, y])
+        if distance < 0:
+            return None
+        program = []
+        while distance > 0:
+            dx, dy = HEADING_VECTORS[heading]
+            if field[heading, (x + dx) % m, (y + dy) % n] == distance - 1:
+                x, y = (x + dx) % m, (y + dy) % n
+                program.append('M')
+            elif field[(heading + 1) % 4, x, y] == distance - 1:
+                heading = (heading + 1) % 4
+                program.append('R')
+            else:
+                heading = (heading - 1) % 4
+                program.append('L')
+            distance -= 1
+        return ''.join(program)
+
+    def __astar(self, start:tuple[int], target:tuple[int]) -> str:
+        """
+        This method finds the shortest program with A*. The heuristic is the distance on the torus
+        (the shortest way around every axis) plus one rotation if the rovers has to turn at least once.
+
+        :param start: This is the start state (x, y, heading index)
+        :type start: tuple of integers
+        :param target: This is the target cell (x, y)
+        :type target: tuple of integers
+        :return: program of commands, None if the target cannot be reached
+        :rtype: string
+        """
+        m, n = self._shape
+        tx, ty = target
+        if self._obstacles.has(target):
+            return None
+
+        def heuristic(x:int, y:int, heading:int) -> int:
+            ax = min((tx - x) % m, (x - tx) % m)
+            ay = min((ty - y) % n, (y - ty) % n)
+            turns = 1 if (ax and ay) or (ax and heading % 2 == 0) or (ay and heading % 2 == 1) else 0
+            return ax + ay + turns
+
+        costs = {start: 0}
+        parents = {start: None} #state --> (previous state, command)
+        heap = [(heuristic(*start), 0, start)]
+        expanded = 0
+        while heap:
+            _, cost, state = heapq.heappop(heap)
+            if cost > costs[state]:
+                continue
+            x, y, heading = state
+            if (x, y) == target:
+                program = []
+                while parents[state] is not None:
+                    state, command = parents[state]
+                    program.append(command)
+                return ''.join(reversed(program))
+            expanded += 1
+            if expanded > self._max_states:
+                raise PlanningError(f'The search expanded more than {self._max_states} states without reaching {target}')
+            dx, dy = HEADING_VECTORS[heading]
+            ahead = ((x + dx) % m, (y + dy) % n)
+            for command, following in (('M', ahead + (heading,)), ('R', (x, y, (heading + 1) % 4)), ('L', (x, y, (heading - 1) % 4))):
+                if command == 'M' and self._obstacles.has(ahead):
+                    continue
+                if cost + 1 < costs.get(following, cost + 2):
+                    costs[following] = cost + 1
+                    parents[following] = (state, command)
+                    heapq.heappush(heap, (cost + 1 + heuristic(*following), cost + 1, following))
+        return None
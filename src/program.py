@@ -0,0 +1,164 @@
+import re
+import sys
+from typing import NamedTuple
+from errors import InstructionSyntaxError
+
+"""
+This module contains the parser of the instructions programs. Besides the basic commands
+(M, R, L) a program can repeat a group of commands with the syntax (BODY)*COUNT, e.g.
+(MMRMMLM)*1000000. Groups can be nested, e.g. M(R(M)*3)*2. It also contains the reader
+of instructions streamed in chunks from the standard input or from a file.
+"""
+
+_WHITESPACE = str.maketrans('', '', ' \t\r\n') #removed from the streamed instructions
+_TOKEN_PATTERN = re.compile(r'\(|\)\*(\d+)|\)|[^()]+') #open group, close group with count, close group without count or commands
+_MAX_DEPTH = 64 #maximum number of nested groups, the programs are run recursively
+
+
+class Repeat(NamedTuple):
+    """
+    This is a repeated group of a program. The body is a tuple of nodes, every node
+    is either a string of commands or another Repeat.
+    """
+    body: tuple
+    count: int
+
+
+def parse_instructions(instructions:str) -> list:
+    """
+    This function parses a program with the repeat syntax into a list of nodes. Every node
+    is either a string of commands (that is not validated here) or a Repeat. Groups can be nested
+    up to _MAX_DEPTH levels.
+
+    :param instructions: This is the program, e.g. M(MMRMMLM)*1000
+    :type instructions: string
+    :return: list of nodes of the program
+    :rtype: list
+    """
+    stack = [[]] #the last element is the body of the innermost open group
+    for token in _TOKEN_PATTERN.finditer(instructions):
+        text = token.group()
+        if text == '(':
+            if len(stack) > _MAX_DEPTH:
+                raise InstructionSyntaxError(f'There are more than {_MAX_DEPTH} nested groups at position {token.start()}')
+            stack.append([])
+        elif text[0] == ')':
+            if len(stack) == 1:
+                raise InstructionSyntaxError(f'There is a ) without ( at position {token.start()}')
+            if token.group(1) is None:
+                raise InstructionSyntaxError(f'The group closed at position {token.start()} needs a count, e.g. (MRM)*3')
+            body = stack.pop()
+            stack[-1].append(Repeat(tuple(body), int(token.group(1))))
+        else:
+            stack[-1].append(text)
+    if len(stack) > 1:
+        raise InstructionSyntaxError('There is a ( without )')
+    return stack[0]
+
+
+def expand_instructions(instructions:str) -> str:
+    """
+    This function expands a program with the repeat syntax into the plain string of commands.
+    It is the naive expansion, so its length is the total number of commands of the program.
+
+    :param instructions: This is the program, e.g. M(MMRMMLM)*1000
+    :type instructions: string
+    :return: plain string of commands
+    :rtype: string
+    """
+    return _expand(parse_instructions(instructions))
+
+
+def iter_instructions(instructions:str, chunk_size:int = 1 << 16):
+    """
+    This function expands a program with the repeat syntax lazily, in chunks of plain commands, so
+    the expansion of a long program does not need more memory than a few chunks.
+
+    :param instructions: This is the program, e.g. M(MMRMMLM)*1000000
+    :type instructions: string
+    :param chunk_size: This is the approximate number of commands of every chunk
+    :type chunk_size: integer
+    :return: generator of chunks of commands
+    :rtype: generator of strings
+    """
+    buffer, size = [], 0
+    for piece in _pieces(parse_instructions(instructions), chunk_size):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _expand(nodes) -> str:
+    """
+    This function expands nodes of a program into the plain string of commands.
+
+    :param nodes: These are the nodes, strings of commands or Repeat
+    :type nodes: list or tuple
+    :return: plain string of commands
+    :rtype: string
+    """
+    return ''.join(node if isinstance(node, str) else _expand(node.body) * node.count for node in nodes)
+
+
+def _length(nodes) -> int:
+    """
+    This function returns the number of commands of nodes of a program, without expanding them.
+
+    :param nodes: These are the nodes, strings of commands or Repeat
+    :type nodes: list or tuple
+    :return: number of commands
+    :rtype: integer
+    """
+    return sum(len(node) if isinstance(node, str) else _length(node.body) * node.count for node in nodes)
+
+
+def _pieces(nodes, chunk_size:int):
+    """
+    This function yields the expansion of nodes of a program in pieces. The body of a group shorter than
+    a chunk is expanded once and yielded repeated as many times as fit in a chunk.
+
+    :param nodes: These are the nodes, strings of commands or Repeat
+    :type nodes: list or tuple
+    :param chunk_size: This is the approximate number of commands of every piece
+    :type chunk_size: integer
+    :return: generator of pieces of commands
+    :rtype: generator of strings
+    """
+    for node in nodes:
+        if isinstance(node, str):
+            yield node
+        elif _length(node.body) <= chunk_size:
+            body = _expand(node.body)
+            times = max(chunk_size // max(len(body), 1), 1) #repetitions per piece
+            for done in range(0, node.count if body else 0, times):
+                yield body * min(times, node.count - done)
+        else:
+            for _ in range(node.count):
+                yield from _pieces(node.body, chunk_size)
+
+
+def read_instructions(source:str = '-', chunk_size:int = 1 << 16):
+    """
+    This function reads the instructions in chunks, so programs much bigger than the memory can
+    be executed with Rovers.run_iter. Whitespaces and line breaks are removed.
+
+    :param source: This is the path of the file with the instructions or - for the standard input
+    :type source: string
+    :param chunk_size: This is the number of characters read at once
+    :type chunk_size: integer
+    :return: generator of chunks of instructions
+    :rtype: generator of strings
+    """
+    file = sys.stdin if source == '-' else open(source)
+    try:
+        while chunk := file.read(chunk_size):
+            chunk = chunk.translate(_WHITESPACE)
+            if chunk:
+                yield chunk
+    finally:
+        if file is not sys.stdin:
+            file.close()
@@ -0,0 +1,183 @@
+import numpy as np
+
+"""
+This module contains the RayIndex class, the index of the obstacles used to cast the straight
+rays of the Rovers. A rovers moving straight can only find the obstacles of its row (moving East
+or West) or of its column (moving North or South), so the index keeps the sorted coordinates of
+the obstacles of every row and column and finds the first obstacle of a ray with a binary search,
+wrapping around the grid. The memory scales with the number of obstacles, not with the grid.
+"""
+
+_MAX_PENDING = 16 #changes queued in a row or column before they are merged even if no ray is cast on it
+
+
+class RayIndex:
+    """
+    This is the RayIndex class. It has two dictionaries of sorted numpy arrays: for every row y the
+    x coordinates of its obstacles and for every column x the y coordinates of its obstacles.
+    Rows and columns without obstacles are not stored.
+    """
+    def __init__(self, shape:tuple[int]) -> None:
+        """
+        This is the constructor of the RayIndex class. The index is empty.
+
+        :param shape: This is the shape of the grid (m, n)
+        :type shape: tuple of integers
+        """
+        self._shape = (int(shape[0]), int(shape[1]))
+        self._rows: dict[int, np.array] = {} #y --> sorted x coordinates of the obstacles of the row
+        self._columns: dict[int, np.array] = {} #x --> sorted y coordinates of the obstacles of the column
+        self._pending_rows: dict[int, list] = {} #y --> changes (added or not, x coordinates) not merged yet
+        self._pending_columns: dict[int, list] = {} #x --> changes (added or not, y coordinates) not merged yet
+
+    @classmethod
+    def build(cls, positions, shape:tuple[int]):
+        """
+        This method creates the index of many obstacles at once. Obstacles outside the grid are ignored.
+
+        :param positions: These are the positions of the obstacles, with shape (k, 2)
+        :type positions: numpy array object or list of tuples
+        :param shape: This is the shape of the grid (m, n)
+        :type shape: tuple of integers
+        :return: the index
+        :rtype: RayIndex
+        """
+        index = cls(shape)
+        m, n = index._shape
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        positions = positions[(positions[:, 0] >= 0) & (positions[:, 0] < m) & (positions[:, 1] >= 0) & (positions[:, 1] < n)]
+        index._rows = cls.__group(positions[:, 1], positions[:, 0])
+        index._columns = cls.__group(positions[:, 0], positions[:, 1])
+        return index
+
+    def add(self, xs:np.array, ys:np.array) -> None:
+        """
+        This method adds obstacles to the index. The cost depends only on the number of new obstacles: they are
+        grouped by row and column and queued, and the sorted array of a row or column is merged with its queued
+        changes the next time a ray is cast on it. Obstacles outside the grid are ignored.
+
+        :param xs: x coordinates of the obstacles
+        :type xs: numpy array object
+        :param ys: y coordinates of the obstacles
+        :type ys: numpy array object
+        """
+        self.__queue(xs, ys, True)
+
+    def remove(self, xs:np.array, ys:np.array) -> None:
+        """
+        This method removes obstacles from the index, queued like the ones added. Obstacles that are not in
+        the index are ignored.
+
+        :param xs: x coordinates of the obstacles
+        :type xs: numpy array object
+        :param ys: y coordinates of the obstacles
+        :type ys: numpy array object
+        """
+        self.__queue(xs, ys, False)
+
+    @property
+    def shape(self) -> tuple[int]:
+        """
+        This property method returns the shape of the grid of the index.
+
+        :return: dimensions of the grid
+        :rtype: tuple
+        """
+        return self._shape
+
+    def first(self, pos:tuple[int], vec:tuple[int], length:int) -> int:
+        """
+        This method finds the first obstacle of the ray that starts at pos (not checked) and walks
+        length cells in the direction vec, wrapping around the grid. An obstacle in the starting cell
+        is found after a whole lap.
+
+        :param pos: this is the position where the walk starts
+        :type pos: tuple of integers
+        :param vec: this is the direction vector of the walk
+        :type vec: tuple of integers
+        :param length: this is the number of cells walked
+        :type length: integer
+        :return: Returns the number of steps needed to reach the first obstacle or None if there is no obstacle
+        :rtype: integer or None
+        """
+        if vec[0] != 0:
+            if int(pos[1]) in self._pending_rows:
+                self.__merge(self._rows, self._pending_rows, int(pos[1]))
+            line, start, forward, period = self._rows.get(int(pos[1])), int(pos[0]), vec[0] > 0, self._shape[0]
+        else:
+            if int(pos[0]) in self._pending_columns:
+                self.__merge(self._columns, self._pending_columns, int(pos[0]))
+            line, start, forward, period = self._columns.get(int(pos[0])), int(pos[1]), vec[1] > 0, self._shape[1]
+        if line is None:
+            return None
+        if forward:
+            i = int(np.searchsorted(line, start, side='right'))
+            distance = int(line[i]) - start if i < len(line) else int(line[0]) + period - start
+        else:
+            i = int(np.searchsorted(line, start, side='left')) - 1
+            distance = start - int(line[i]) if i >= 0 else start - int(line[-1]) + period
+        return distance if distance <= length else None
+
+    @staticmethod
+    def __group(keys:np.array, values:np.array) -> dict:
+        """
+        This method groups the values by key, every group sorted.
+
+        :param keys: keys of the groups (rows or columns)
+        :type keys: numpy array object
+        :param values: values grouped (coordinates along the row or column)
+        :type values: numpy array object
+        :return: dictionary key --> sorted values
+        :rtype: dict
+        """
+        order = np.lexsort((values, keys))
+        keys, values = keys[order], values[order]
+        unique, starts = np.unique(keys, return_index=True)
+        return dict(zip(unique.tolist(), np.split(values, starts[1:])))
+
+    def __queue(self, xs:np.array, ys:np.array, added:bool) -> None:
+        """
+        This method queues changes of the obstacles in their rows and columns. The cells are grouped with a
+        single stable sort by row and another by column, so there is no python work per cell.
+
+        :param xs: x coordinates of the changed cells
+        :type xs: numpy array object
+        :param ys: y coordinates of the changed cells
+        :type ys: numpy array object
+        :param added: This is True if the obstacles were added, False if they were removed
+        :type added: bool
+        """
+        xs, ys = np.atleast_1d(np.asarray(xs, dtype=np.int64)), np.atleast_1d(np.asarray(ys, dtype=np.int64))
+        inside = (xs >= 0) & (xs < self._shape[0]) & (ys >= 0) & (ys < self._shape[1])
+        xs, ys = xs[inside], ys[inside]
+        for lines, pending, keys, values, size in ((self._rows, self._pending_rows, ys, xs, self._shape[1]),
+                                                   (self._columns, self._pending_columns, xs, ys, self._shape[0])):
+            #the stable sort of 16 bit keys is a radix sort, several times faster
+            order = np.argsort(keys.astype(np.uint16) if size <= 1 << 16 else keys, kind='stable')
+            keys, values = keys[order], values[order]
+            starts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+            for key, group in zip(keys[np.concatenate(([0], starts))].tolist() if keys.size else [], np.split(values, starts)):
+                changes = pending.setdefault(key, [])
+                changes.append((added, group))
+                if len(changes) > _MAX_PENDING:
+                    self.__merge(lines, pending, key)
+
+    @staticmethod
+    def __merge(lines:dict, pending:dict, key:int) -> None:
+        """
+        This method merges the queued changes of a row or column with its sorted array, in order.
+
+        :param lines: These are the rows or the columns of the index
+        :type lines: dict
+        :param pending: These are the queued changes of the rows or the columns
+        :type pending: dict
+        :param key: This is the row or column
+        :type key: integer
+        """
+        line = lines.get(key, np.empty(0, dtype=np.int64))
+        for added, values in pending.pop(key):
+            line = np.union1d(line, values) if added else np.setdiff1d(line, values)
+        if line.size:
+            lines[key] = line
+        else:
+            lines.pop(key, None)
@@ -0,0 +1,161 @@
+import numpy as np
+from statistics import NormalDist
+from typing import NamedTuple
+from mars import HEADING_VECTORS, MOVE, RIGHT, Grid, Fleet
+from program import expand_instructions
+
+"""
+This module estimates the risk of a program: how often the Rovers running it is stopped by an
+obstacle when the obstacles are random, as the ones created by Obstacles.create_obstacles_in_grid.
+Until the first obstacle the Rovers walks the same cells for every layout of obstacles, so the cells
+of the program are computed once and checked against thousands of layouts at once with numpy:
+
+    estimate = estimate_risk('MMRMMLM' * 100, Grid(50, 50), 100, layouts=10_000)
+    estimate.probability, estimate.low, estimate.high #probability of finding an obstacle and its confidence interval
+    estimate.histogram #how many layouts stop the Rovers at every range of instructions
+
+The layouts are boolean arrays stacked in chunks, so the memory does not grow with the number of layouts.
+"""
+
+_CHUNK_BYTES = 1 << 26 #maximum size of the stacked layouts checked at once
+
+
+class RiskEstimate(NamedTuple):
+    """
+    This is the RiskEstimate class, the result of estimate_risk.
+
+    - layouts: number of layouts of obstacles simulated.
+    - hits: number of layouts where the Rovers finds an obstacle.
+    - probability: fraction of layouts where the Rovers finds an obstacle.
+    - low, high: confidence interval of the probability (Wilson score interval).
+    - first_hits: for every layout, index of the instruction stopped by the obstacle, -1 if there is none.
+    - histogram: counts and edges of the first hits, as returned by numpy histogram.
+    """
+    layouts: int
+    hits: int
+    probability: float
+    low: float
+    high: float
+    first_hits: np.array
+    histogram: tuple
+
+
+def visited_cells(instructions:str, grid:Grid) -> tuple[np.array]:
+    """
+    This function computes the cell where every move of the instructions goes when there are no obstacles,
+    with the Rovers starting at (0,0) facing North. The headings are the cumulative sum of the rotations
+    and the positions the cumulative sum of the direction vectors, wrapped around the grid.
+
+    :param instructions: These are the instructions, the repeat syntax is expanded
+    :type instructions: string
+    :param grid: This is the grid
+    :type grid: Grid
+    :return: index of the instruction of every move, x and y coordinates of the cell where it goes
+    :rtype: tuple of numpy array objects
+    """
+    if '(' in instructions or ')' in instructions:
+        instructions = expand_instructions(instructions)
+    codes = Fleet.encode([instructions])[0]
+    turns = np.where(codes == RIGHT, 1, np.where(codes == MOVE, 0, 3)) #the remaining code is LEFT
+    headings = np.cumsum(turns) % 4
+    steps = np.flatnonzero(codes == MOVE)
+    vectors = np.array(HEADING_VECTORS)[headings[steps]]
+    m, n = grid.shape
+    return steps, np.cumsum(vectors[:, 0]) % m, np.cumsum(vectors[:, 1]) % n
+
+
+def obstacle_layouts(grid:Grid, num:int, seeds) -> np.array:
+    """
+    This function creates random layouts of obstacles as a stacked boolean array. Every layout is the
+    one created by Obstacles().create_obstacles_in_grid(grid, num, seed) with its seed. The first column
+    is always free, so only the other cells are stored: cell (x, y) is the column (x - 1) * n + y.
+
+    :param grid: This is the grid
+    :type grid: Grid
+    :param num: This is the number of obstacles of every layout
+    :type num: integer
+    :param seeds: These are the seeds of the layouts, one per layout
+    :type seeds: iterable of integers
+    :return: boolean array of shape (number of seeds, (m - 1) * n)
+    :rtype: numpy array object
+    """
+    m, n = grid.shape
+    cells = max(m - 1, 0) * n
+    if num > cells:
+        raise ValueError(f'There is no room for {num} obstacles in a grid with {cells} free cells')
+    seeds = list(seeds)
+    layouts = np.zeros((len(seeds), cells), dtype=bool)
+    if num > 0 and seeds:
+        indices = np.stack([np.random.default_rng(seed).choice(cells, size=num, replace=False) for seed in seeds])
+        layouts[np.arange(len(seeds))[:, None], indices] = True
+    return layouts
+
+
+def wilson_interval(hits:int, total:int, confidence:float = 0.95) -> tuple[float]:
+    """
+    This function returns the Wilson score interval of a probability estimated from hits out of total
+    trials. Unlike the normal approximation it stays inside [0, 1] when the hits are few or many.
+
+    :param hits: This is the number of successes
+    :type hits: integer
+    :param total: This is the number of trials
+    :type total: integer
+    :param confidence: This is the confidence level, e.g. 0.95
+    :type confidence: float
+    :return: lower and upper bounds
+    :rtype: tuple of floats
+    """
+    if total == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = hits / total
+    center = (p + z * z / (2 * total)) / (1 + z * z / total)
+    half = z * np.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / (1 + z * z / total)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def estimate_risk(instructions:str, grid:Grid, num:int, layouts:int = 1000, seed:int = 0, confidence:float = 0.95,
+                  bins:int = 20, chunk_bytes:int = _CHUNK_BYTES) -> RiskEstimate:
+    """
+    This function estimates how often the Rovers running the instructions finds an obstacle among random
+    layouts of num obstacles, the ones with seeds seed, seed + 1... Only the first visit of every cell of the
+    program matters, so the cells are sorted by their first visit and the first obstacle of every layout is
+    the first True of the layouts indexed by those cells (numpy argmax on each row).
+
+    :param instructions: These are the instructions of the Rovers
+    :type instructions: string
+    :param grid: This is the grid
+    :type grid: Grid
+    :param num: This is the number of obstacles of every layout
+    :type num: integer
+    :param layouts: This is the number of layouts simulated
+    :type layouts: integer
+    :param seed: This is the seed of the first layout
+    :type seed: integer
+    :param confidence: This is the confidence level of the interval
+    :type confidence: float
+    :param bins: This is the number of bins of the histogram of the first hits
+    :type bins: integer
+    :param chunk_bytes: This is the maximum size of the layouts created at once
+    :type chunk_bytes: integer
+    :return: the estimate
+    :rtype: RiskEstimate
+    """
+    m, n = grid.shape
+    steps, xs, ys = visited_cells(instructions, grid)
+    inside = xs > 0 #there are no obstacles in the first column
+    columns, first = np.unique((xs[inside] - 1) * n + ys[inside], return_index=True)
+    order = np.argsort(first)
+    columns, first_steps = columns[order], steps[inside][first[order]]
+    chunk = max(1, chunk_bytes // max(max(m - 1, 0) * n, 1))
+    first_hits = np.full(layouts, -1, dtype=np.int64)
+    for start in range(0, layouts, chunk):
+        stop = min(start + chunk, layouts)
+        hit = obstacle_layouts(grid, num, range(seed + start, seed + stop))[:, columns]
+        if columns.size:
+            found = hit.any(axis=1)
+            first_hits[start:stop][found] = first_steps[hit.argmax(axis=1)[found]]
+    hits = int((first_hits >= 0).sum())
+    low, high = wilson_interval(hits, layouts, confidence)
+    histogram = np.histogram(first_hits[first_hits >= 0], bins=bins, range=(0, int(steps[-1]) + 1 if steps.size else 1))
+    return RiskEstimate(layouts, hits, hits / layouts if layouts else 0.0, low, high, first_hits, histogram)
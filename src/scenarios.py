@@ -0,0 +1,327 @@
+import io
+import csv
+import sys
+import json
+import hashlib
+import argparse
+import contextlib
+import collections
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from mars import Grid, Rovers, Obstacles
+from history import History
+from errors import CommandDoesNotExistError, InstructionSyntaxError
+from config import GRID_SIZE, NUMBER_OF_OBSTACLES, OBSTACLES_SEED
+
+"""
+This module contains the batch runner of scenarios. A scenario is a grid, its obstacles and the
+instructions of the rovers, and a manifest is a JSON lines file with one scenario per line, e.g.
+
+    {"id": "a", "grid": [100, 50], "obstacles": 200, "seed": 3, "instructions": "MMRMMLM"}
+
+The grid is an integer (squared grid) or [m, n] and can be "sparse", the obstacles are a number of
+random obstacles (created with the seed) or a list of positions. Missing values are taken from config.py.
+The scenarios are run in a pool of processes and the results (final state, steps walked and whether an
+obstacle was found) are written in the order of the manifest, as JSON lines or CSV, while they arrive:
+
+    python src/scenarios.py manifest.jsonl results.jsonl --workers 8
+
+Every obstacle map is created once by the main process and shared with the workers through shared
+memory, so big maps are not pickled for every scenario, and the block of a map is released once its
+last scenario has finished. Every worker builds the Obstacles of a map the first time it needs it and
+keeps the last few ones. A scenario whose map cannot be created gets the error in its result.
+"""
+
+RESULT_FIELDS = ('id', 'final', 'steps', 'obstacle', 'error')
+_WORKER_CACHE = 8 #obstacle maps kept by every worker
+_worker_maps = collections.OrderedDict() #map name --> Obstacles, in the workers
+
+
+def read_manifest(path:str):
+    """
+    This function reads the scenarios of a manifest, one JSON object per line. Empty lines
+    are skipped and scenarios without id get their line number.
+
+    :param path: This is the path of the manifest
+    :type path: string
+    :return: generator of scenarios
+    :rtype: generator of dicts
+    """
+    with open(path) as file:
+        for number, line in enumerate(file, 1):
+            if line.strip():
+                scenario = json.loads(line)
+                scenario.setdefault('id', number)
+                yield scenario
+
+
+def scenario_grid(scenario:dict) -> Grid:
+    """
+    This function creates the grid of a scenario.
+
+    :param scenario: This is the scenario
+    :type scenario: dict
+    :return: the grid
+    :rtype: Grid
+    """
+    size = scenario.get('grid', GRID_SIZE)
+    m, n = (size, size) if isinstance(size, int) else size
+    return Grid(m, n, scenario.get('sparse', False))
+
+
+def run_scenario(scenario:dict, obstacles:Obstacles) -> dict:
+    """
+    This function runs the instructions of a scenario. The messages of the obstacles found are not printed.
+
+    :param scenario: This is the scenario
+    :type scenario: dict
+    :param obstacles: These are the obstacles of the scenario
+    :type obstacles: Obstacles
+    :return: result with the id, the final state of the rovers, the steps walked, True if an obstacle stopped
+        the rovers and the error if the instructions are wrong
+    :rtype: dict
+    """
+    rovers = Rovers(History('off'))
+    error = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            rovers.execute(scenario.get('instructions', ''), scenario_grid(scenario), obstacles)
+        except (CommandDoesNotExistError, InstructionSyntaxError) as exception:
+            error = str(exception)
+    return {'id': scenario['id'], 'final': str(rovers), 'steps': rovers.history.total - 1,
+            'obstacle': not rovers.can_move(), 'error': error}
+
+
+def _failed_scenario(scenario:dict, exception:Exception) -> dict:
+    """
+    This function returns the result of a scenario that could not be run.
+
+    :param scenario: This is the scenario
+    :type scenario: dict
+    :param exception: This is the error found creating the scenario
+    :type exception: Exception
+    :return: result with the id and the error, the rovers did not move
+    :rtype: dict
+    """
+    return {'id': scenario.get('id'), 'final': None, 'steps': 0, 'obstacle': False,
+            'error': str(exception)}
+
+
+def _share_map(positions:np.array) -> shared_memory.SharedMemory:
+    """
+    This function copies the positions of an obstacle map to a new block of shared memory.
+
+    :param positions: These are the positions of the obstacles, with shape (k, 2)
+    :type positions: numpy array object
+    :return: the shared memory block, the caller has to unlink it
+    :rtype: SharedMemory
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(positions.nbytes, 1))
+    np.ndarray(positions.shape, dtype=np.int32, buffer=block.buf)[:] = positions
+    return block
+
+
+def _worker_obstacles(name:str, count:int, scenario:dict) -> Obstacles:
+    """
+    This function returns the obstacles of a shared map in a worker, reading them from
+    the shared memory the first time.
+
+    :param name: This is the name of the shared memory block
+    :type name: string
+    :param count: This is the number of obstacles of the map
+    :type count: integer
+    :param scenario: This is the scenario, used for sizing the occupancy bitmap
+    :type scenario: dict
+    :return: the obstacles
+    :rtype: Obstacles
+    """
+    if name in _worker_maps:
+        _worker_maps.move_to_end(name)
+        return _worker_maps[name]
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        positions = np.ndarray((count, 2), dtype=np.int32, buffer=block.buf)
+        obstacles = Obstacles.from_positions(positions, scenario_grid(scenario))
+        del positions #the buffer cannot be closed while it is referenced
+    finally:
+        block.close()
+    _worker_maps[name] = obstacles
+    if len(_worker_maps) > _WORKER_CACHE:
+        _worker_maps.popitem(last=False)
+    return obstacles
+
+
+def _run_batch(batch:list[tuple]) -> list[dict]:
+    """
+    This function runs a batch of scenarios in a worker.
+
+    :param batch: These are the scenarios with the name and the size of their shared obstacle map, or the
+        results of the scenarios that failed in the main process
+    :type batch: list of tuples (scenario, name, count) or dicts
+    :return: results of the scenarios
+    :rtype: list of dicts
+    """
+    return [task if isinstance(task, dict) else run_scenario(task[0], _worker_obstacles(task[1], task[2], task[0]))
+            for task in batch]
+
+
+def _task(scenario:dict, maps:dict) -> tuple:
+    """
+    This function creates the task of a scenario, sharing its obstacle map if it has not been shared yet.
+    Maps of random obstacles are shared by all the scenarios with the same grid, number and seed, and lists
+    of obstacles by all the scenarios with the same grid and positions. Every task adds one reference to its
+    map, that is released with _release when the scenario has finished. If the map cannot be created the task
+    is the result of the failed scenario.
+
+    :param scenario: This is the scenario
+    :type scenario: dict
+    :param maps: These are the shared maps, updated in place
+    :type maps: dict
+    :return: the scenario with the name and the size of its shared obstacle map (or its result) and the key of its map
+    :rtype: tuple
+    """
+    try:
+        obstacles = scenario.get('obstacles', NUMBER_OF_OBSTACLES)
+        seed = scenario.get('seed', OBSTACLES_SEED)
+        grid = scenario_grid(scenario)
+        positions = None
+        if isinstance(obstacles, int):
+            #without seed the obstacles are not reproducible, so the map is not shared with other scenarios
+            key = (grid.shape, grid.sparse, obstacles, seed if seed is not None else object())
+        else:
+            positions = np.asarray(obstacles, dtype=np.int32).reshape(-1, 2)
+            key = (grid.shape, grid.sparse, hashlib.sha1(positions.tobytes()).hexdigest())
+        if key not in maps:
+            if positions is None:
+                positions = Obstacles(grid).create_obstacles_in_grid(grid, obstacles, seed).get_obstacles_positions()
+                positions = np.asarray(positions, dtype=np.int32).reshape(-1, 2)
+            maps[key] = [_share_map(positions), len(positions), 0]
+    except Exception as exception:
+        return _failed_scenario(scenario, exception), None
+    maps[key][2] += 1
+    block, count, _ = maps[key]
+    return (scenario, block.name, count), key
+
+
+def _release(keys:list, maps:dict) -> None:
+    """
+    This function releases one reference to the shared map of every key, closing and unlinking the
+    blocks of shared memory without references.
+
+    :param keys: These are the keys of the maps of the scenarios that have finished, None for failed scenarios
+    :type keys: list
+    :param maps: These are the shared maps, updated in place
+    :type maps: dict
+    """
+    for key in keys:
+        if key is not None:
+            maps[key][2] -= 1
+            if maps[key][2] == 0:
+                block = maps.pop(key)[0]
+                block.close()
+                block.unlink()
+
+
+def run_scenarios(scenarios, workers:int = None, batch_size:int = 16, window:int = 64):
+    """
+    This function runs the scenarios in a pool of processes and yields the results in the same order.
+    The scenarios are sent to the workers in batches and at most window batches are pending at once,
+    so manifests of any length are streamed with bounded memory. The shared memory of a map is released
+    as soon as the batches of all its scenarios have finished.
+
+    :param scenarios: These are the scenarios
+    :type scenarios: iterable of dicts
+    :param workers: This is the number of processes, by default the number of cores
+    :type workers: integer
+    :param batch_size: This is the number of scenarios sent at once to a worker
+    :type batch_size: integer
+    :param window: This is the maximum number of batches pending
+    :type window: integer
+    :return: generator of results
+    :rtype: generator of dicts
+    """
+    maps = {} #map key --> [shared memory block, number of obstacles, scenarios pending]
+    pending = collections.deque() #(future, keys of the maps of its scenarios)
+    batch, keys = [], []
+
+    def finish():
+        future, finished = pending.popleft()
+        results = future.result()
+        _release(finished, maps)
+        return results
+
+    try:
+        with ProcessPoolExecutor(workers) as executor:
+            for scenario in scenarios:
+                task, key = _task(scenario, maps)
+                batch.append(task)
+                keys.append(key)
+                if len(batch) == batch_size:
+                    pending.append((executor.submit(_run_batch, batch), keys))
+                    batch, keys = [], []
+                    if len(pending) >= window:
+                        yield from finish()
+            if batch:
+                pending.append((executor.submit(_run_batch, batch), keys))
+            while pending:
+                yield from finish()
+    finally:
+        for future, _ in pending:
+            future.cancel()
+        for block, _, _ in maps.values():
+            block.close()
+            block.unlink()
+
+
+def write_results(results, output) -> int:
+    """
+    This function writes the results as they arrive. The format is CSV if the name of the
+    output ends with .csv, else JSON lines.
+
+    :param results: These are the results
+    :type results: iterable of dicts
+    :param output: This is the path of the output file or - for the standard output
+    :type output: string
+    :return: number of results written
+    :rtype: integer
+    """
+    file = sys.stdout if output == '-' else open(output, 'w', newline='')
+    try:
+        writer = csv.DictWriter(file, RESULT_FIELDS) if str(output).endswith('.csv') else None
+        if writer is not None:
+            writer.writeheader()
+        written = 0
+        for result in results:
+            if writer is not None:
+                writer.writerow(result)
+            else:
+                file.write(json.dumps(result) + '\n')
+            written += 1
+        return written
+    finally:
+        if file is not sys.stdout:
+            file.close()
+
+
+def main(argv:list[str] = None) -> int:
+    """
+    This is the command line entry point of the scenarios runner.
+
+    :param argv: command line arguments, by default the ones of the process
+    :type argv: list of strings
+    :return: exit code
+    :rtype: integer
+    """
+    parser = argparse.ArgumentParser(description='Run the scenarios of a manifest in parallel')
+    parser.add_argument('manifest', help='JSON lines file with one scenario per line')
+    parser.add_argument('output', nargs='?', default='-', help='results file, CSV if it ends with .csv else JSON lines (default stdout)')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default the number of cores)')
+    parser.add_argument('--batch-size', type=int, default=16, help='scenarios sent at once to a worker (default 16)')
+    args = parser.parse_args(argv)
+    write_results(run_scenarios(read_manifest(args.manifest), args.workers, args.batch_size), args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
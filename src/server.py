@@ -0,0 +1,398 @@
+import sys
+import time
+import asyncio
+import argparse
+import ipaddress
+import numpy as np
+from mars import Grid, Rovers, Obstacles
+from history import History
+from instrumentation import Instrumentation
+from mapfile import open_map
+from errors import CommandDoesNotExistError, InstructionSyntaxError
+from config import GRID_SIZE, NUMBER_OF_OBSTACLES, OBSTACLES_SEED
+
+"""
+This module contains the control service of the Mars Rovers: an asyncio server, listening only
+on the local machine (TCP on 127.0.0.1 or a Unix socket), that hosts many named rovers sessions on
+the same Grid and Obstacles. The protocol is one line per request and one line per response:
+
+    request:  <session> <instructions>      e.g. alpha MMRMMLM
+    response: <state of the rovers>         e.g. 2:3:N, O:0:2:N or ERROR <message>
+
+A session is created the first time its name is used. The requests of a session are queued and
+its worker runs all the queued requests in one batch, so many clients driving the same rovers do
+not wake up the event loop once per request. Every connection can pipeline requests, and the
+responses are sent in the same order. Memory is bounded: the lines, the requests pipelined by a
+connection, the requests queued by a session and the number of sessions are limited.
+
+It also contains a load generator to measure the throughput and the latency locally:
+
+    python src/server.py serve --port 8765
+    python src/server.py load --port 8765 --connections 1000 --requests 100
+"""
+
+_ERROR = 'ERROR'
+
+
+class _Session:
+    """
+    This is a session of the server: its rovers, the queue of requests and the task that runs them.
+    """
+    __slots__ = ('rovers', 'queue', 'task')
+
+    def __init__(self, rovers:Rovers, queue_size:int) -> None:
+        """
+        This is the constructor of the _Session class.
+
+        :param rovers: This is the rovers of the session
+        :type rovers: Rovers
+        :param queue_size: This is the maximum number of queued requests
+        :type queue_size: integer
+        """
+        self.rovers = rovers
+        self.queue = asyncio.Queue(queue_size)
+        self.task = None
+
+
+class RoversServer:
+    """
+    This is the RoversServer class. It keeps the sessions and serves the connections of the clients.
+    """
+    def __init__(self, grid:Grid, obstacles:Obstacles, max_sessions:int = 100_000, max_batch:int = 1024,
+                 queue_size:int = 1024, pipeline:int = 64, max_line:int = 1 << 20) -> None:
+        """
+        This is the constructor of the RoversServer class.
+
+        :param grid: This is the grid shared by all the sessions
+        :type grid: Grid
+        :param obstacles: These are the obstacles shared by all the sessions, they must not change
+        :type obstacles: Obstacles
+        :param max_sessions: This is the maximum number of sessions
+        :type max_sessions: integer
+        :param max_batch: This is the maximum number of requests of a session run in one batch
+        :type max_batch: integer
+        :param queue_size: This is the maximum number of queued requests of a session
+        :type queue_size: integer
+        :param pipeline: This is the maximum number of requests of a connection waiting for their response
+        :type pipeline: integer
+        :param max_line: This is the maximum length in bytes of a request
+        :type max_line: integer
+        """
+        self._grid = grid
+        self._obstacles = obstacles
+        self._max_sessions = max_sessions
+        self._max_batch = max_batch
+        self._queue_size = queue_size
+        self._pipeline = pipeline
+        self._max_line = max_line
+        self._sessions: dict[str, _Session] = {}
+        self._server = None
+        self.requests = 0 #number of requests run
+        self.batches = 0 #number of batches run
+
+    @property
+    def sessions(self) -> dict:
+        """
+        This property method returns the rovers of every session.
+
+        :return: dictionary name --> rovers
+        :rtype: dict
+        """
+        return {name: session.rovers for name, session in self._sessions.items()}
+
+    async def start(self, host:str = '127.0.0.1', port:int = 0, path:str = None) -> asyncio.AbstractServer:
+        """
+        This method starts listening. If path is given a Unix socket is used, else TCP on the host.
+
+        :param host: This is the local address, by default 127.0.0.1. Only loopback addresses are accepted
+        :type host: string
+        :param port: This is the TCP port, 0 to pick a free one
+        :type port: integer
+        :param path: This is the path of the Unix socket
+        :type path: string
+        :return: the asyncio server
+        :rtype: asyncio.AbstractServer
+        """
+        if path is None and not is_loopback(host):
+            raise ValueError(f'The service is local, {host} is not a loopback address')
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self.__handle, path, limit=self._max_line)
+        else:
+            self._server = await asyncio.start_server(self.__handle, host, port, limit=self._max_line)
+        return self._server
+
+    async def close(self) -> None:
+        """
+        This method stops listening and stops the workers of the sessions.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for session in self._sessions.values():
+            if session.task is not None:
+                session.task.cancel()
+        await asyncio.gather(*(session.task for session in self._sessions.values() if session.task is not None),
+                             return_exceptions=True)
+
+    async def submit(self, name:str, instructions:str) -> asyncio.Future:
+        """
+        This method queues the instructions of a session, waiting if its queue is full.
+
+        :param name: This is the name of the session, it is created if it does not exist
+        :type name: string
+        :param instructions: This is the string of commands
+        :type instructions: string
+        :return: future with the state of the rovers after the instructions
+        :rtype: asyncio.Future
+        """
+        future = asyncio.get_running_loop().create_future()
+        session = self._sessions.get(name)
+        if session is None:
+            if not name:
+                future.set_result(f'{_ERROR} the request has no session')
+                return future
+            if len(self._sessions) >= self._max_sessions:
+                future.set_result(f'{_ERROR} there are already {self._max_sessions} sessions')
+                return future
+            session = _Session(Rovers(History('off'), Instrumentation(sink=None)), self._queue_size)
+            session.task = asyncio.create_task(self.__serve_session(session))
+            self._sessions[name] = session
+        await session.queue.put((instructions, future))
+        return future
+
+    async def execute(self, name:str, instructions:str) -> str:
+        """
+        This method runs the instructions of a session and returns the state of its rovers.
+
+        :param name: This is the name of the session
+        :type name: string
+        :param instructions: This is the string of commands
+        :type instructions: string
+        :return: state of the rovers, e.g. 1:2:N, or ERROR and the message
+        :rtype: string
+        """
+        return await (await self.submit(name, instructions))
+
+    async def __serve_session(self, session:_Session) -> None:
+        """
+        This method is the worker of a session. It takes all the queued requests (up to max_batch)
+        and runs them one after the other without yielding to the event loop.
+
+        :param session: This is the session
+        :type session: _Session
+        """
+        queue = session.queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self._max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+            for instructions, future in batch:
+                try:
+                    session.rovers.execute(instructions, self._grid, self._obstacles)
+                    state = str(session.rovers)
+                except (CommandDoesNotExistError, InstructionSyntaxError) as exception:
+                    state = f'{_ERROR} {exception}'
+                except Exception as exception: #any other failure answers this request, the session goes on
+                    state = f'{_ERROR} {type(exception).__name__} {exception}'
+                if not future.cancelled():
+                    future.set_result(state)
+            self.requests += len(batch)
+            self.batches += 1
+
+    async def __handle(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+        """
+        This method serves a connection. The requests are read and queued while the responses of the
+        previous ones are written by another task, in order.
+
+        :param reader: This is the reader of the connection
+        :type reader: asyncio.StreamReader
+        :param writer: This is the writer of the connection
+        :type writer: asyncio.StreamWriter
+        """
+        pending = asyncio.Queue(self._pipeline) #futures of the responses, in the order of the requests
+        responder = asyncio.create_task(self.__respond(pending, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError: #the line is longer than max_line
+                    future = asyncio.get_running_loop().create_future()
+                    future.set_result(f'{_ERROR} the request is longer than {self._max_line} bytes')
+                    await pending.put(future)
+                    break
+                if not line:
+                    break
+                name, _, instructions = line.decode(errors='replace').strip().partition(' ')
+                await pending.put(await self.submit(name, instructions.strip()))
+        except ConnectionError:
+            pass
+        finally:
+            await pending.put(None)
+            await responder
+            writer.close()
+
+    async def __respond(self, pending:asyncio.Queue, writer:asyncio.StreamWriter) -> None:
+        """
+        This method writes the responses of a connection in order, draining the writer when no
+        response is ready.
+
+        :param pending: These are the futures of the responses, None when the connection ends
+        :type pending: asyncio.Queue
+        :param writer: This is the writer of the connection
+        :type writer: asyncio.StreamWriter
+        """
+        try:
+            while (future := await pending.get()) is not None:
+                writer.write((await future).encode() + b'\n')
+                if pending.empty():
+                    await writer.drain()
+        except ConnectionError:
+            while await pending.get() is not None: #the client is gone, the requests left are discarded
+                pass
+
+
+async def run_load(host:str = '127.0.0.1', port:int = 8765, path:str = None, connections:int = 100,
+                   requests:int = 100, sessions:int = None, instructions:str = 'MMRMMLM') -> dict:
+    """
+    This function is the load generator. It opens many connections at once and every connection sends
+    its requests one after the other, measuring the time until every response arrives.
+
+    :param host: This is the address of the server
+    :type host: string
+    :param port: This is the TCP port of the server
+    :type port: integer
+    :param path: This is the path of the Unix socket of the server, if given host and port are not used
+    :type path: string
+    :param connections: This is the number of concurrent connections
+    :type connections: integer
+    :param requests: This is the number of requests sent by every connection
+    :type requests: integer
+    :param sessions: This is the number of sessions shared by the connections, by default one per connection
+    :type sessions: integer
+    :param instructions: These are the instructions of every request
+    :type instructions: string
+    :return: dictionary with the number of requests, errors, seconds, requests per second and latencies (p50, p99, max)
+    :rtype: dict
+    """
+    sessions = sessions or connections
+
+    async def client(number:int) -> list[float]:
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        latencies, errors = [], 0
+        request = f'load-{number % sessions} {instructions}\n'.encode()
+        try:
+            for _ in range(requests):
+                start = time.perf_counter()
+                writer.write(request)
+                response = await reader.readline()
+                latencies.append(time.perf_counter() - start)
+                errors += response.startswith(_ERROR.encode()) or not response
+        finally:
+            writer.close()
+        return latencies, errors
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client(number) for number in range(connections)))
+    seconds = time.perf_counter() - start
+    latencies = np.concatenate([latency for latency, _ in results]) if results else np.zeros(0)
+    total = len(latencies)
+    return {'requests': total, 'errors': sum(errors for _, errors in results), 'seconds': seconds,
+            'requests_per_second': total / seconds if seconds > 0 else float('inf'),
+            'p50': float(np.percentile(latencies, 50)) if total else 0.0,
+            'p99': float(np.percentile(latencies, 99)) if total else 0.0,
+            'max': float(latencies.max()) if total else 0.0}
+
+
+def is_loopback(host:str) -> bool:
+    """
+    This function checks if a host is an address of the local machine only (localhost, 127.0.0.0/8 or ::1).
+
+    :param host: This is the host
+    :type host: string
+    :return: True if the host is a loopback address
+    :rtype: bool
+    """
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+async def serve(grid:Grid, obstacles:Obstacles, host:str = '127.0.0.1', port:int = 8765, path:str = None) -> None:
+    """
+    This function runs the server until it is interrupted.
+
+    :param grid: This is the grid shared by all the sessions
+    :type grid: Grid
+    :param obstacles: These are the obstacles shared by all the sessions
+    :type obstacles: Obstacles
+    :param host: This is the local address
+    :type host: string
+    :param port: This is the TCP port
+    :type port: integer
+    :param path: This is the path of the Unix socket, if given TCP is not used
+    :type path: string
+    """
+    server = RoversServer(grid, obstacles)
+    listening = await server.start(host, port, path)
+    print(f'Serving rovers on {path or listening.sockets[0].getsockname()}')
+    try:
+        await listening.serve_forever()
+    finally:
+        await server.close()
+
+
+def main(argv:list[str] = None) -> int:
+    """
+    This is the command line entry point of the server and the load generator.
+
+    :param argv: command line arguments, by default the ones of the process
+    :type argv: list of strings
+    :return: exit code
+    :rtype: integer
+    """
+    parser = argparse.ArgumentParser(description='Local control service of the Mars Rovers')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help='run the server')
+    load_parser = commands.add_parser('load', help='run the load generator against a server')
+    for command in (serve_parser, load_parser):
+        command.add_argument('--host', default='127.0.0.1', help='local address, only loopback addresses are served (default 127.0.0.1)')
+        command.add_argument('--port', type=int, default=8765, help='TCP port (default 8765)')
+        command.add_argument('--unix', default=None, help='path of a Unix socket used instead of TCP')
+    serve_parser.add_argument('--grid', type=int, default=GRID_SIZE, help='size of the squared grid')
+    serve_parser.add_argument('--obstacles', type=int, default=NUMBER_OF_OBSTACLES, help='number of random obstacles')
+    serve_parser.add_argument('--seed', type=int, default=OBSTACLES_SEED, help='seed of the obstacles')
+    serve_parser.add_argument('--map', default=None, help='binary obstacle map used instead of the grid and random obstacles')
+    load_parser.add_argument('--connections', type=int, default=100, help='concurrent connections (default 100)')
+    load_parser.add_argument('--requests', type=int, default=100, help='requests per connection (default 100)')
+    load_parser.add_argument('--sessions', type=int, default=None, help='sessions shared by the connections (default one per connection)')
+    load_parser.add_argument('--instructions', default='MMRMMLM', help='instructions of every request')
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        if args.unix is None and not is_loopback(args.host):
+            parser.error(f'the service is local, {args.host} is not a loopback address')
+        if args.map is not None:
+            obstacles = Obstacles.load(args.map)
+            grid = Grid(*open_map(args.map)[0].shape) #the grid of the map, --grid is not used
+        else:
+            grid = Grid(args.grid, args.grid)
+            obstacles = Obstacles(grid).create_obstacles_in_grid(grid, args.obstacles, args.seed)
+        try:
+            asyncio.run(serve(grid, obstacles, args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    result = asyncio.run(run_load(args.host, args.port, args.unix, args.connections, args.requests, args.sessions, args.instructions))
+    print(f"{result['requests']:,} requests ({result['errors']:,} errors) in {result['seconds']:.3f} s: "
+          f"{result['requests_per_second']:,.0f} requests/s, p50 {1000 * result['p50']:.3f} ms, "
+          f"p99 {1000 * result['p99']:.3f} ms, max {1000 * result['max']:.3f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import re
+from collections import deque
+from mars import Grid, Rovers, Obstacles
+from history import History
+from errors import CommandDoesNotExistError, PlanningError
+
+"""
+This module contains the Swarm class, many Rovers exploring the same grid at the same time.
+Unlike the Fleet, the rovers of a swarm see each other: for every rover, the cells where the
+other rovers are work like obstacles that move. The rovers take turns in a fixed order, one
+command per turn, so the same instructions always give the same states:
+
+    swarm = Swarm(grid, obstacles, [(0, 0, 'N'), (1, 0, 'N'), (5, 5, 'E')])
+    swarm.execute(['MMRM', 'MMLM', 'MMMM'])
+    swarm.states() #['O:0:2:E', 'O:1:2:W', '9:5:E'], the first two rovers stop each other
+"""
+
+_PROGRAM_PATTERN = re.compile(r'[MLR]*') #the instructions of a rover in a swarm
+
+
+class _Traffic:
+    """
+    This is the _Traffic class. It is what one rover of the swarm sees as obstacles: the obstacles
+    of the grid and the cells taken by the other rovers. It only has the has method that Rovers.move uses.
+    """
+    __slots__ = ('_obstacles', '_cells', 'rover')
+
+    def __init__(self, obstacles:Obstacles, cells:dict) -> None:
+        """
+        This is the constructor of the _Traffic class.
+
+        :param obstacles: These are the obstacles of the grid
+        :type obstacles: Obstacles
+        :param cells: This is the spatial hash of the swarm, cell --> index of the rover in the cell
+        :type cells: dictionary
+        """
+        self._obstacles = obstacles
+        self._cells = cells
+        self.rover = None #index of the rover that is moving, its own cell is not an obstacle
+
+    def has(self, pos) -> bool:
+        """
+        This method checks if there is an obstacle or another rover in a position.
+
+        :param pos: This is the position
+        :type pos: numpy array object
+        :return: True if the cell is not free
+        :rtype: bool
+        """
+        return self._cells.get((int(pos[0]), int(pos[1])), self.rover) != self.rover or self._obstacles.has(pos)
+
+
+class Swarm:
+    """
+    This is the Swarm class. It moves many Rovers in the same grid, where every rover is an
+    obstacle for the others. The cells taken by the rovers are kept in a spatial hash (a dictionary
+    cell --> rover) that is updated on every move, so checking a collision costs the same with ten
+    rovers as with thousands. A rover that is stopped by an obstacle or by another rover reports it
+    like a single Rovers (O:x:y:D), keeps its cell and leaves the schedule: it is never polled again.
+    """
+    def __init__(self, grid:Grid, obstacles:Obstacles, starts:list[tuple], history:str = 'full', instrumentation = None) -> None:
+        """
+        This is the constructor of the Swarm class.
+
+        :param grid: This is the grid of the swarm
+        :type grid: Grid
+        :param obstacles: These are the obstacles of the grid
+        :type obstacles: Obstacles
+        :param starts: These are the initial states (x, y, direction) of the rovers, one per rover. The
+            order of the list is the order of the turns
+        :type starts: list of tuples
+        :param history: This is the history mode of the rovers, one of history.HISTORY_MODES except mmap
+        :type history: string
+        :param instrumentation: This is the instrumentation shared by all the rovers, see Rovers
+        :type instrumentation: Instrumentation
+        """
+        self._grid = grid
+        self._cells: dict[tuple[int], int] = {} #spatial hash: cell --> index of the rover in the cell
+        self._rovers: list[Rovers] = []
+        m, n = grid.shape
+        for index, (x, y, direction) in enumerate(starts):
+            cell = (x % m, y % n)
+            if cell in self._cells:
+                raise ValueError(f'The rovers {self._cells[cell]} and {index} start at the same position {cell}')
+            if obstacles.has(cell):
+                raise PlanningError(f'The rovers {index} starts at {cell}, that has an obstacle')
+            positions = History(history)
+            positions.append(*cell)
+            self._rovers.append(Rovers.from_state(*cell, direction, True, positions, instrumentation))
+            self._cells[cell] = index
+        self._traffic = _Traffic(obstacles, self._cells)
+
+    def __len__(self) -> int:
+        """
+        This is the length magic method. It returns the number of rovers of the swarm.
+
+        :return: number of rovers
+        :rtype: integer
+        """
+        return len(self._rovers)
+
+    def __getitem__(self, num:int) -> Rovers:
+        """
+        This is the magic method to get one rover of the swarm.
+
+        :param num: this is the index of the rover
+        :type num: integer
+        :return: the rover
+        :rtype: Rovers
+        """
+        return self._rovers[num]
+
+    def states(self) -> list[str]:
+        """
+        This method returns the state of every rover, e.g. 2:3:N or O:2:4:N if it was stopped.
+
+        :return: list of states
+        :rtype: list of strings
+        """
+        return [str(rovers) for rovers in self._rovers]
+
+    def occupant(self, x:int, y:int):
+        """
+        This method returns the rover in a cell.
+
+        :param x: x coordinate of the cell
+        :type x: integer
+        :param y: y coordinate of the cell
+        :type y: integer
+        :return: the index of the rover, None if the cell is free
+        :rtype: integer
+        """
+        return self._cells.get((x, y))
+
+    def execute(self, instructions:list[str]) -> int:
+        """
+        This method runs the instructions of every rover. The rovers take turns in the order of the
+        swarm and every turn runs one command (M, L or R) of one rover. A rover leaves the schedule when
+        its instructions are finished or when it is stopped; a stopped rover does not take any other
+        turn, also in later calls. The repeat syntax is not allowed.
+
+        :param instructions: These are the instructions of every rover, in the order of the swarm
+        :type instructions: list of strings
+        :return: the number of turns run
+        :rtype: integer
+        """
+        if len(instructions) != len(self._rovers):
+            raise ValueError(f'Expected instructions for {len(self._rovers)} rovers, got {len(instructions)}')
+        for program in instructions:
+            if not _PROGRAM_PATTERN.fullmatch(program):
+                command = re.sub('[MLR]', '', program)[0]
+                raise CommandDoesNotExistError(f'This command {command} does no exist. Choose one of these: M,R,L')
+        schedule = deque((index, 0) for index, program in enumerate(instructions) if program and self._rovers[index].can_move())
+        turns = 0
+        while schedule:
+            index, step = schedule.popleft()
+            self.__turn(index, instructions[index][step])
+            turns += 1
+            if step + 1 < len(instructions[index]) and self._rovers[index].can_move():
+                schedule.append((index, step + 1)) #stopped and finished rovers free their slot
+        return turns
+
+    def __turn(self, index:int, command:str) -> None:
+        """
+        This method runs one command of a rover and moves it in the spatial hash.
+
+        :param index: This is the index of the rover
+        :type index: integer
+        :param command: This is the command
+        :type command: string
+        """
+        rovers = self._rovers[index]
+        if command != 'M':
+            rovers.move(command, self._grid, self._traffic)
+            return
+        before = rovers.cell
+        self._traffic.rover = index
+        rovers.move(command, self._grid, self._traffic)
+        after = rovers.cell
+        if after != before:
+            del self._cells[before]
+            self._cells[after] = index
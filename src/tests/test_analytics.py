@@ -0,0 +1,113 @@
+import random
+import pytest
+import numpy as np
+from mars import Rovers, Grid, Obstacles
+from history import History
+from analytics import Coverage
+from errors import SparseGridError
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+def slow_coverage(instructions, grid, obstacles):
+    """
+    This function counts the visits and the wrap arounds moving the Rovers one command at a time.
+
+    :param instructions: The instructions of the rovers
+    :type instructions: string
+    :param grid: The grid
+    :type grid: Grid
+    :param obstacles: The obstacles
+    :type obstacles: Obstacles
+    :return: visits of every cell and wrap arounds of every edge
+    :rtype: tuple
+    """
+    m, n = grid.shape
+    counts, wraps = np.zeros((m, n), dtype=np.int64), {'N': 0, 'E': 0, 'S': 0, 'W': 0}
+    rovers = Rovers(History('off'))
+    counts[0, 0] += 1
+    for command in instructions:
+        (x, y), direction = rovers.position, rovers.direction
+        rovers.move(command, grid, obstacles)
+        if not rovers.can_move():
+            break
+        if command == 'M':
+            nx, ny = rovers.position
+            counts[nx, ny] += 1
+            wraps[direction] += abs(int(nx) - int(x)) > 1 or abs(int(ny) - int(y)) > 1
+    return counts, wraps
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+def test_events_and_history(capsys):
+    """
+    This test checks that the coverage of the events and of the history are the ones of moving step by step.
+    """
+    rng = random.Random(5)
+    grid = Grid(7, 5)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 3, seed=6)
+    instructions = ''.join(rng.choice('MMMMMMMMLR') for _ in range(400)) + 'M' * 60
+    counts, wraps = slow_coverage(instructions, grid, obstacles)
+    rovers = Rovers()
+    coverage = Coverage(grid)
+    for _ in coverage.follow(rovers.run_iter(instructions, grid, obstacles)):
+        pass
+    assert (coverage.counts == counts).all() and coverage.wraps == wraps
+    history = Coverage.from_history(rovers.history, grid, chunk=7)
+    assert (history.counts == counts).all() and history.wraps == wraps
+    capsys.readouterr()
+
+def test_stats():
+    """
+    This test checks the coverage, revisits and wrap arounds of a simple mission.
+    """
+    grid = Grid(4, 4)
+    rovers = Rovers()
+    coverage = Coverage(grid)
+    for _ in coverage.follow(rovers.run_iter('M' * 10 + 'RM', grid, Obstacles())):
+        pass
+    assert coverage.visits == 12 and coverage.cells_visited == 5
+    assert coverage.coverage == 5 / 16 and coverage.revisits == 7 and coverage.revisit_rate == 7 / 12
+    assert coverage.wraps == {'N': 2, 'E': 0, 'S': 0, 'W': 0}
+    assert coverage.counts[0].tolist() == [3, 3, 3, 2] and coverage.stats()['visits'] == 12
+
+def test_long_mission_memory():
+    """
+    This test checks that millions of steps are counted with arrays of the size of the grid.
+    """
+    grid = Grid(50, 40)
+    rovers = Rovers(History('off'))
+    coverage = Coverage(grid)
+    for _ in coverage.follow(rovers.run_iter('M' * 1_000_000 + 'R' + 'M' * 1_000_003, grid, Obstacles())):
+        pass
+    assert coverage.visits == 2_000_004 and coverage.coverage == (40 + 49) / 2000
+    assert coverage.wraps == {'N': 25000, 'E': 20000, 'S': 0, 'W': 0}
+
+def test_heatmap():
+    """
+    This test checks the heatmap image and its aggregation.
+    """
+    grid = Grid(6, 4)
+    coverage = Coverage(grid, (5, 1))
+    coverage.add_positions([(5, 2), (5, 3), (0, 3)])
+    heatmap = coverage.heatmap()
+    assert heatmap.shape == (4, 6) and heatmap[1, 5] == 1 and heatmap[3, 0] == 1
+    assert coverage.wraps['E'] == 1
+    small = coverage.heatmap(max_size=2)
+    assert small.shape == (2, 2) and small.sum() == 4 and small[1, 1] == 2
+
+def test_errors():
+    """
+    This test checks the errors of the coverage.
+    """
+    with pytest.raises(SparseGridError):
+        Coverage(Grid(10 ** 6, 10 ** 6, sparse=True))
+    with pytest.raises(ValueError):
+        Coverage.from_history(History('sample', every=10), Grid(10, 10))
@@ -0,0 +1,45 @@
+import json
+from benchmark import run_benchmarks, compare_results, measure_startup, main
+
+############################################################
+#                                                          #
+#         TESTS FUNCTIONS FOR THE BENCHMARK SUITE          #
+#                                                          #
+############################################################
+
+def test_run_benchmarks():
+    """
+    This test checks that every benchmark of a small matrix is measured.
+    """
+    results = run_benchmarks((20,), (0.0, 0.1), (200,), {'move': 'MMMLR'}, draw=False, startup_runs=0)
+    assert len(results) == 2 + 2 * 2 + 1
+    assert all(result['seconds'] >= 0 and result['peak_bytes'] >= 0 for result in results.values())
+    assert results['execute[grid=20,density=0.1,length=200,mix=move]']['moves_per_second'] > 0
+
+def test_compare_results():
+    """
+    This test checks that only the increases above the threshold are regressions.
+    """
+    baseline = {'a': {'seconds': 1.0, 'peak_bytes': 100}, 'b': {'seconds': 0.0001, 'peak_bytes': 100}}
+    results = {'a': {'seconds': 1.1, 'peak_bytes': 200}, 'b': {'seconds': 0.01, 'peak_bytes': 100}}
+    regressions = compare_results(baseline, results, threshold=0.2)
+    assert len(regressions) == 1 and regressions[0].startswith('a peak_bytes')
+    assert len(compare_results(baseline, results, threshold=0.05)) == 2
+
+def test_save_and_compare(tmp_path):
+    """
+    This test checks the command line: the saved baseline can be compared with a new run.
+    """
+    baseline = tmp_path / 'baseline.json'
+    assert main(['--quick', '--no-draw', '--save', str(baseline)]) == 0
+    assert 'results' in json.loads(baseline.read_text())
+    assert main(['--quick', '--no-draw', '--compare', str(baseline), '--threshold', '1000']) == 0
+
+def test_startup():
+    """
+    This test checks the startup benchmarks and that the command line does not import matplotlib.
+    """
+    result = measure_startup(['-c', "import main, sys; assert 'matplotlib' not in sys.modules"], runs=2)
+    assert result['seconds'] > 0 and result['peak_bytes'] == 0
+    results = run_benchmarks((), (), (), {}, draw=False, startup_runs=1)
+    assert set(results) == {'startup[import main]', 'startup[import main+draw]', 'startup[batch]'}
@@ -0,0 +1,159 @@
+import random
+import pytest
+from mars import Rovers, Grid, Obstacles
+from cache import ResultCache
+from errors import CommandDoesNotExistError, DirectionNotFoundError, InstructionSyntaxError
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+def expected_state(instructions, grid, obstacles, start=(0, 0, 'N')):
+    """
+    This function runs the instructions with a new Rovers, without any cache.
+
+    :param instructions: The instructions of the rovers
+    :type instructions: string
+    :param grid: The grid
+    :type grid: Grid
+    :param obstacles: The obstacles
+    :type obstacles: Obstacles
+    :param start: The initial state of the rovers
+    :type start: tuple
+    :return: the final state
+    :rtype: string
+    """
+    rovers = Rovers.from_state(*start)
+    rovers.execute(instructions, grid, obstacles)
+    return str(rovers)
+
+def prefix_sharing_programs(rng, number, length):
+    """
+    This function creates random programs that share long prefixes, as the ones of a search.
+
+    :param rng: The random generator
+    :type rng: random.Random
+    :param number: The number of programs
+    :type number: integer
+    :param length: The length of the programs
+    :type length: integer
+    :return: the programs
+    :rtype: list of strings
+    """
+    programs = [''.join(rng.choice('MMMLR') for _ in range(length))]
+    for _ in range(number - 1):
+        base = rng.choice(programs)
+        cut = rng.randrange(len(base) + 1)
+        programs.append(base[:cut] + ''.join(rng.choice('MMMLR') for _ in range(rng.randrange(length))))
+    return programs
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+def test_same_results_as_rovers(capsys):
+    """
+    This test checks that the cache gives the same final states as Rovers.execute for programs sharing prefixes.
+    """
+    rng = random.Random(4)
+    grid = Grid(20, 20)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 8, seed=1)
+    cache = ResultCache()
+    for program in prefix_sharing_programs(rng, 300, 40):
+        for start in ((0, 0, 'N'), (3, 4, 'W')):
+            assert cache.execute(program, grid, obstacles, start) == expected_state(program, grid, obstacles, start)
+    capsys.readouterr()
+    stats = cache.stats()
+    assert stats['queries'] == 600 and stats['contexts'] == 2
+    assert stats['reused'] > 0 and stats['hit_rate'] > 0.5
+
+def test_hits():
+    """
+    This test checks the statistics of hits, partial hits and misses.
+    """
+    grid = Grid(10, 10)
+    obstacles = Obstacles(grid)
+    cache = ResultCache()
+    assert cache.execute('MMRMMLM', grid, obstacles) == '2:3:N'
+    assert cache.execute('MMRMMLM', grid, obstacles) == '2:3:N'
+    assert cache.execute('MMRMMLMMM', grid, obstacles) == '2:5:N'
+    assert cache.execute('MMRM', grid, obstacles) == '1:2:E' #split of the first edge
+    assert cache.execute('', grid, obstacles) == '0:0:N'
+    stats = cache.stats()
+    assert (stats['hits'], stats['partial_hits'], stats['misses']) == (2, 1, 2) #the split runs its prefix again
+    assert stats['reused'] == 7 + 7 + 0 and stats['simulated'] == 7 + 2 + 4
+    assert stats['nodes'] == 3 and stats['characters'] == 9 and stats['bytes'] > 9
+    cache.clear()
+    assert cache.stats()['queries'] == 0 and cache.stats()['nodes'] == 0
+
+def test_invalidation():
+    """
+    This test checks that the cached states are dropped when obstacles are added.
+    """
+    grid = Grid(10, 10)
+    obstacles = Obstacles(grid)
+    cache = ResultCache()
+    assert cache.execute('MMMM', grid, obstacles) == '0:4:N'
+    obstacles.add_custom_obstacle((0, 3))
+    assert cache.execute('MMMM', grid, obstacles) == 'O:0:2:N'
+    assert cache.execute('MMMMRM', grid, obstacles) == 'O:0:2:N' #nothing runs after the obstacle
+    stats = cache.stats()
+    assert stats['invalidations'] == 1 and stats['contexts'] == 1 and stats['misses'] == 2
+    other = Obstacles(grid).add_custom_obstacle((0, 3))
+    cache.execute('MMMM', grid, other)
+    assert cache.stats()['hits'] == 2 #the same layout has the same fingerprint
+
+def test_bounded_memory(capsys):
+    """
+    This test checks that the least recently used states are evicted and the results are still right.
+    """
+    rng = random.Random(8)
+    grid = Grid(15, 15)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 5, seed=4)
+    cache = ResultCache(max_characters=200, max_contexts=2)
+    for program in prefix_sharing_programs(rng, 200, 30):
+        assert cache.execute(program, grid, obstacles) == expected_state(program, grid, obstacles)
+        assert cache.stats()['characters'] <= 200
+    for x in range(4):
+        cache.execute('MM', grid, obstacles, (x, 0, 'E'))
+    capsys.readouterr()
+    stats = cache.stats()
+    assert stats['evictions'] > 0 and stats['contexts'] == 2
+
+def test_errors():
+    """
+    This test checks the errors of the cache.
+    """
+    grid = Grid(10, 10)
+    cache = ResultCache()
+    with pytest.raises(InstructionSyntaxError):
+        cache.execute('(M)*3', grid, Obstacles(grid))
+    with pytest.raises(DirectionNotFoundError):
+        cache.execute('M', grid, Obstacles(grid), (0, 0, 'X'))
+    with pytest.raises(CommandDoesNotExistError):
+        cache.execute('MMX', grid, Obstacles(grid))
+    assert cache.stats()['nodes'] == 0
+
+def test_invalidation_random_obstacles(capsys):
+    """
+    This test checks that random obstacles created after the ray index is built are seen by
+    the rovers and by the cache.
+    """
+    grid = Grid(100, 10)
+    obstacles = Obstacles(grid)
+    cache = ResultCache()
+    instructions = 'R' + 'M' * 99
+    assert cache.execute(instructions, grid, obstacles) == '99:0:E'
+    version = obstacles.version
+    obstacles.create_obstacles_in_grid(grid, 200, seed=1)
+    assert obstacles.version > version
+    rovers, stepped = Rovers(), Rovers()
+    rovers.execute(instructions, grid, obstacles)
+    for command in instructions:
+        stepped.move(command, grid, obstacles)
+    assert str(rovers) == str(stepped)
+    assert cache.execute(instructions, grid, obstacles) == str(rovers)
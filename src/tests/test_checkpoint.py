@@ -0,0 +1,132 @@
+import os
+import pytest
+import numpy as np
+from mars import Rovers, Grid, Obstacles
+from history import History
+from checkpoint import run_mission, resume_mission, load_checkpoint
+from errors import CheckpointError, InstructionSyntaxError
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+INSTRUCTIONS = ''.join(np.random.default_rng(0).choice(list('MMMMMLR'), size=20_000))
+
+def interrupted(instructions, size, stop):
+    """
+    This function yields the instructions in chunks and raises KeyboardInterrupt after stop chunks,
+    like a mission that is interrupted.
+
+    :param instructions: The instructions
+    :type instructions: string
+    :param size: The size of the chunks
+    :type size: integer
+    :param stop: The number of chunks yielded before the interruption
+    :type stop: integer
+    :return: generator of chunks
+    :rtype: generator of strings
+    """
+    for number, start in enumerate(range(0, len(instructions), size)):
+        if number == stop:
+            raise KeyboardInterrupt
+        yield instructions[start:start + size]
+
+def chunks(instructions, size):
+    """
+    This function yields the instructions in chunks.
+
+    :return: generator of chunks
+    :rtype: generator of strings
+    """
+    for start in range(0, len(instructions), size):
+        yield instructions[start:start + size]
+
+def new_mission():
+    """
+    This function creates the grid and the obstacles of the missions.
+
+    :return: the grid and the obstacles
+    :rtype: tuple
+    """
+    grid = Grid(200, 150)
+    return grid, Obstacles(grid).create_obstacles_in_grid(grid, 1, seed=5)
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+@pytest.mark.parametrize('mode', ['full', 'sample', 'ring', 'off'])
+def test_resume_like_uninterrupted(tmp_path, mode):
+    """
+    This test checks that a mission interrupted and resumed from its last checkpoint ends like
+    the same mission without interruption.
+    """
+    grid, obstacles = new_mission()
+    expected = Rovers(History(mode, every=7, last=300))
+    expected.execute(INSTRUCTIONS, grid, obstacles)
+    path = str(tmp_path / 'mission.ckpt')
+    with pytest.raises(KeyboardInterrupt):
+        run_mission(interrupted(INSTRUCTIONS, 1000, 7), grid, obstacles, path, Rovers(History(mode, every=7, last=300)), every=3000)
+    rovers, _, _, offset = load_checkpoint(path)
+    assert offset == 6000 #the last checkpoint before the interruption
+    rovers = resume_mission(path, chunks(INSTRUCTIONS, 1000), every=3000)
+    assert str(rovers) == str(expected)
+    assert rovers.history == expected.history
+    assert rovers.history.total == expected.history.total
+
+def test_interrupted_before_first_checkpoint(tmp_path):
+    """
+    This test checks that a mission interrupted before the first interval is resumed from the start.
+    """
+    grid, obstacles = new_mission()
+    expected = Rovers()
+    expected.execute(INSTRUCTIONS, grid, obstacles)
+    path = str(tmp_path / 'mission.ckpt')
+    with pytest.raises(KeyboardInterrupt):
+        run_mission(interrupted(INSTRUCTIONS, 1000, 2), grid, obstacles, path, every=5000)
+    rovers, _, _, offset = load_checkpoint(path)
+    assert offset == 0 and str(rovers) == '0:0:N' and len(rovers.history) == len(Rovers().history)
+    rovers = resume_mission(path, chunks(INSTRUCTIONS, 1000), every=5000)
+    assert str(rovers) == str(expected) and rovers.history == expected.history
+
+def test_checkpoint_is_incremental(tmp_path):
+    """
+    This test checks that the history file only grows with the new positions and that the
+    state file and the obstacles are stored.
+    """
+    grid, obstacles = new_mission()
+    path = str(tmp_path / 'mission.ckpt')
+    rovers = run_mission(INSTRUCTIONS, grid, obstacles, path, every=1000)
+    assert os.path.getsize(path + '.history') == 8 * len(rovers.history)
+    assert os.path.getsize(path) < 128
+    loaded, loaded_grid, loaded_obstacles, offset = load_checkpoint(path)
+    assert loaded_grid.shape == grid.shape and offset == len(INSTRUCTIONS) or not rovers.can_move()
+    assert sorted(loaded_obstacles.get_obstacles_positions()) == sorted(obstacles.get_obstacles_positions())
+    assert str(loaded) == str(rovers) and loaded.history == rovers.history
+
+def test_blocked_mission(tmp_path):
+    """
+    This test checks that a mission stopped by an obstacle is checkpointed and stays stopped.
+    """
+    grid = Grid(10, 10)
+    obstacles = Obstacles(grid).add_custom_obstacle((0, 3))
+    path = str(tmp_path / 'mission.ckpt')
+    rovers = run_mission('MMMMMRM', grid, obstacles, path, every=2)
+    assert str(rovers) == 'O:0:2:N'
+    assert load_checkpoint(path)[3] == 4
+    assert str(resume_mission(path, 'MMMMMRM')) == 'O:0:2:N'
+
+def test_errors(tmp_path):
+    """
+    This test checks the errors of the checkpoints.
+    """
+    grid, obstacles = new_mission()
+    with pytest.raises(InstructionSyntaxError):
+        run_mission('(MM)*3', grid, obstacles, str(tmp_path / 'mission.ckpt'))
+    (tmp_path / 'other.ckpt').write_bytes(b'not a checkpoint')
+    with pytest.raises(CheckpointError):
+        load_checkpoint(str(tmp_path / 'other.ckpt'))
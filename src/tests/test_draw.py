@@ -0,0 +1,160 @@
+import numpy as np
+from PIL import Image
+from mars import Rovers, Grid, Obstacles
+from main import create_rovers_position
+from analytics import Coverage
+from draw import draw_rovers_path, draw_heatmap, split_wrap_arounds, split_path, move_headings, obstacles_image, jump_segments, LivePath
+
+############################################################
+#                                                          #
+#         TESTS FUNCTIONS FOR THE DRAWS                    #
+#                                                          #
+############################################################
+
+def test_split_wrap_arounds():
+    """
+    This test checks that the wrap around arrows are split from the normal ones.
+    """
+    grid = Grid(10, 10)
+    rovers = Rovers()
+    rovers.execute('MMRMMMLMRMRMMMMM', grid, Obstacles())
+    walk_segments, wrap_segments = split_wrap_arounds(create_rovers_position(rovers.history))
+    assert len(walk_segments) == 11
+    assert wrap_segments.tolist() == [[[4.5, 0.5], [4.5, 9.5]]]
+
+def test_split_wrap_arounds_side_of_two():
+    """
+    This test checks that in a grid with a side of 2 cells the wrap arounds, one cell long like the
+    steps, are found with the headings of the moves.
+    """
+    grid = Grid(2, 5)
+    instructions = 'RMMMLMRRM'
+    rovers = Rovers()
+    rovers.execute(instructions, grid, Obstacles())
+    arrows = create_rovers_position(rovers.history)
+    headings = move_headings(instructions, len(arrows))
+    assert headings.tolist() == [1, 1, 1, 0, 2]
+    walk_segments, wrap_segments = split_wrap_arounds(arrows, shape=grid.shape, headings=headings)
+    assert walk_segments.tolist() == [[[0.5, 0.5], [1.5, 0.5]], [[0.5, 0.5], [1.5, 0.5]], [[1.5, 0.5], [1.5, 1.5]],
+                                      [[1.5, 1.5], [1.5, 0.5]]]
+    assert wrap_segments.tolist() == [[[1.5, 0.5], [0.5, 0.5]]]
+    walk_segments, wrap_segments = split_wrap_arounds(create_rovers_position([(0, 0), (1, 0), (2, 0), (0, 0)]), shape=(3, 5))
+    assert len(walk_segments) == 2 and wrap_segments.tolist() == [[[2.5, 0.5], [0.5, 0.5]]]
+
+def test_move_headings():
+    """
+    This test checks the headings of consecutive moves, skipping the first ones and reading the
+    instructions in chunks.
+    """
+    instructions = 'MRMMLMRRMLLLM'
+    headings = move_headings(instructions, 6)
+    assert headings.tolist() == [0, 1, 1, 0, 2, 3]
+    assert move_headings(['MRM', 'MLM', 'RRML', 'LLM'], 3, first=2).tolist() == [1, 0, 2]
+    assert move_headings(instructions, 2, first=4, direction='E').tolist() == [3, 0]
+
+def test_downsample_long_path():
+    """
+    This test checks that long paths are downsampled to a bounded number of segments.
+    """
+    grid = Grid(100, 100)
+    rovers = Rovers()
+    rovers.execute('(MMMRMLM)*20000' + 'M'*1000, grid, Obstacles())
+    walk_segments, wrap_segments = split_wrap_arounds(create_rovers_position(rovers.history), max_segments=500)
+    assert 0 < len(walk_segments) <= 501
+    assert 0 < len(wrap_segments) <= 500
+
+def test_split_path_like_arrows():
+    """
+    This test checks that splitting the positions of a history gives the same segments as
+    splitting its arrows, with and without downsampling.
+    """
+    grid = Grid(30, 20)
+    for instructions, max_segments in [('MMRMMMLMRMRMMMMM' * 3, 1000), ('(MMMRMLM)*3000' + 'M' * 100, 300)]:
+        rovers = Rovers()
+        rovers.execute(instructions, grid, Obstacles())
+        expected = split_wrap_arounds(create_rovers_position(rovers.history), max_segments, grid.shape)
+        segments = split_path(rovers.history, max_segments, grid.shape)
+        for kind, expected_kind in zip(segments, expected):
+            assert kind.dtype == float and kind.tolist() == expected_kind.tolist()
+
+def test_obstacles_image():
+    """
+    This test checks the image of the obstacles, also when it is aggregated.
+    """
+    image = obstacles_image([(1, 2), (3, 0)], (4, 3))
+    assert image.shape == (3, 4)
+    assert image[2, 1] and image[0, 3] and image.sum() == 2
+    assert obstacles_image([(999, 999)], (1000, 1000), max_size=10)[9, 9]
+
+def test_draw_headless(tmp_path):
+    """
+    This test checks that the path is saved to png and svg files without showing any window.
+    """
+    grid = Grid(300, 200)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 5000, seed=1)
+    rovers = Rovers()
+    rovers.execute('M'*5000 + 'R' + 'M'*7000, grid, Obstacles())
+    for name in ('path.png', 'path.svg'):
+        draw_rovers_path(create_rovers_position(rovers.history), rovers, obstacles.get_obstacles_positions(), grid, str(tmp_path / name), max_segments=1000)
+        assert (tmp_path / name).stat().st_size > 0
+
+def test_draw_heatmap(tmp_path):
+    """
+    This test checks that the heatmap of the visits is saved to a png file without showing any window.
+    """
+    grid = Grid(3000, 2000)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 500, seed=1)
+    rovers = Rovers()
+    coverage = Coverage(grid)
+    for _ in coverage.follow(rovers.run_iter('M' * 5000 + 'R' + 'M' * 7000, grid, Obstacles())):
+        pass
+    draw_heatmap(coverage.heatmap(max_size=500), str(rovers), grid, obstacles.get_obstacles_positions(), str(tmp_path / 'heatmap.png'))
+    assert (tmp_path / 'heatmap.png').stat().st_size > 0
+
+def test_jump_segments():
+    """
+    This test checks the segments of a straight jump, split at the wrap arounds.
+    """
+    assert jump_segments(2, 3, 'N', 2, (10, 10)) == ([((2.5, 3.5), (2.5, 5.5))], [])
+    walk, wrap = jump_segments(2, 8, 'N', 5, (10, 10))
+    assert walk == [((2.5, 8.5), (2.5, 9.5)), ((2.5, 0.5), (2.5, 3.5))]
+    assert wrap == [((2.5, 9.5), (2.5, 0.5))]
+    walk, wrap = jump_segments(1, 4, 'W', 23, (10, 10)) #more than two laps, only the last one is split
+    assert walk[-1][1] == (8.5, 4.5) and len(wrap) == 2
+
+def test_live_path_throttle(tmp_path):
+    """
+    This test checks that the frames of the live view are limited by the frame rate however
+    many events arrive, and that they are recorded to a directory of png frames.
+    """
+    time = [0.0]
+    def clock():
+        time[0] += 0.001 #every event takes 1 ms
+        return time[0]
+    grid = Grid(30, 30)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 20, seed=2)
+    rovers = Rovers()
+    live = LivePath(grid, obstacles, fps=10, output=str(tmp_path / 'frames'), clock=clock)
+    events = list(live.follow(rovers.run_iter('MMRMMLM' * 300, grid, Obstacles()))) #drawn obstacles, not in the way
+    live.close(str(rovers))
+    assert len(events) > 100
+    assert live.frames <= len(events) * 0.001 * 10 + 2
+    assert len(list((tmp_path / 'frames').glob('frame_*.png'))) == live.frames
+
+def test_live_path_gif(tmp_path):
+    """
+    This test checks that the live view is recorded to a gif file.
+    """
+    grid = Grid(10, 10)
+    rovers = Rovers()
+    live = LivePath(grid, output=str(tmp_path / 'path.gif'), fps=1e9)
+    for _ in live.follow(rovers.run_iter('MMRMMLMMMMMMMMMMMM', grid, Obstacles())):
+        pass
+    live.close(str(rovers))
+    assert live.frames > 3 and (tmp_path / 'path.gif').read_bytes()[:3] == b'GIF'
+    with Image.open(tmp_path / 'path.gif') as gif:
+        assert gif.n_frames == live.frames and gif.info['loop'] == 0
+        first = np.asarray(gif.convert('RGB'))
+        gif.seek(gif.n_frames - 1)
+        last = np.asarray(gif.convert('RGB'))
+    assert (first != last).any() #the path grows frame by frame
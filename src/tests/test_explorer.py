@@ -0,0 +1,93 @@
+import pytest
+import numpy as np
+from mars import Rovers, Grid, Obstacles
+from history import History
+from analytics import Coverage
+from explorer import Explorer
+from errors import DirectionNotFoundError, PlanningError, SparseGridError
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+def run_exploration(exploration, grid, obstacles, start=(0, 0, 'N')):
+    """
+    This function runs the program of an exploration and counts the cells visited.
+
+    :param exploration: The exploration
+    :type exploration: Exploration
+    :param grid: The grid
+    :type grid: Grid
+    :param obstacles: The obstacles of the grid
+    :type obstacles: Obstacles
+    :param start: The initial state of the rovers
+    :type start: tuple
+    :return: the rovers and its coverage
+    :rtype: tuple
+    """
+    rovers = Rovers.from_state(*start, history=History('full'))
+    rovers.history.append(start[0], start[1])
+    rovers.execute(exploration.instructions, grid, obstacles)
+    return rovers, Coverage.from_history(rovers.history, grid)
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+@pytest.mark.parametrize('start', [(0, 0, 'N'), (7, 3, 'W')])
+def test_explores_all_reachable_cells(start):
+    """
+    This test checks that the program visits all the reachable cells without finding any obstacle.
+    """
+    grid = Grid(40, 30)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 120, seed=3)
+    exploration = Explorer(grid, obstacles).explore(start)
+    rovers, coverage = run_exploration(exploration, grid, obstacles, start)
+    assert rovers.can_move() and exploration.commands == len(exploration.instructions)
+    assert coverage.cells_visited == exploration.cells_visited == exploration.reachable_cells == 1200 - 120
+    assert exploration.coverage == 1.0 and exploration.commands < 2 * exploration.cells_visited
+    assert exploration.first_visits[0] == 0 and exploration.first_visits[-1] == exploration.commands
+    assert (np.diff(exploration.first_visits) > 0).all()
+
+def test_unreachable_cells():
+    """
+    This test checks that the cells closed by obstacles are not counted as reachable.
+    """
+    grid = Grid(10, 10)
+    obstacles = Obstacles(grid)
+    for position in ((4, 5), (6, 5), (5, 4), (5, 6)):
+        obstacles.add_custom_obstacle(position)
+    exploration = Explorer(grid, obstacles).explore()
+    assert exploration.reachable_cells == 95 and exploration.free_cells == 96 and exploration.coverage == 1.0
+    assert run_exploration(exploration, grid, obstacles)[1].counts[5, 5] == 0
+
+def test_limits():
+    """
+    This test checks the maximum number of commands and the target coverage.
+    """
+    grid = Grid(30, 30)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 90, seed=1)
+    explorer = Explorer(grid, obstacles)
+    exploration = explorer.explore(max_commands=100)
+    assert exploration.commands == 100 and exploration.first_visits[-1] <= 100
+    assert run_exploration(exploration, grid, obstacles)[1].cells_visited == exploration.cells_visited
+    half = explorer.explore(target_coverage=0.5)
+    assert half.cells_visited == 405 and half.coverage == 0.5
+    assert half.instructions == explorer.explore().instructions[:half.commands]
+
+def test_errors():
+    """
+    This test checks the errors of the explorer.
+    """
+    grid = Grid(10, 10)
+    obstacles = Obstacles(grid).add_custom_obstacle((3, 3))
+    with pytest.raises(PlanningError):
+        Explorer(grid, obstacles).explore((3, 3, 'N'))
+    with pytest.raises(DirectionNotFoundError):
+        Explorer(grid, obstacles).explore((0, 0, 'X'))
+    with pytest.raises(SparseGridError):
+        Explorer(Grid(10 ** 6, 10 ** 6, sparse=True), Obstacles())
@@ -0,0 +1,51 @@
+import pytest
+import random
+import numpy as np
+from mars import Rovers, Grid, Obstacles, Fleet
+from errors import CommandDoesNotExistError
+from config import GRID_SIZE
+
+############################################################
+#                                                          #
+#         TESTS FUNCTIONS FOR THE FLEET                    #
+#                                                          #
+############################################################
+
+def test_fleet_like_rovers():
+    """
+    This test checks that every rover of the fleet ends in the same
+    state as a single Rovers executing the same instructions.
+    """
+    rng = random.Random(11)
+    for bitmap in (True, False):
+        grid = Grid(13, 9)
+        obstacles = Obstacles(grid if bitmap else None).create_obstacles_in_grid(grid, 15, seed=4)
+        instructions = [''.join(rng.choice('MMMLR') for _ in range(rng.randint(0, 120))) for _ in range(200)]
+        fleet = Fleet(len(instructions))
+        fleet.execute(instructions, grid, obstacles)
+        for num, program in enumerate(instructions):
+            rovers = Rovers()
+            rovers.execute(program, grid, obstacles)
+            assert fleet[num] == str(rovers)
+            assert (fleet.positions[num] == rovers.position).all()
+            assert fleet.directions[num] == rovers.direction
+            assert fleet.alive[num] == rovers.can_move()
+
+def test_fleet_continues_execution():
+    """
+    This test checks that a fleet can receive instructions several times,
+    and rovers that found an obstacle do not move anymore.
+    """
+    grid = Grid(GRID_SIZE, GRID_SIZE)
+    obstacles = Obstacles(grid).add_custom_obstacle((2,5))
+    fleet = Fleet(2)
+    fleet.execute(['MMRMM', 'MMRM'], grid, obstacles)
+    fleet.execute(['LMMM', 'LM'], grid, obstacles)
+    assert [fleet[0], fleet[1]] == ['O:2:4:N', '1:3:N']
+
+def test_fleet_unknown_command():
+    """
+    This test checks that an unknown command raises an error.
+    """
+    with pytest.raises(CommandDoesNotExistError):
+        Fleet(2).execute(['MM', 'MX'], Grid(GRID_SIZE, GRID_SIZE), Obstacles())
@@ -0,0 +1,113 @@
+import pytest
+import numpy as np
+from mars import Rovers, Grid, Obstacles
+from history import History
+from config import GRID_SIZE
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+INSTRUCTIONS = 'MMRMMLM' + 'M'*50 + 'RMMMRM(MMRMMLM)*300' + 'RMLM'*40
+
+def full_positions(instructions=INSTRUCTIONS):
+    """
+    This function returns all the positions of the rovers executing the
+    instructions, step by step, from a full history.
+
+    :param instructions: The instructions for the robot
+    :type instructions: string
+    :return: array of positions
+    :rtype: numpy array object
+    """
+    rovers = Rovers()
+    rovers.execute(instructions, Grid(GRID_SIZE, GRID_SIZE), Obstacles())
+    return np.asarray(rovers.history)
+
+def history_positions(history, instructions=INSTRUCTIONS):
+    """
+    This function executes the instructions recording the positions in the
+    given history and returns it.
+
+    :param history: The store of positions
+    :type history: History
+    :param instructions: The instructions for the robot
+    :type instructions: string
+    :return: the history
+    :rtype: History
+    """
+    rovers = Rovers(history)
+    rovers.execute(instructions, Grid(GRID_SIZE, GRID_SIZE), Obstacles())
+    return rovers.history
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+def test_history_like_move():
+    """
+    This test checks that the history recorded executing the instructions
+    is the same as moving character by character.
+    """
+    grid = Grid(GRID_SIZE, GRID_SIZE)
+    rovers = Rovers()
+    for char in 'MMRMMLM' + 'M'*50:
+        rovers.move(char, grid, Obstacles())
+    assert rovers.history.tolist()[:4] == [[0, 0], [0, 1], [0, 2], [1, 2]]
+    assert rovers.history == full_positions('MMRMMLM' + 'M'*50)
+
+def test_history_modes():
+    """
+    This test checks the positions kept by every mode.
+    """
+    expected = full_positions()
+    assert (history_positions(History('full')).positions() == expected).all()
+    sample = history_positions(History('sample', every=7))
+    assert (sample.positions() == expected[::7]).all()
+    assert (sample.steps() == np.arange(len(expected))[::7]).all()
+    ring = history_positions(History('ring', last=100))
+    assert (ring.positions() == expected[-100:]).all()
+    assert (ring.steps() == np.arange(len(expected))[-100:]).all()
+    off = history_positions(History('off'))
+    assert len(off) == 0 and off.total == len(expected)
+
+def test_history_mmap(tmp_path):
+    """
+    This test checks that the mmap mode writes all the positions to the file.
+    """
+    history = history_positions(History('mmap', path=tmp_path / 'history.bin', capacity=16))
+    history.close()
+    expected = full_positions()
+    assert (history.positions() == expected).all()
+    stored = np.fromfile(tmp_path / 'history.bin', dtype=np.int32).reshape(-1, 2)
+    assert (stored == expected).all() #the file is truncated to the positions kept
+    history.append(3, 4)
+    history.close()
+    assert np.fromfile(tmp_path / 'history.bin', dtype=np.int32).reshape(-1, 2).tolist()[-2:] == [expected[-1].tolist(), [3, 4]]
+    empty = History('mmap', path=tmp_path / 'empty.bin')
+    empty.close()
+    empty.append(1, 2)
+    empty.close()
+    assert np.fromfile(tmp_path / 'empty.bin', dtype=np.int32).tolist() == [1, 2]
+
+def test_position_at():
+    """
+    This test checks the position of rovers after a given step.
+    """
+    expected = full_positions()
+    full = history_positions(History())
+    ring = history_positions(History('ring', last=10))
+    sample = history_positions(History('sample', every=5))
+    assert full.position_at(1000) == tuple(expected[1000])
+    assert ring.position_at(len(expected) - 3) == tuple(expected[-3])
+    assert sample.position_at(1000) == tuple(expected[1000])
+    with pytest.raises(KeyError):
+        sample.position_at(1001)
+    with pytest.raises(KeyError):
+        ring.position_at(1000)
+    with pytest.raises(IndexError):
+        full.position_at(len(expected))
@@ -0,0 +1,95 @@
+import pytest
+from mars import Rovers, Grid, Obstacles
+from program import expand_instructions
+from instrumentation import Instrumentation, phase
+from config import GRID_SIZE
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+def obstacles_at(*positions):
+    """
+    This function creates the obstacles at the given positions.
+
+    :return: the obstacles
+    :rtype: Obstacles
+    """
+    obstacles = Obstacles()
+    for position in positions:
+        obstacles.add_custom_obstacle(position)
+    return obstacles
+
+def move_counters(instructions, obstacles):
+    """
+    This function moves the rovers character by character and returns the counters.
+
+    :param instructions: The instructions for the robot
+    :type instructions: string
+    :param obstacles: The obstacles of the grid
+    :type obstacles: Obstacles
+    :return: the counters
+    :rtype: dict
+    """
+    grid = Grid(GRID_SIZE, GRID_SIZE)
+    rovers = Rovers(instrumentation=Instrumentation(sink=None))
+    for char in instructions:
+        if not rovers.can_move():
+            break
+        rovers.move(char, grid, obstacles)
+    return rovers.instrumentation.counters
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+@pytest.mark.parametrize('instructions,obstacles', [('MMRMMLM' + 'M'*25 + 'LLRLM', Obstacles()),
+                                                    ('MMRMMLM' + 'M'*25 + 'LLRLM', obstacles_at((1, 8))),
+                                                    ('RMMML(MMRMMLM)*100', Obstacles())])
+def test_execute_counters_like_move(instructions, obstacles):
+    """
+    This test checks that execute (also skipping the cycles of a repeated group)
+    counts the same as moving character by character.
+    """
+    instrumentation = Instrumentation(sink=None)
+    Rovers(instrumentation=instrumentation).execute(instructions, Grid(GRID_SIZE, GRID_SIZE), obstacles)
+    assert instrumentation.counters == move_counters(expand_instructions(instructions), obstacles)
+
+def test_counters():
+    """
+    This test checks the value of the counters.
+    """
+    instrumentation = Instrumentation(sink=None)
+    rovers = Rovers(instrumentation=instrumentation)
+    rovers.execute('MMRR' + 'M'*13 + 'L', Grid(GRID_SIZE, GRID_SIZE), obstacles_at((0, 5)))
+    assert instrumentation.counters == {'moves': 8, 'rotations': 2, 'wraps': 1, 'obstacle_checks': 9, 'obstacle_stops': 1}
+
+def test_sink(capsys):
+    """
+    This test checks that the obstacle found is sent to the sink instead of printed.
+    """
+    events = []
+    rovers = Rovers(instrumentation=Instrumentation(sink=lambda kind, message, data: events.append((kind, data))))
+    rovers.execute('MMMMM', Grid(GRID_SIZE, GRID_SIZE), obstacles_at((0, 3)))
+    assert events == [('obstacle', {'x': 0, 'y': 3})]
+    assert capsys.readouterr().out == ''
+    Rovers().execute('MMMMM', Grid(GRID_SIZE, GRID_SIZE), obstacles_at((0, 3)))
+    assert capsys.readouterr().out == 'Sorry captain, I have found an obstacle at position [0 3]\n'
+
+def test_phase():
+    """
+    This test checks that the time of the phases is added up.
+    """
+    instrumentation = Instrumentation()
+    with phase(instrumentation, 'simulation'):
+        pass
+    with phase(instrumentation, 'simulation'):
+        pass
+    with phase(None, 'drawing'):
+        pass
+    assert list(instrumentation.report()['timings']) == ['simulation']
+    assert instrumentation.timings['simulation'] >= 0
@@ -0,0 +1,113 @@
+import json
+import pytest
+from main import main, path_headings, create_rovers_position, run_live
+from mars import Grid, Obstacles, Rovers, HEADING_VECTORS
+from program import expand_instructions
+from history import History
+from draw import split_wrap_arounds
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+def test_batch(capsys):
+    """
+    This test checks the batch mode with the text and JSON formats.
+    """
+    assert main(['--instructions', 'MMRMMLM', '--obstacles', '0']) == 0
+    assert capsys.readouterr().out == '2:3:N\n'
+    assert main(['-i', '(MMRMMLM)*3', '--grid', '20', '30', '--obstacles', '0', '--format', 'json']) == 0
+    state = json.loads(capsys.readouterr().out)
+    assert state == {'state': '6:9:N', 'x': 6, 'y': 9, 'direction': 'N', 'blocked': False, 'moves': 15}
+
+def test_batch_map_and_file(tmp_path, capsys):
+    """
+    This test checks the batch mode with an obstacle map and the instructions in a file. The
+    obstacle found is reported to the standard error, not mixed with the state.
+    """
+    grid = Grid(10, 10)
+    Obstacles(grid).add_custom_obstacle((0, 3)).save(str(tmp_path / 'map.bin'), grid)
+    (tmp_path / 'mission.txt').write_text('MM\nMM\n')
+    assert main(['--file', str(tmp_path / 'mission.txt'), '--map', str(tmp_path / 'map.bin')]) == 0
+    output = capsys.readouterr()
+    assert output.out == 'O:0:2:N\n' and 'obstacle' in output.err
+
+def test_batch_draw(tmp_path, capsys):
+    """
+    This test checks that the batch mode saves the draw of the path.
+    """
+    assert main(['-i', 'MMRMMLM', '--seed', '1', '--draw', str(tmp_path / 'path.png')]) == 0
+    assert (tmp_path / 'path.png').stat().st_size > 0
+
+@pytest.mark.parametrize('mode', ['full', 'ring', 'sample'])
+def test_path_headings(mode):
+    """
+    This test checks that the headings of the arrows are given when the history keeps consecutive
+    steps, so the wrap arounds of a side of 2 cells are found.
+    """
+    grid = Grid(2, 6)
+    instructions = 'R(MML(M)*3R)*50'
+    rovers = Rovers(History(mode, every=3, last=20))
+    rovers.execute(instructions, grid, Obstacles())
+    headings = path_headings(instructions, rovers.history, grid)
+    if mode == 'sample':
+        assert headings is None
+        return
+    _, wrap_segments = split_wrap_arounds(create_rovers_position(rovers.history), shape=grid.shape, headings=headings)
+    wraps, x, y, heading = [], 0, 0, 0 #the wrap arounds walking cell by cell
+    for command in expand_instructions(instructions):
+        if command == 'M':
+            dx, dy = HEADING_VECTORS[heading]
+            wraps.append(not (0 <= x + dx < 2 and 0 <= y + dy < 6))
+            x, y = (x + dx) % 2, (y + dy) % 6
+        else:
+            heading = (heading + (1 if command == 'R' else 3)) % 4
+    assert len(wrap_segments) == sum(wraps[-(len(rovers.history) - 1):]) > 0
+    assert path_headings(instructions, rovers.history, Grid(3, 6)) is None
+
+def test_batch_errors(capsys):
+    """
+    This test checks the errors of the batch mode.
+    """
+    assert main(['-i', 'MMX']) == 1
+    assert 'Error' in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        main(['--grid', '10', '10']) #the instructions are required
+
+def test_batch_record(tmp_path, capsys):
+    """
+    This test checks that the batch mode records the live view and ends like without it.
+    """
+    assert main(['-i', '(MMRMMLM)*5', '--seed', '2', '--record', str(tmp_path / 'path.gif')]) == 0
+    assert (tmp_path / 'path.gif').stat().st_size > 0
+    recorded = capsys.readouterr().out
+    assert main(['-i', '(MMRMMLM)*5', '--seed', '2']) == 0
+    assert capsys.readouterr().out == recorded
+
+def test_live_repeat(tmp_path):
+    """
+    This test checks that the live view runs a program with huge repetitions without expanding it.
+    """
+    grid = Grid(10, 10)
+    rovers = Rovers()
+    run_live(rovers, 'R(L(M)*1000000000000)*1000', grid, Obstacles(grid).add_custom_obstacle((0, 5)), str(tmp_path / 'path.gif'), 1e9)
+    assert str(rovers) == 'O:0:4:N'
+
+def test_batch_heatmap(tmp_path, capsys):
+    """
+    This test checks that the batch mode saves the heatmap of the visits.
+    """
+    assert main(['-i', '(MMRMMLM)*50', '--grid', '20', '20', '--obstacles', '0', '--heatmap', str(tmp_path / 'heatmap.png')]) == 0
+    assert (tmp_path / 'heatmap.png').stat().st_size > 0
+    assert capsys.readouterr().out.strip() == '0:10:N' #every repetition moves 2 cells East and 3 North
+
+def test_batch_explore(capsys):
+    """
+    This test checks that the batch mode runs the program of the exploration planner.
+    """
+    assert main(['--explore', '--grid', '20', '20', '--obstacles', '40', '--seed', '1', '--format', 'json']) == 0
+    captured = capsys.readouterr()
+    assert json.loads(captured.out)['blocked'] is False
+    assert 'Exploration: 360 of 360 reachable cells (100.0%)' in captured.err
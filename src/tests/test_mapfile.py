@@ -0,0 +1,91 @@
+import pytest
+import numpy as np
+from mars import Rovers, Grid, Obstacles
+from mapfile import open_map, write_map, convert_text_map, main
+from errors import ObstacleMapError
+
+############################################################
+#                                                          #
+#         TESTS FUNCTIONS FOR THE OBSTACLE MAP FILES       #
+#                                                          #
+############################################################
+
+@pytest.mark.parametrize('layout', ['bitset', 'coords', 'auto'])
+def test_save_and_load(tmp_path, layout):
+    """
+    This test checks that a loaded map has the same obstacles, shape and seed
+    as the saved one and that rovers walks the same on both.
+    """
+    grid = Grid(50, 30)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 200, seed=7)
+    obstacles.save(tmp_path / 'map.bin', layout=layout)
+    loaded = Obstacles.load(tmp_path / 'map.bin')
+    assert loaded.seed == 7
+    assert sorted(loaded.get_obstacles_positions()) == sorted(obstacles.get_obstacles_positions())
+    xs, ys = np.meshgrid(np.arange(-2, 52), np.arange(-2, 32), indexing='ij')
+    assert (loaded.has_many(xs, ys) == obstacles.has_many(xs, ys)).all()
+    assert all(loaded.has(position) for position in obstacles.get_obstacles_positions())
+    assert not loaded.has((0, 0)) and not loaded.has((-1, 3)) and not loaded.has((50, 0))
+    for instructions in ['MMRMMLM' * 20, 'RMMML' + 'M' * 200, 'RRMLLM(MMRMMLM)*50']:
+        expected, rovers = Rovers(), Rovers()
+        expected.execute(instructions, grid, obstacles)
+        rovers.execute(instructions, grid, loaded)
+        assert str(rovers) == str(expected) and rovers.history == expected.history
+
+def test_auto_layout(tmp_path):
+    """
+    This test checks that the smallest layout is chosen.
+    """
+    assert write_map(tmp_path / 'dense.bin', [(x, y) for x in range(10) for y in range(100)], (100, 100)) == 'bitset'
+    assert write_map(tmp_path / 'sparse.bin', [(1, 2), (3, 4)], (10**6, 10**6)) == 'coords'
+    bitmap, seed = open_map(tmp_path / 'sparse.bin')
+    assert seed is None and len(bitmap) == 2 and bitmap.shape == (10**6, 10**6)
+    assert (tmp_path / 'sparse.bin').stat().st_size < 100
+
+def test_modify_loaded_map(tmp_path):
+    """
+    This test checks that a loaded map can be modified without changing the file.
+    """
+    Obstacles.from_positions([(1, 1)], Grid(10, 10)).save(tmp_path / 'map.bin')
+    loaded = Obstacles.load(tmp_path / 'map.bin')
+    loaded.add_custom_obstacle((2, 2))
+    assert loaded.has((1, 1)) and loaded.has((2, 2))
+    assert Obstacles.load(tmp_path / 'map.bin').get_obstacles_positions() == [(1, 1)]
+
+def test_short_rays_read_loaded_map(tmp_path):
+    """
+    This test checks that short moves on a loaded map only read the cells of the rays,
+    without listing the obstacles or building the ray index.
+    """
+    grid = Grid(50, 30)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 200, seed=7)
+    obstacles.save(tmp_path / 'map.bin')
+    loaded = Obstacles.load(tmp_path / 'map.bin')
+    for instructions in ['MMRMMLM', 'RMMMMMMMMMM', 'MLMMRRMM']:
+        expected, rovers = Rovers(), Rovers()
+        expected.execute(instructions, grid, obstacles)
+        rovers.execute(instructions, grid, loaded)
+        assert str(rovers) == str(expected)
+    assert loaded._index is None and loaded._positions is None
+
+def test_save_errors(tmp_path):
+    """
+    This test checks the errors saving and loading maps.
+    """
+    with pytest.raises(ValueError):
+        Obstacles().add_custom_obstacle((1, 1)).save(tmp_path / 'map.bin')
+    with pytest.raises(ValueError):
+        Obstacles().add_custom_obstacle((20, 1)).save(tmp_path / 'map.bin', Grid(10, 10))
+    (tmp_path / 'text.bin').write_text('1 2\n')
+    with pytest.raises(ObstacleMapError):
+        Obstacles.load(tmp_path / 'text.bin')
+
+def test_convert_text_map(tmp_path):
+    """
+    This test checks the converter of text maps.
+    """
+    (tmp_path / 'map.txt').write_text('# obstacles\n1 2\n3,4\n\n5 6\n')
+    assert main([str(tmp_path / 'map.txt'), str(tmp_path / 'map.bin'), '--shape', '10', '10', '--seed', '3']) == 0
+    loaded = Obstacles.load(tmp_path / 'map.bin')
+    assert loaded.get_obstacles_positions() == [(1, 2), (3, 4), (5, 6)] and loaded.seed == 3
+    assert convert_text_map(tmp_path / 'map.txt', tmp_path / 'coords.bin', (10, 10), layout='coords') == 'coords'
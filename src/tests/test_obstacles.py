@@ -0,0 +1,140 @@
+import pytest
+import numpy as np
+from mars import Rovers, Grid, Obstacles
+from config import GRID_SIZE
+
+############################################################
+#                                                          #
+#         TESTS FUNCTIONS FOR THE OBSTACLES                #
+#                                                          #
+############################################################
+
+def test_create_obstacles_number():
+    """
+    This test assures that exactly the requested number of obstacles
+    is created, also when some cells were already taken.
+    """
+    grid = Grid(GRID_SIZE, GRID_SIZE)
+    obstacles = Obstacles(grid).add_custom_obstacle((3,3)).add_custom_obstacle((1,0))
+    obstacles.create_obstacles_in_grid(grid, 80, seed=1)
+    positions = obstacles.get_obstacles_positions()
+    assert len(positions) == 82
+    assert len(set(positions)) == 82
+    assert all(1 <= x < GRID_SIZE and 0 <= y < GRID_SIZE for x, y in positions)
+
+def test_create_obstacles_fill_grid():
+    """
+    This test checks that all the available cells can be filled and
+    that asking for more obstacles than free cells raises an error.
+    """
+    grid = Grid(4, 3)
+    obstacles = Obstacles().create_obstacles_in_grid(grid, 9, seed=3)
+    assert len(obstacles.get_obstacles_positions()) == 9
+    with pytest.raises(ValueError):
+        obstacles.create_obstacles_in_grid(grid, 1)
+
+def test_create_obstacles_seed():
+    """
+    This test checks that the same seed creates the same obstacles.
+    """
+    grid = Grid(50, 40)
+    first = Obstacles().create_obstacles_in_grid(grid, 100, seed=5).get_obstacles_positions()
+    second = Obstacles().create_obstacles_in_grid(grid, 100, seed=5).get_obstacles_positions()
+    assert sorted(first) == sorted(second)
+
+def test_occupancy_bitmap():
+    """
+    This test checks that the occupancy bitmap and the set of positions
+    contain the same obstacles.
+    """
+    grid = Grid(30, 20)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 50, seed=2).add_custom_obstacle((0,4))
+    xs, ys = np.nonzero(obstacles._occupancy)
+    assert sorted(zip(xs.tolist(), ys.tolist())) == sorted(obstacles.get_obstacles_positions())
+    assert obstacles.has(np.array((0,4)))
+    assert not obstacles.has((0,5))
+
+def test_execute_with_occupancy_bitmap():
+    """
+    This test checks that long jumps give the same result with and
+    without the occupancy bitmap.
+    """
+    grid = Grid(40, 40)
+    for seed in range(10):
+        instructions = 'M'*100 + 'R' + 'M'*100 + 'R' + 'M'*75
+        with_bitmap = Obstacles(grid).create_obstacles_in_grid(grid, 30, seed=seed)
+        without_bitmap = Obstacles().create_obstacles_in_grid(grid, 30, seed=seed)
+        first, second = Rovers(), Rovers()
+        first.execute(instructions, grid, with_bitmap)
+        second.execute(instructions, grid, without_bitmap)
+        assert str(first) == str(second)
+        assert first.history == second.history
+
+def test_add_remove_obstacle():
+    """
+    This test checks that single obstacles can be added and removed and that
+    the version only grows when the obstacles change.
+    """
+    grid = Grid(10, 10)
+    obstacles = Obstacles(grid)
+    assert obstacles.add((3, 4)).has((3, 4)) and obstacles.version == 1
+    assert obstacles.add((3, 4)).version == 1
+    assert obstacles.first_on_ray((3, 0), (0, 1), 100, grid.shape) == 4
+    assert not obstacles.remove((3, 4)).has((3, 4)) and obstacles.version == 2
+    assert obstacles.remove((3, 4)).version == 2
+    assert obstacles.first_on_ray((3, 0), (0, 1), 100, grid.shape) is None
+
+@pytest.mark.parametrize('sparse', [False, True])
+def test_add_remove_many_like_rebuilt(sparse):
+    """
+    This test checks that after batches of obstacles added and removed, small ones
+    and big ones that only update the bitmap, the obstacles behave as the ones
+    created from scratch with the same positions.
+    """
+    rng = np.random.default_rng(4)
+    grid = Grid(80, 70, sparse=sparse)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 500, seed=1)
+    positions = set(obstacles.get_obstacles_positions())
+    instructions = ('M' * 90 + 'R' + 'M' * 75 + 'L') * 3
+    for size in [3, 6000, 40, 1, 5000, 200]:
+        xs, ys = rng.integers(0, 80, size), rng.integers(0, 70, size)
+        batch = set(zip(xs.tolist(), ys.tolist())) - {(0, 0)}
+        xs, ys = np.array([x for x, _ in batch]), np.array([y for _, y in batch])
+        if size % 2:
+            obstacles.remove_many(xs, ys)
+            positions -= batch
+        else:
+            obstacles.add_many(xs, ys)
+            positions |= batch
+        rebuilt = Obstacles.from_positions(list(positions), grid)
+        assert set(obstacles.get_obstacles_positions()) == positions
+        assert (obstacles.has_many(xs, ys) == rebuilt.has_many(xs, ys)).all()
+        for x, y in rng.integers(0, 70, size=(20, 2)).tolist():
+            for vec in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+                assert obstacles.first_on_ray((x, y), vec, 100, grid.shape) == rebuilt.first_on_ray((x, y), vec, 100, grid.shape)
+        first, second = Rovers(), Rovers()
+        first.execute(instructions, grid, obstacles)
+        second.execute(instructions, grid, rebuilt)
+        assert str(first) == str(second)
+
+def test_big_batch_keeps_outside_obstacles():
+    """
+    This test checks that the obstacles outside the grid are not lost by a big batch of obstacles.
+    """
+    grid = Grid(100, 100)
+    obstacles = Obstacles(grid).add((150, 3))
+    xs, ys = np.divmod(np.arange(1, 10000), 100)
+    obstacles.add_many(xs, ys).remove_many(xs, ys)
+    assert obstacles.get_obstacles_positions() == [(150, 3)]
+
+def test_remove_from_loaded_map(tmp_path):
+    """
+    This test checks that the obstacles of a loaded map can be removed and added.
+    """
+    grid = Grid(50, 50)
+    Obstacles(grid).create_obstacles_in_grid(grid, 100, seed=3).save(str(tmp_path / 'map.bin'))
+    obstacles = Obstacles.load(str(tmp_path / 'map.bin'))
+    positions = obstacles.get_obstacles_positions()
+    obstacles.remove_many(*np.array(positions[:50]).T).add((0, 7))
+    assert sorted(obstacles.get_obstacles_positions()) == sorted(positions[50:] + [(0, 7)])
+    assert obstacles.version == 2
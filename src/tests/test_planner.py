@@ -0,0 +1,125 @@
+import pytest
+import numpy as np
+from mars import Rovers, Grid, Obstacles
+from planner import Planner
+from errors import DirectionNotFoundError, PlanningError
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+def run_program(program, grid, obstacles):
+    """
+    This function moves the rovers from (0, 0) facing North with the program.
+
+    :param program: The program of commands
+    :type program: string
+    :param grid: The grid
+    :type grid: Grid
+    :param obstacles: The obstacles of the grid
+    :type obstacles: Obstacles
+    :return: the rovers
+    :rtype: Rovers
+    """
+    rovers = Rovers()
+    for command in program:
+        rovers.move(command, grid, obstacles)
+    return rovers
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+def test_plan_wraps_around():
+    """
+    This test checks that the planner uses the wrap around of the grid.
+    """
+    grid = Grid(10, 10)
+    planner = Planner(grid, Obstacles(grid))
+    assert planner.plan((0, 0, 'N'), (0, 8)) == 'RRMM'
+    assert planner.plan((0, 0, 'N'), (0, 0)) == ''
+    assert planner.plan((0, 0, 'N'), (3, 2)) == 'MMRMMM'
+
+@pytest.mark.parametrize('max_field_cells', [10**6, 0])
+def test_plan_avoids_obstacles(max_field_cells):
+    """
+    This test checks that the programs of the distance fields and of A* reach the
+    target without finding obstacles and have the same length.
+    """
+    grid = Grid(20, 15)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 80, seed=4)
+    planner = Planner(grid, obstacles, max_field_cells=max_field_cells)
+    reference = Planner(grid, obstacles)
+    rng = np.random.default_rng(0)
+    for x, y in rng.integers(0, (20, 15), size=(30, 2)).tolist():
+        program = planner.plan((0, 0, 'N'), (x, y))
+        if obstacles.has((x, y)):
+            assert program is None
+            continue
+        rovers = run_program(program, grid, obstacles)
+        assert rovers.can_move() and tuple(rovers.position) == (x, y)
+        assert len(program) == reference.distance_field((x, y))[0, 0, 0]
+
+def test_unreachable():
+    """
+    This test checks that a walled cell cannot be reached and that the rovers cannot start on an obstacle.
+    """
+    grid = Grid(10, 10)
+    obstacles = Obstacles(grid)
+    for position in [(4, 5), (6, 5), (5, 4), (5, 6)]:
+        obstacles.add_custom_obstacle(position)
+    assert Planner(grid, obstacles).plan((0, 0, 'E'), (5, 5)) is None
+    assert Planner(grid, obstacles, max_field_cells=0).plan((0, 0, 'E'), (5, 5)) is None
+    with pytest.raises(PlanningError):
+        Planner(grid, obstacles, max_field_cells=0, max_states=50).plan((0, 0, 'E'), (5, 5))
+    with pytest.raises(DirectionNotFoundError):
+        Planner(grid, obstacles).plan((0, 0, 'X'), (1, 1))
+    for max_field_cells in (0, 1 << 22):
+        with pytest.raises(PlanningError):
+            Planner(grid, obstacles, max_field_cells=max_field_cells).plan((4, 5, 'N'), (0, 0))
+
+def test_distance_field_cache():
+    """
+    This test checks that the distance fields are cached per target.
+    """
+    grid = Grid(30, 30)
+    planner = Planner(grid, Obstacles(grid), cache_bytes=2 * 4 * 30 * 30 * 4) #two fields of int32
+    field = planner.distance_field((5, 5))
+    assert planner.distance_field((5, 5)) is field
+    planner.distance_field((1, 1))
+    planner.distance_field((2, 2))
+    assert planner.distance_field((5, 5)) is not field
+    assert (planner.distance_field((5, 5)) == field).all()
+    planner = Planner(grid, Obstacles(grid), cache_bytes=0)
+    field = planner.distance_field((5, 5))
+    assert planner.distance_field((5, 5)) is field #the last field is always kept
+    planner.distance_field((1, 1))
+    assert planner.distance_field((5, 5)) is not field
+
+def test_plan_after_obstacles_change():
+    """
+    This test checks that the cached distance fields are forgotten when obstacles are added.
+    """
+    grid = Grid(30, 30)
+    obstacles = Obstacles(grid)
+    planner = Planner(grid, obstacles)
+    assert planner.plan((0, 0, 'N'), (0, 5)) == 'MMMMM'
+    obstacles.add((0, 3))
+    program = planner.plan((0, 0, 'N'), (0, 5))
+    assert program != 'MMMMM'
+    assert tuple(run_program(program, grid, obstacles).position) == (0, 5)
+
+def test_plan_sparse_grid():
+    """
+    This test checks the A* planner on a huge sparse grid.
+    """
+    grid = Grid(10**6, 10**6, sparse=True)
+    obstacles = Obstacles(grid).add_custom_obstacle((0, 3))
+    program = Planner(grid, obstacles).plan((0, 0, 'N'), (2, 999_998))
+    assert program == 'RMMRMM'
+    rovers = run_program(program, grid, obstacles)
+    assert tuple(rovers.position) == (2, 999_998)
@@ -0,0 +1,106 @@
+import pytest
+import random
+from mars import Rovers, Grid, Obstacles
+from program import parse_instructions, expand_instructions, iter_instructions, read_instructions, Repeat
+from errors import InstructionSyntaxError
+from config import GRID_SIZE
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+def repeat_like_expansion(instructions, obstacles, grid=None):
+    """
+    This function checks that executing a program with repeated groups
+    gives the same final state and history as executing its naive expansion.
+
+    :param instructions: A program with the repeat syntax
+    :type instructions: string
+    :param obstacles: The obstacles placed in the grid
+    :type obstacles: Obstacles
+    :param grid: The grid where the rovers moves, by default a GRID_SIZE squared grid
+    :type grid: Grid
+    """
+    grid = grid or Grid(GRID_SIZE, GRID_SIZE)
+    expected = Rovers()
+    expected.execute(expand_instructions(instructions), grid, obstacles)
+    rovers = Rovers()
+    rovers.execute(instructions, grid, obstacles)
+    assert str(rovers) == str(expected)
+    assert rovers.history == expected.history
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+def test_parse_instructions():
+    """
+    This test checks the nodes of a program with nested groups.
+    """
+    assert parse_instructions('M(R(MM)*3L)*2') == ['M', Repeat(('R', Repeat(('MM',), 3), 'L'), 2)]
+    assert expand_instructions('M(R(MM)*3L)*2') == 'MRMMMMMMLRMMMMMML'
+
+def test_parse_instructions_errors():
+    """
+    This test checks that unbalanced groups, groups without count or too many nested groups raise an error.
+    """
+    for instructions in ('(MM', 'MM)*2', '(MM)', '(MM)2', '(' * 3000 + 'M' + ')*2' * 3000):
+        with pytest.raises(InstructionSyntaxError):
+            parse_instructions(instructions)
+
+def test_repeat_like_expansion():
+    """
+    This test compares programs with repeated groups with their expansion,
+    with and without obstacles on the path.
+    """
+    repeat_like_expansion('(MMRMMLM)*1000', Obstacles())
+    repeat_like_expansion('M(MMRMMLM)*1000MR(M(RM)*7)*33', Obstacles(), Grid(7, 4))
+    repeat_like_expansion('(MMRMMLM)*1000', Obstacles().add_custom_obstacle((6,9)))
+
+def test_repeat_random_programs():
+    """
+    This test compares random programs with repeated groups with their expansion
+    in grids with random obstacles.
+    """
+    rng = random.Random(3)
+    for _ in range(40):
+        grid = Grid(rng.randint(2, 9), rng.randint(2, 9))
+        obstacles = Obstacles().create_obstacles_in_grid(grid, rng.randint(0, 3), seed=rng.randint(0, 100))
+        body = ''.join(rng.choice('MMMLR') for _ in range(rng.randint(1, 12)))
+        inner = ''.join(rng.choice('MMLR') for _ in range(rng.randint(1, 4)))
+        repeat_like_expansion(f'({body}({inner})*{rng.randint(1, 9)})*{rng.randint(1, 300)}M', obstacles, grid)
+
+def test_iter_instructions():
+    """
+    This test checks that the lazy expansion in chunks gives the same commands as the expansion,
+    with bounded chunks.
+    """
+    for instructions in ['', 'MMR', '(MMRMMLM)*1000', 'M(MMRMMLM)*1000MR(M(RM)*7)*33', '((M)*40R)*5L', '(()*3M)*2']:
+        chunks = list(iter_instructions(instructions, 64))
+        assert ''.join(chunks) == expand_instructions(instructions)
+        assert all(len(chunk) < 2 * 64 + 40 for chunk in chunks)
+    assert len(next(iter_instructions('(MMRMMLM)*1000000000'))) < 1 << 17
+
+def test_repeat_million_times():
+    """
+    This test checks that a body repeated a million times is executed
+    without expanding it.
+    """
+    rovers = Rovers()
+    rovers.execute('(MMRMMLM)*1000000', Grid(GRID_SIZE, GRID_SIZE), Obstacles())
+    assert str(rovers) == '0:0:N'
+    assert len(rovers.history) == 5000001
+
+def test_read_instructions(tmp_path):
+    """
+    This test checks that the instructions are read in chunks without line breaks.
+    """
+    path = tmp_path / 'instructions.txt'
+    path.write_text('MMRM\nMLM \n' + 'M'*20 + '\n')
+    chunks = list(read_instructions(str(path), chunk_size=4))
+    assert ''.join(chunks) == 'MMRMMLM' + 'M'*20
+    assert all(len(chunk) <= 4 for chunk in chunks)
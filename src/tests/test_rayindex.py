@@ -0,0 +1,88 @@
+import pytest
+import numpy as np
+from mars import Rovers, Grid, Obstacles
+from rayindex import RayIndex
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+def first_by_walking(positions, pos, vec, length, shape):
+    """
+    This function finds the first obstacle of a ray walking cell by cell.
+
+    :return: steps to the first obstacle or None
+    :rtype: integer or None
+    """
+    m, n = shape
+    for distance in range(1, length + 1):
+        if ((pos[0] + vec[0]*distance) % m, (pos[1] + vec[1]*distance) % n) in positions:
+            return distance
+    return None
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+@pytest.mark.parametrize('shape,count', [((13, 7), 20), ((40, 40), 300), ((9, 9), 0)])
+def test_first_like_walking(shape, count):
+    """
+    This test checks the first obstacle of many rays against walking cell by cell.
+    """
+    rng = np.random.default_rng(count)
+    positions = rng.integers(0, shape, size=(count, 2))
+    index = RayIndex.build(positions, shape)
+    positions = set(map(tuple, positions.tolist()))
+    for x, y in rng.integers(0, shape, size=(50, 2)).tolist():
+        for vec in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+            for length in [1, 5, max(shape), 3 * max(shape)]:
+                assert index.first((x, y), vec, length) == first_by_walking(positions, (x, y), vec, length, shape)
+
+def test_outside_obstacles_ignored():
+    """
+    This test checks that obstacles outside the grid are not indexed.
+    """
+    index = RayIndex.build([(-1, 0), (10, 0), (3, 0)], (10, 10))
+    assert index.first((0, 0), (1, 0), 100) == 3
+    assert index.first((0, 0), (-1, 0), 100) == 7
+    assert index.first((0, 0), (0, 1), 100) is None
+
+def test_long_rays_sparse_grid():
+    """
+    This test checks that rovers stops in front of the obstacles of a huge sparse grid with long jumps.
+    """
+    grid = Grid(10**6, 10**6, sparse=True)
+    obstacles = Obstacles(grid).add_custom_obstacle((0, 999_000)).add_custom_obstacle((5, 10))
+    rovers = Rovers()
+    rovers.execute('M' * 10**6, grid, obstacles)
+    assert str(rovers) == 'O:0:998999:N'
+    rovers = Rovers()
+    rovers.execute('RMMMMML' + 'M' * 2 * 10**6, grid, obstacles)
+    assert str(rovers) == 'O:5:9:N'
+
+def test_add_remove_like_build():
+    """
+    This test checks that an index updated with batches of obstacles added and removed
+    finds the same obstacles as an index built from scratch.
+    """
+    rng = np.random.default_rng(3)
+    shape = (30, 20)
+    index, positions = RayIndex(shape), set()
+    for step in range(40):
+        xs, ys = rng.integers(-2, 32, 25), rng.integers(-2, 22, 25)
+        batch = set(zip(xs.tolist(), ys.tolist()))
+        if step % 3 == 2:
+            index.remove(xs, ys)
+            positions -= batch
+        else:
+            index.add(xs, ys)
+            positions |= batch
+        if step % 5 == 0:
+            built = RayIndex.build(list(positions), shape)
+            for x, y in rng.integers(0, shape, size=(20, 2)).tolist():
+                for vec in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+                    assert index.first((x, y), vec, 100) == built.first((x, y), vec, 100)
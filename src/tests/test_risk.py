@@ -0,0 +1,90 @@
+import random
+import pytest
+import numpy as np
+from mars import Rovers, Grid, Obstacles
+from history import History
+from risk import visited_cells, obstacle_layouts, wilson_interval, estimate_risk
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+def first_hit(instructions, grid, obstacles):
+    """
+    This function moves a Rovers command by command and returns the index of the command stopped by an obstacle.
+
+    :param instructions: The instructions
+    :type instructions: string
+    :param grid: The grid
+    :type grid: Grid
+    :param obstacles: The obstacles
+    :type obstacles: Obstacles
+    :return: index of the instruction, -1 if there is no obstacle
+    :rtype: integer
+    """
+    rovers = Rovers(History('off'))
+    for index, command in enumerate(instructions):
+        rovers.move(command, grid, obstacles)
+        if not rovers.can_move():
+            return index
+    return -1
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+def test_visited_cells():
+    """
+    This test checks the cells of the moves against the history of a Rovers.
+    """
+    rng = random.Random(1)
+    grid = Grid(7, 11)
+    instructions = ''.join(rng.choice('MMMLR') for _ in range(500))
+    steps, xs, ys = visited_cells(instructions, grid)
+    rovers = Rovers()
+    rovers.execute(instructions, grid, Obstacles())
+    assert (np.column_stack((xs, ys)) == rovers.history.positions()[1:]).all()
+    assert ''.join(instructions[step] for step in steps) == 'M' * len(steps)
+    assert len(visited_cells('(MMR)*3', grid)[0]) == 6
+
+def test_layouts_like_obstacles():
+    """
+    This test checks that every layout has the obstacles created with the same seed.
+    """
+    grid = Grid(9, 6)
+    layouts = obstacle_layouts(grid, 12, range(5, 10))
+    for row, seed in enumerate(range(5, 10)):
+        obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 12, seed)
+        expected = sorted((x - 1) * 6 + y for x, y in obstacles.get_obstacles_positions())
+        assert np.flatnonzero(layouts[row]).tolist() == expected
+    with pytest.raises(ValueError):
+        obstacle_layouts(grid, 100, [0])
+
+def test_estimate_like_rovers(capsys):
+    """
+    This test checks the first hit of every layout against a Rovers moving through the obstacles
+    of the same seed, also when the layouts are checked in several chunks.
+    """
+    grid = Grid(12, 10)
+    instructions = ''.join(random.Random(2).choice('MMMMLR') for _ in range(200))
+    estimate = estimate_risk(instructions, grid, 6, layouts=150, seed=3, bins=10, chunk_bytes=1000)
+    expected = [first_hit(instructions, grid, Obstacles(grid).create_obstacles_in_grid(grid, 6, seed)) for seed in range(3, 153)]
+    assert estimate.first_hits.tolist() == expected
+    assert estimate.hits == sum(hit >= 0 for hit in expected) and estimate.probability == estimate.hits / 150
+    assert estimate.low <= estimate.probability <= estimate.high
+    assert estimate.histogram[0].sum() == estimate.hits and len(estimate.histogram[1]) == 11
+
+def test_wilson_interval():
+    """
+    This test checks the confidence intervals.
+    """
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = wilson_interval(0, 100)
+    assert low == 0.0 and 0 < high < 0.05
+    low, high = wilson_interval(50, 100)
+    assert high - 0.5 == pytest.approx(0.5 - low) and low == pytest.approx(0.4038, abs=1e-4)
+    assert wilson_interval(50, 100, 0.99)[0] < low
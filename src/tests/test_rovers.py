@@ -1,5 +1,7 @@
 import pytest
-from mars import Rovers, Grid, Obstacles
+import random
+from mars import Rovers, Grid, Obstacles, RoversEvent
+from errors import CommandDoesNotExistError
 from config import GRID_SIZE
 
 ############################################################
@@ -59,6 +61,29 @@ def move_to_obstacles(instructions):
         rovers.move(char, grid, obstacles)
     assert (rovers.position == (2,4)).all()
 
+def execute_like_move(instructions, obstacles, grid=None):
+    """
+    This function checks that executing the whole instructions string at once
+    gives the same final state and history as moving character by character
+    until the rovers finds an obstacle.
+
+    :param instructions: A list of characters containing instructions for the robot
+    :type instructions: string
+    :param obstacles: The obstacles placed in the grid
+    :type obstacles: Obstacles
+    :param grid: The grid where the rovers moves, by default a GRID_SIZE squared grid
+    :type grid: Grid
+    """
+    grid = grid or Grid(GRID_SIZE, GRID_SIZE)
+    expected = Rovers()
+    for char in instructions:
+        if not expected.can_move():
+            break
+        expected.move(char, grid, obstacles)
+    rovers = Rovers()
+    rovers.execute(instructions, grid, obstacles)
+    assert str(rovers) == str(expected)
+    assert rovers.history == expected.history
 
 
 #############################################################
@@ -142,4 +167,117 @@ def test_stop_if_obstacle():
     This test checks if the mars rovers stops when it finds an obstacle
     in the next cell.
     """
-    move_to_obstacles('MMRMMLMMMM')
\ No newline at end of file
+    move_to_obstacles('MMRMMLMMMM')
+
+def test_execute_move():
+    """
+    This test assures that executing the whole instructions string
+    gives the expected final position.
+    """
+    rovers = Rovers()
+    rovers.execute('MMRMMLM', Grid(GRID_SIZE, GRID_SIZE), Obstacles())
+    assert str(rovers) == '2:3:N'
+
+def test_execute_with_wrap_around():
+    """
+    This test checks that long straight jumps wrapping around the grid
+    several times match the character by character movement.
+    """
+    execute_like_move('MMRMMMLMRMRMMMMM' + 'M'*35 + 'LLLM' + 'M'*27, Obstacles())
+    execute_like_move('RRRM' + 'M'*23 + 'RM', Obstacles(), Grid(7, 3))
+
+def test_execute_stop_if_obstacle():
+    """
+    This test checks that a jump stops in front of the first obstacle
+    and the rovers reports it.
+    """
+    obstacles = Obstacles().add_custom_obstacle((2,5))
+    execute_like_move('MMRMMLMMMM', obstacles)
+    rovers = Rovers()
+    rovers.execute('MMRMMLMMMMRRMM', Grid(GRID_SIZE, GRID_SIZE), obstacles)
+    assert str(rovers) == 'O:2:4:N'
+
+def test_execute_obstacle_after_wrap_around():
+    """
+    This test checks that an obstacle found right after wrapping around,
+    or in the starting cell after a whole lap, stops the rovers.
+    """
+    execute_like_move('RMMMMMMMMMMMMM', Obstacles().add_custom_obstacle((0,0)))
+    execute_like_move('LMMMM', Obstacles().add_custom_obstacle((7,0)))
+
+def test_execute_random_instructions():
+    """
+    This test compares the execution of random instructions with the
+    character by character movement in grids with random obstacles.
+    """
+    rng = random.Random(7)
+    for _ in range(50):
+        grid = Grid(rng.randint(2, 12), rng.randint(2, 12))
+        obstacles = Obstacles()
+        for _ in range(rng.randint(0, 6)):
+            obstacles.add_custom_obstacle((rng.randrange(grid.shape[0]), rng.randrange(grid.shape[1])))
+        instructions = ''.join(rng.choice('MMMMLR') for _ in range(rng.randint(1, 200)))
+        execute_like_move(instructions, obstacles, grid)
+
+def test_execute_unknown_command():
+    """
+    This test checks that an unknown command raises an error after
+    executing the previous commands.
+    """
+    rovers = Rovers()
+    with pytest.raises(CommandDoesNotExistError):
+        rovers.execute('MMRMXM', Grid(GRID_SIZE, GRID_SIZE), Obstacles())
+    assert str(rovers) == '1:2:E'
+
+def test_run_iter_events():
+    """
+    This test checks the events yielded when running the instructions lazily.
+    """
+    rovers = Rovers()
+    obstacles = Obstacles().add_custom_obstacle((4,4))
+    events = list(rovers.run_iter(['MMR', 'MMMMMMMMMMMMMM', 'LMMM', 'MM'], Grid(GRID_SIZE, GRID_SIZE), obstacles))
+    assert events == [RoversEvent('move', 0, 2, 'N', 2, 0), RoversEvent('rotate', 0, 2, 'E'),
+                      RoversEvent('move', 4, 2, 'E', 14, 1), RoversEvent('rotate', 4, 2, 'N'),
+                      RoversEvent('move', 4, 3, 'N', 1, 0), RoversEvent('obstacle', 4, 4, 'N')]
+    assert str(rovers) == 'O:4:3:N'
+    events = list(Rovers().run_iter('RRMMRMMMMM', Grid(GRID_SIZE, GRID_SIZE), obstacles))
+    assert events[1] == RoversEvent('move', 0, 8, 'S', 2, 1)
+    assert events[3] == RoversEvent('move', 5, 8, 'W', 5, 1)
+
+def test_run_iter_like_execute():
+    """
+    This test checks that running the instructions in chunks gives the same
+    result as executing them, also when the consumer stops early.
+    """
+    rng = random.Random(5)
+    grid = Grid(9, 12)
+    obstacles = Obstacles().create_obstacles_in_grid(grid, 8, seed=2)
+    instructions = ''.join(rng.choice('MMMMLR') for _ in range(3000))
+    expected = Rovers()
+    expected.execute(instructions, grid, obstacles)
+    rovers = Rovers()
+    for _ in rovers.run_iter((instructions[i:i+7] for i in range(0, len(instructions), 7)), grid, obstacles):
+        pass
+    assert str(rovers) == str(expected)
+    assert rovers.history == expected.history
+    rovers = Rovers()
+    events = rovers.run_iter(instructions, grid, obstacles)
+    first = next(events)
+    events.close()
+    assert str(rovers) == f'{first.x}:{first.y}:{first.direction}'
+
+def test_scalar_state():
+    """
+    This test checks that the state stored as integers keeps the position, vector and direction
+    properties and that no other attribute can be added to a Rovers.
+    """
+    grid = Grid(GRID_SIZE, GRID_SIZE)
+    rovers = Rovers.from_state(3, 4, 'W')
+    assert (rovers.position == (3, 4)).all() and (rovers.vector == (-1, 0)).all() and rovers.direction == 'W'
+    for command, vector in zip('RRRR', ((0, 1), (1, 0), (0, -1), (-1, 0))):
+        rovers.move(command, grid, Obstacles())
+        assert tuple(rovers.vector) == vector
+    rovers.move('M', grid, Obstacles())
+    assert tuple(rovers.position) == (2, 4) and rovers.position.shape == (2,) #still a numpy array
+    with pytest.raises(AttributeError):
+        rovers.speed = 1
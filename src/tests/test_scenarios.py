@@ -0,0 +1,109 @@
+import csv
+import json
+import pytest
+from mars import Grid, Obstacles
+from multiprocessing import shared_memory
+from scenarios import read_manifest, run_scenario, run_scenarios, write_results, main, _task, _release
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+SCENARIOS = [{'id': 'a', 'grid': 10, 'obstacles': 5, 'seed': 1, 'instructions': 'MMRMMLM'},
+             {'id': 'b', 'grid': [30, 20], 'obstacles': 100, 'seed': 2, 'instructions': '(MMRMMLM)*50'},
+             {'id': 'c', 'grid': 10, 'obstacles': [[0, 3]], 'instructions': 'MMMMM'},
+             {'id': 'd', 'grid': 10, 'obstacles': 5, 'seed': 1, 'instructions': 'MMXM'},
+             {'id': 'e', 'grid': [1000, 1000], 'sparse': True, 'obstacles': [[0, 900]], 'instructions': 'M'*1000}]
+
+def write_manifest(path, scenarios=SCENARIOS):
+    """
+    This function writes a manifest with the scenarios.
+
+    :param path: The path of the manifest
+    :type path: pathlib.Path
+    :param scenarios: The scenarios
+    :type scenarios: list of dicts
+    :return: the path
+    :rtype: pathlib.Path
+    """
+    path.write_text('\n'.join(json.dumps(scenario) for scenario in scenarios) + '\n')
+    return path
+
+def expected_result(scenario):
+    """
+    This function runs a scenario in this process.
+
+    :param scenario: The scenario
+    :type scenario: dict
+    :return: the result
+    :rtype: dict
+    """
+    size = scenario['grid']
+    grid = Grid(*((size, size) if isinstance(size, int) else size), scenario.get('sparse', False))
+    if isinstance(scenario['obstacles'], int):
+        obstacles = Obstacles(grid).create_obstacles_in_grid(grid, scenario['obstacles'], scenario['seed'])
+    else:
+        obstacles = Obstacles.from_positions(scenario['obstacles'], grid)
+    return run_scenario(scenario, obstacles)
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+def test_run_scenario():
+    """
+    This test checks the result of single scenarios.
+    """
+    assert expected_result(SCENARIOS[2]) == {'id': 'c', 'final': 'O:0:2:N', 'steps': 2, 'obstacle': True, 'error': None}
+    assert expected_result(SCENARIOS[3])['error'] is not None
+    assert expected_result(SCENARIOS[4])['final'] == 'O:0:899:N'
+
+@pytest.mark.parametrize('batch_size', [1, 2, 16])
+def test_run_scenarios(batch_size):
+    """
+    This test checks that the pool of processes gives the results of every scenario in order.
+    """
+    results = list(run_scenarios(SCENARIOS * 3, workers=2, batch_size=batch_size, window=2))
+    assert results == [expected_result(scenario) for scenario in SCENARIOS * 3]
+
+def test_main(tmp_path):
+    """
+    This test checks the command line with JSON lines and CSV outputs.
+    """
+    manifest = write_manifest(tmp_path / 'manifest.jsonl')
+    assert [scenario['id'] for scenario in read_manifest(manifest)] == ['a', 'b', 'c', 'd', 'e']
+    assert main([str(manifest), str(tmp_path / 'results.jsonl'), '--workers', '2']) == 0
+    results = [json.loads(line) for line in (tmp_path / 'results.jsonl').read_text().splitlines()]
+    assert results == [expected_result(scenario) for scenario in SCENARIOS]
+    assert main([str(manifest), str(tmp_path / 'results.csv'), '--workers', '1']) == 0
+    with open(tmp_path / 'results.csv') as file:
+        rows = list(csv.DictReader(file))
+    assert [row['final'] for row in rows] == [result['final'] for result in results]
+
+def test_failed_and_shared_maps():
+    """
+    This test checks that scenarios with the same id and different obstacles do not share their map, that a map
+    that cannot be created only fails its scenario and that the shared memory is released after the last scenario.
+    """
+    scenarios = [{'id': 'x', 'grid': 10, 'obstacles': [[0, 3]], 'instructions': 'MMMMM'},
+                 {'id': 'x', 'grid': 10, 'obstacles': [[0, 4]], 'instructions': 'MMMMM'},
+                 {'id': 'y', 'grid': 10, 'obstacles': 200, 'seed': 1, 'instructions': 'M'},
+                 {'id': 'z', 'grid': 10, 'obstacles': [[0, 3]], 'instructions': 'MM'}]
+    results = list(run_scenarios(scenarios, workers=2, batch_size=2, window=1))
+    assert [result['final'] for result in results] == ['O:0:2:N', 'O:0:3:N', None, '0:2:N']
+    assert 'no room for 200 obstacles' in results[2]['error'] and results[3]['error'] is None
+    maps = {}
+    (_, first, _), key = _task(scenarios[0], maps)
+    (_, second, _), other = _task(scenarios[3], maps)
+    assert first == second and key == other and maps[key][2] == 2
+    assert _task(scenarios[2], maps)[1] is None
+    _release([key], maps)
+    assert key in maps
+    _release([key, None], maps)
+    assert not maps
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=first)
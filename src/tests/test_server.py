@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from mars import Rovers, Grid, Obstacles
+from server import RoversServer, run_load, is_loopback, main
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+def new_server(**options):
+    """
+    This function creates a server on a 10 X 10 grid with an obstacle at (0, 3).
+
+    :return: the server
+    :rtype: RoversServer
+    """
+    grid = Grid(10, 10)
+    return RoversServer(grid, Obstacles(grid).add_custom_obstacle((0, 3)), **options)
+
+async def talk(port, lines):
+    """
+    This function sends the lines pipelined through one connection and returns the responses.
+
+    :param port: The TCP port of the server
+    :type port: integer
+    :param lines: The requests
+    :type lines: list of strings
+    :return: the responses
+    :rtype: list of strings
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(''.join(line + '\n' for line in lines).encode())
+    await writer.drain()
+    responses = [(await reader.readline()).decode().strip() for _ in lines]
+    writer.close()
+    return responses
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+def test_sessions():
+    """
+    This test checks that the sessions are independent and keep their state between requests.
+    """
+    async def scenario():
+        server = new_server()
+        listening = await server.start()
+        port = listening.sockets[0].getsockname()[1]
+        try:
+            responses = await talk(port, ['alpha RMM', 'beta MM', 'alpha LM', 'beta M', 'beta M', 'gamma MXM', '', 'alpha'])
+            assert responses[:5] == ['2:0:E', '0:2:N', '2:1:N', 'O:0:2:N', 'O:0:2:N']
+            assert responses[5].startswith('ERROR') and responses[6].startswith('ERROR')
+            assert responses[7] == '2:1:N'
+            assert set(server.sessions) == {'alpha', 'beta', 'gamma'}
+        finally:
+            await server.close()
+    asyncio.run(scenario())
+
+def test_batching():
+    """
+    This test checks that the requests queued in a session are run in fewer batches
+    and give the same states as running them one by one.
+    """
+    async def scenario():
+        server = new_server()
+        states = await asyncio.gather(*(server.execute('alpha', 'RMMLM') for _ in range(50)))
+        await server.close()
+        return server, states
+    server, states = asyncio.run(scenario())
+    grid = Grid(10, 10)
+    obstacles = Obstacles(grid).add_custom_obstacle((0, 3))
+    rovers = Rovers()
+    expected = []
+    for _ in range(50):
+        rovers.execute('RMMLM', grid, obstacles)
+        expected.append(str(rovers))
+    assert states == expected
+    assert server.requests == 50 and server.batches < 50
+
+def test_limits():
+    """
+    This test checks the limits of sessions and of the length of the requests.
+    """
+    async def scenario():
+        server = new_server(max_sessions=2, max_line=64)
+        listening = await server.start()
+        port = listening.sockets[0].getsockname()[1]
+        try:
+            assert (await talk(port, ['a M', 'b M', 'c M']))[2].startswith('ERROR')
+            assert (await talk(port, ['a ' + 'M' * 100]))[0].startswith('ERROR')
+        finally:
+            await server.close()
+    asyncio.run(scenario())
+
+def test_failed_request_keeps_session(monkeypatch):
+    """
+    This test checks that a request that fails answers an error and the next requests of the session are served.
+    """
+    def fail(*args):
+        raise RecursionError('too deep')
+
+    async def scenario():
+        server = new_server()
+        listening = await server.start()
+        port = listening.sockets[0].getsockname()[1]
+        try:
+            responses = await talk(port, ['a ' + '(' * 3000 + 'M' + ')*2' * 3000, 'a M'])
+            assert responses[0].startswith('ERROR') and responses[1] == '0:1:N'
+            monkeypatch.setattr(Rovers, 'execute', fail)
+            responses = await talk(port, ['a M'])
+            monkeypatch.undo()
+            assert responses[0] == 'ERROR RecursionError too deep'
+            assert await talk(port, ['a M']) == ['0:2:N']
+        finally:
+            await server.close()
+    asyncio.run(asyncio.wait_for(scenario(), 10))
+
+def test_only_loopback():
+    """
+    This test checks that the service only listens on loopback addresses.
+    """
+    assert is_loopback('127.0.0.1') and is_loopback('::1') and is_loopback('localhost')
+    assert not is_loopback('0.0.0.0') and not is_loopback('192.168.1.10') and not is_loopback('example.com')
+    with pytest.raises(ValueError):
+        asyncio.run(new_server().start('0.0.0.0'))
+    with pytest.raises(SystemExit):
+        main(['serve', '--host', '0.0.0.0'])
+
+def test_run_load(tmp_path):
+    """
+    This test checks the load generator against a server on a Unix socket.
+    """
+    async def scenario():
+        server = new_server()
+        await server.start(path=str(tmp_path / 'rovers.sock'))
+        try:
+            return await run_load(path=str(tmp_path / 'rovers.sock'), connections=20, requests=10, sessions=5, instructions='RM')
+        finally:
+            await server.close()
+    result = asyncio.run(scenario())
+    assert result['requests'] == 200 and result['errors'] == 0
+    assert 0 < result['p50'] <= result['p99'] <= result['max']
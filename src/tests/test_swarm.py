@@ -0,0 +1,85 @@
+import random
+import pytest
+from mars import Rovers, Grid, Obstacles
+from swarm import Swarm
+from errors import CommandDoesNotExistError, PlanningError
+
+############################################################
+#                                                          #
+#         HELPER FUNCTIONS FOR TESTING                     #
+#                                                          #
+############################################################
+
+def new_swarm(starts, obstacle=None):
+    """
+    This function creates a swarm on a 10 X 10 grid, with an obstacle if it is given.
+
+    :param starts: The initial states of the rovers
+    :type starts: list of tuples
+    :param obstacle: The position of the obstacle
+    :type obstacle: tuple
+    :return: the swarm
+    :rtype: Swarm
+    """
+    grid = Grid(10, 10)
+    obstacles = Obstacles(grid) if obstacle is None else Obstacles(grid).add_custom_obstacle(obstacle)
+    return Swarm(grid, obstacles, starts)
+
+#############################################################
+#                                                           #
+#         TESTS FUNCTIONS FOR TESTING WITH PYTEST           #
+#                                                           #
+#############################################################
+
+def test_rovers_stop_each_other():
+    """
+    This test checks that the rovers are obstacles for the others and the order of the turns.
+    """
+    swarm = new_swarm([(0, 0, 'N'), (1, 0, 'N'), (5, 5, 'E')])
+    assert swarm.execute(['MMRM', 'MMLM', 'MMMM']) == 12
+    assert swarm.states() == ['O:0:2:E', 'O:1:2:W', '9:5:E']
+    assert swarm.occupant(0, 2) == 0 and swarm.occupant(1, 2) == 1 and swarm.occupant(0, 0) is None
+    swarm = new_swarm([(0, 0, 'N'), (0, 2, 'N')])
+    swarm.execute(['MMM', 'M'])
+    assert swarm.states() == ['O:0:2:N', '0:3:N'] #the cell left by the second rover is free
+
+def test_stopped_rovers_leave_the_schedule():
+    """
+    This test checks that a stopped rover takes no more turns, also in later executions.
+    """
+    swarm = new_swarm([(0, 0, 'N'), (5, 0, 'N')], obstacle=(0, 3))
+    assert swarm.execute(['M' * 100, 'MM']) == 3 + 2
+    assert swarm.states() == ['O:0:2:N', '5:2:N']
+    assert swarm.execute(['M' * 100, 'R']) == 1
+    assert swarm.states() == ['O:0:2:N', '5:2:E']
+
+def test_lonely_rovers_like_rovers():
+    """
+    This test checks that rovers far from each other end like a single Rovers.
+    """
+    rng = random.Random(3)
+    grid = Grid(40, 40)
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 30, seed=2)
+    free = [(x, 0) for x in range(0, 40, 10) if not obstacles.has((x, 0))]
+    instructions = [''.join(rng.choice('MMMLR') for _ in range(60)) for _ in free]
+    swarm = Swarm(grid, obstacles, [(x, y, 'N') for x, y in free])
+    swarm.execute(instructions)
+    for (x, y), program, rovers in zip(free, instructions, swarm):
+        alone = Rovers.from_state(x, y, 'N')
+        alone.execute(program, grid, obstacles)
+        assert str(rovers) == str(alone) and rovers.history == alone.history
+
+def test_errors():
+    """
+    This test checks the errors of the swarm.
+    """
+    with pytest.raises(ValueError):
+        new_swarm([(0, 0, 'N'), (10, 0, 'E')])
+    with pytest.raises(PlanningError):
+        new_swarm([(0, 0, 'N'), (3, 4, 'E')], obstacle=(3, 4))
+    swarm = new_swarm([(0, 0, 'N')])
+    with pytest.raises(ValueError):
+        swarm.execute(['M', 'M'])
+    with pytest.raises(CommandDoesNotExistError):
+        swarm.execute(['MMX'])
+    assert swarm.states() == ['0:0:N']
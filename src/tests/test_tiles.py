@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+from mars import Rovers, Grid, Obstacles, Fleet
+from tiles import TiledBitmap
+from errors import SparseGridError
+
+############################################################
+#                                                          #
+#         TESTS FUNCTIONS FOR SPARSE GRIDS                 #
+#                                                          #
+############################################################
+
+def test_tiled_bitmap_like_dense():
+    """
+    This test checks that the tiled bitmap gives the same values as a
+    dense boolean array after setting and clearing random cells.
+    """
+    rng = np.random.default_rng(0)
+    dense = np.zeros((70, 45), dtype=bool)
+    tiled = TiledBitmap(dense.shape, tile_size=8)
+    for value in (True, True, False, True):
+        xs, ys = rng.integers(0, 70, 300), rng.integers(0, 45, 300)
+        dense[xs, ys] = value
+        tiled[xs, ys] = value
+    xs, ys = np.nonzero(np.ones_like(dense))
+    assert (tiled[xs, ys] == dense[xs, ys]).all()
+    assert tiled[3, 4] == dense[3, 4]
+    assert tiled.tiles <= 9 * 6
+
+def test_tiled_bitmap_positions():
+    """
+    This test checks that the positions of the cells set are the ones of a dense array.
+    """
+    rng = np.random.default_rng(1)
+    dense = np.zeros((70, 45), dtype=bool)
+    tiled = TiledBitmap(dense.shape, tile_size=8)
+    xs, ys = rng.integers(0, 70, 300), rng.integers(0, 45, 300)
+    dense[xs, ys] = tiled[xs, ys] = True
+    dense[xs[:50], ys[:50]] = tiled[xs[:50], ys[:50]] = False
+    assert sorted(map(tuple, tiled.positions().tolist())) == sorted(map(tuple, np.argwhere(dense).tolist()))
+    assert TiledBitmap((10, 10)).positions().shape == (0, 2)
+
+def test_sparse_grid_not_materialized():
+    """
+    This test checks that a sparse grid cannot be materialized and that
+    only the tiles with obstacles are allocated.
+    """
+    grid = Grid(10**6, 10**6, sparse=True)
+    with pytest.raises(SparseGridError):
+        grid.get_grid()
+    obstacles = Obstacles(grid).create_obstacles_in_grid(grid, 1000, seed=1)
+    assert obstacles._occupancy.tiles <= 1000
+    assert (999999, 999999) in grid and (10**6, 0) not in grid
+
+def test_execute_in_sparse_grid():
+    """
+    This test checks that rovers and fleets move in a sparse grid as in
+    a grid without bitmap, wrapping around it.
+    """
+    grid = Grid(3000, 2000, sparse=True)
+    sparse = Obstacles(grid).add_custom_obstacle((2500, 1999)).create_obstacles_in_grid(grid, 500, seed=4)
+    plain = Obstacles()
+    for position in sparse.get_obstacles_positions():
+        plain.add_custom_obstacle(position)
+    instructions = ['M'*4500 + 'R' + 'M'*7000 + 'L' + 'M'*1999, 'RM' * 500 + 'M'*9000]
+    for program in instructions:
+        first, second = Rovers(), Rovers()
+        first.execute(program, grid, sparse)
+        second.execute(program, grid, plain)
+        assert str(first) == str(second)
+        assert first.history == second.history
+    first, second = Fleet(2), Fleet(2)
+    first.execute([program[-2000:] for program in instructions], grid, sparse)
+    second.execute([program[-2000:] for program in instructions], grid, plain)
+    assert [first[0], first[1]] == [second[0], second[1]]
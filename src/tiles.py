@@ -0,0 +1,186 @@
+import numpy as np
+
+"""
+This module contains the TiledBitmap class, a boolean bitmap for huge grids that are never
+materialized. The grid is split in square tiles and only the tiles that are touched are
+allocated, so the memory scales with the number of cells set and not with the size of the grid.
+"""
+
+
+class TiledBitmap:
+    """
+    This is the TiledBitmap class. It behaves like a boolean numpy array of shape (m, n) indexed
+    with bitmap[xs, ys], where xs and ys are integers or arrays of integers. Internally every tile of
+    tile_size x tile_size cells is a packed bitset (one bit per cell) stored as a row of a pool array,
+    and a dictionary maps the key of every allocated tile to its row in the pool.
+    """
+    def __init__(self, shape:tuple[int], tile_size:int = 16) -> None:
+        """
+        This is the constructor of the TiledBitmap class. No tile is allocated.
+
+        :param shape: This is the shape of the bitmap (m, n)
+        :type shape: tuple of integers
+        :param tile_size: This is the number of cells of the side of every tile
+        :type tile_size: integer
+        """
+        self._shape = (int(shape[0]), int(shape[1]))
+        self._tile_size = tile_size
+        self._tiles_y = -(-self._shape[1] // tile_size) #number of tiles in the y dimension
+        self._tile_bytes = -(-tile_size * tile_size // 8)
+        self._pool = np.zeros((16, self._tile_bytes), dtype=np.uint8) #row i is the bitset of the i-th allocated tile
+        self._rows: dict[int, int] = {} #tile key --> row of the pool
+        self._sorted = None #tile keys and rows sorted by key, rebuilt when needed for vectorized lookups
+
+    @property
+    def shape(self) -> tuple[int]:
+        """
+        This property method returns the shape of the bitmap.
+
+        :return: dimensions of the bitmap
+        :rtype: tuple
+        """
+        return self._shape
+
+    @property
+    def tiles(self) -> int:
+        """
+        This property method returns the number of allocated tiles.
+
+        :return: number of tiles
+        :rtype: integer
+        """
+        return len(self._rows)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        This property method returns the bytes used by the bitsets of the allocated tiles.
+
+        :return: number of bytes
+        :rtype: integer
+        """
+        return len(self._rows) * self._tile_bytes
+
+    def __getitem__(self, index:tuple):
+        """
+        This is the magic method to check cells of the bitmap. Cells of tiles that have not
+        been allocated are False.
+
+        :param index: this is the tuple (xs, ys) of coordinates
+        :type index: tuple of integers or numpy arrays
+        :return: returns the value of the cells
+        :rtype: bool or numpy array object
+        """
+        xs, ys = np.asarray(index[0], dtype=np.int64), np.asarray(index[1], dtype=np.int64)
+        if xs.ndim == 0:
+            row = self._rows.get(self.__key(int(xs), int(ys)))
+            if row is None:
+                return False
+            byte, bit = self.__bit(xs, ys)
+            return bool((self._pool[row, byte] >> bit) & 1)
+        values = np.zeros(np.broadcast(xs, ys).shape, dtype=bool)
+        rows = self.__find(self.__key(xs, ys))
+        found = rows >= 0
+        byte, bit = self.__bit(xs[found], ys[found])
+        values[found] = (self._pool[rows[found], byte] >> bit) & 1
+        return values
+
+    def __setitem__(self, index:tuple, value:bool) -> None:
+        """
+        This is the magic method to set cells of the bitmap. Setting a cell to True allocates
+        its tile if needed.
+
+        :param index: this is the tuple (xs, ys) of coordinates
+        :type index: tuple of integers or numpy arrays
+        :param value: this is the new value of the cells
+        :type value: bool
+        """
+        xs, ys = np.atleast_1d(np.asarray(index[0], dtype=np.int64)), np.atleast_1d(np.asarray(index[1], dtype=np.int64))
+        keys = self.__key(xs, ys)
+        if value:
+            rows = np.fromiter((self.__allocate(key) for key in keys.tolist()), dtype=np.int64, count=keys.size)
+            byte, bit = self.__bit(xs, ys)
+            np.bitwise_or.at(self._pool, (rows, byte), (1 << bit).astype(np.uint8))
+        else:
+            rows = self.__find(keys)
+            found = rows >= 0
+            byte, bit = self.__bit(xs[found], ys[found])
+            np.bitwise_and.at(self._pool, (rows[found], byte), ~(1 << bit).astype(np.uint8))
+
+    def positions(self) -> np.array:
+        """
+        This method returns the positions of the cells set, unpacking the bitsets of the allocated tiles.
+
+        :return: positions with shape (k, 2)
+        :rtype: numpy array object
+        """
+        keys = np.fromiter(self._rows.keys(), dtype=np.int64, count=len(self._rows))
+        rows = np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+        tiles, local = np.nonzero(np.unpackbits(self._pool[rows], axis=1, bitorder='little'))
+        xs = keys[tiles] // self._tiles_y * self._tile_size + local // self._tile_size
+        ys = keys[tiles] % self._tiles_y * self._tile_size + local % self._tile_size
+        return np.stack((xs, ys), axis=1)
+
+    def __key(self, xs, ys):
+        """
+        This method returns the key of the tile of every cell.
+
+        :param xs: x coordinates of the cells
+        :type xs: integer or numpy array object
+        :param ys: y coordinates of the cells
+        :type ys: integer or numpy array object
+        :return: keys of the tiles
+        :rtype: integer or numpy array object
+        """
+        return (xs // self._tile_size) * self._tiles_y + ys // self._tile_size
+
+    def __bit(self, xs:np.array, ys:np.array) -> tuple:
+        """
+        This method returns the byte and the bit of every cell inside the bitset of its tile.
+
+        :param xs: x coordinates of the cells
+        :type xs: numpy array object
+        :param ys: y coordinates of the cells
+        :type ys: numpy array object
+        :return: arrays of bytes and bits
+        :rtype: tuple
+        """
+        local = (xs % self._tile_size) * self._tile_size + ys % self._tile_size
+        return local >> 3, (local & 7).astype(np.uint8)
+
+    def __allocate(self, key:int) -> int:
+        """
+        This method returns the row of the pool of a tile, allocating it if it does not exist.
+
+        :param key: key of the tile
+        :type key: integer
+        :return: row of the pool
+        :rtype: integer
+        """
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._rows)
+            if row == len(self._pool):
+                self._pool = np.concatenate((self._pool, np.zeros_like(self._pool)))
+            self._rows[key] = row
+            self._sorted = None
+        return row
+
+    def __find(self, keys:np.array) -> np.array:
+        """
+        This method returns the row of the pool of every tile key, or -1 if the tile does not exist.
+
+        :param keys: keys of the tiles
+        :type keys: numpy array object
+        :return: rows of the pool
+        :rtype: numpy array object
+        """
+        if not self._rows:
+            return np.full(keys.shape, -1, dtype=np.int64)
+        if self._sorted is None:
+            sorted_keys = np.fromiter(self._rows.keys(), dtype=np.int64, count=len(self._rows))
+            order = np.argsort(sorted_keys)
+            self._sorted = (sorted_keys[order], np.arange(len(self._rows), dtype=np.int64)[order])
+        sorted_keys, sorted_rows = self._sorted
+        positions = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+        return np.where(sorted_keys[positions] == keys, sorted_rows[positions], -1)